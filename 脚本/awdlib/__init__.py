@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+AWD脚本共享模块
+
+flag/ 与 test/ 目录下的脚本通过把 脚本/ 目录加入 sys.path 来导入本包，
+各子模块按功能拆分，脚本按需导入即可。
+"""
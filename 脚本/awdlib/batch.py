@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+webshell批量命令 - 把多条命令拼进一次请求，用唯一分隔标记把输出拆回每条命令
+
+一次请求拿到 flag、uptime、文件列表、进程列表等信息，往返次数从 N 次降到 1 次。
+每条命令放在子shell中执行并合并 stderr，单条命令出错或 exit 不影响后面的命令；
+分隔标记带随机串，页面中原有的内容无法伪造。仅适用于类Unix目标 (sh语法)。
+"""
+
+import re
+import secrets
+
+
+def new_marker():
+    """生成本次请求使用的随机分隔标记"""
+    return 'AWD' + secrets.token_hex(6)
+
+
+def build_batch_command(commands, marker=None):
+    """
+    把多条命令拼成一条shell命令
+
+    参数:
+        commands: 命令列表
+        marker: 分隔标记，默认随机生成
+
+    返回值:
+        tuple: (拼接后的命令, 使用的分隔标记)
+    """
+    marker = marker or new_marker()
+    parts = []
+    for index, command in enumerate(commands):
+        parts.append(f"echo {marker}_{index}_S; ({command}) 2>&1; echo {marker}_{index}_E")
+    return '; '.join(parts), marker
+
+
+def split_batch_output(text, marker, count):
+    """
+    按分隔标记把响应拆回每条命令的输出
+
+    参数:
+        text: 响应内容
+        marker: build_batch_command 返回的分隔标记
+        count: 命令条数
+
+    返回值:
+        list: 每条命令的输出字符串；响应中找不到对应标记 (例如被截断) 的命令为 None
+    """
+    outputs = [None] * count
+    pattern = re.compile(rf"{marker}_(\d+)_S\r?\n(.*?){marker}_\1_E", re.S)
+    for match in pattern.finditer(text):
+        index = int(match.group(1))
+        if index < count:
+            outputs[index] = match.group(2)
+    return outputs
+
+
+def format_batch_output(commands, outputs):
+    """把拆分后的结果格式化为便于阅读和保存的文本"""
+    sections = []
+    for index, (command, output) in enumerate(zip(commands, outputs), 1):
+        body = output if output is not None else "[未找到该命令的输出，可能被截断或未执行]\n"
+        sections.append(f"==== [{index}] {command} ====\n{body}")
+    return '\n'.join(sections)
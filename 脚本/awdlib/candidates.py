@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+候选flag过滤 - 记录每个候选值出现在哪些目标、哪些轮次上，提交前去掉静态的值
+
+裸的32/40/64位模式会匹配页面上任何MD5/SHA字符串，例如每个队伍 footer.php 里都有的主题资源哈希，
+每轮都被"提交"几十次，白白占用提交次数，还容易触发flag服务器的限流。
+真正的flag每个队伍不同、每轮都会变化，所以:
+    同一轮中出现在很多目标上的值 -> 页面模板里的静态内容
+    在之前的轮次中就出现过的值   -> 没有随轮次刷新，也不是flag
+
+轮次按时间划分 (ROUND_SECONDS 和 ROUND_START 应与比赛的轮次一致，见 rounds)，记录跨次运行保存，
+同一轮内重复运行脚本不会把同一个值算作多个轮次。
+"""
+
+import json
+import os
+import time
+
+from .rounds import ROUND_SECONDS, ROUND_START, round_of
+
+# 默认记录文件
+CANDIDATE_FILE = 'candidate_cache.json'
+# 同一轮中出现在这么多个目标上的值视为静态，None 表示不按目标数过滤
+MAX_TARGETS = 3
+# 出现在这么多个不同轮次中的值视为静态 (2 表示上一轮已经出现过)，None 表示不按轮次过滤
+MAX_ROUNDS = 2
+# 超过这么多轮没再出现的值从记录中删除
+KEEP_ROUNDS = 10
+
+
+class CandidateScorer:
+    """
+    候选flag记录
+
+    每个候选值保存:
+        rounds:  出现过的轮次编号
+        targets: 本轮中出现过的目标
+    """
+
+    def __init__(self, path=CANDIDATE_FILE, round_seconds=ROUND_SECONDS, max_targets=MAX_TARGETS,
+                 max_rounds=MAX_ROUNDS, keep_rounds=KEEP_ROUNDS, round_start=ROUND_START):
+        self.path = path
+        self.max_targets = max_targets
+        self.max_rounds = max_rounds
+        self.keep_rounds = keep_rounds
+        self.round = round_of(time.time(), round_seconds, round_start)
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        """从磁盘加载记录，文件不存在或损坏时从空记录开始；已进入新一轮时清空各值的目标"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[-] 候选记录 {self.path} 读取失败，已忽略: {e}")
+            return
+        self.entries = data.get('candidates', {})
+        if data.get('round') != self.round:
+            for entry in self.entries.values():
+                entry['targets'] = []
+
+    def save(self):
+        """删除很久没出现的值后原子写回磁盘"""
+        if not self.path:
+            return
+        oldest = self.round - self.keep_rounds
+        self.entries = {value: entry for value, entry in self.entries.items() if max(entry['rounds']) >= oldest}
+        tmp_path = self.path + '.tmp'
+        data = json.dumps({'round': self.round, 'candidates': self.entries}, ensure_ascii=False)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[-] 候选记录 {self.path} 保存失败: {e}")
+
+    def observe(self, target, flags):
+        """
+        记录一个目标本轮的响应中提取到的候选值
+
+        参数:
+            target: 目标标识，例如 'ip_port'
+            flags: 候选值列表
+        """
+        for flag in flags:
+            entry = self.entries.setdefault(flag, {'rounds': [], 'targets': []})
+            if self.round not in entry['rounds']:
+                entry['rounds'].append(self.round)
+            if target not in entry['targets']:
+                entry['targets'].append(target)
+
+    def reason(self, flag):
+        """
+        判断候选值是否是静态内容
+
+        返回值:
+            str: 应跳过的原因；None 表示可以提交
+        """
+        entry = self.entries.get(flag)
+        if not entry:
+            return None
+        if self.max_targets and len(entry['targets']) >= self.max_targets:
+            return f"本轮出现在 {len(entry['targets'])} 个目标上"
+        if self.max_rounds and len(entry['rounds']) >= self.max_rounds:
+            return f"已在 {len(entry['rounds'])} 个轮次中出现，未随轮次变化"
+        return None
@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+"""
+异步HTTP引擎 - 基于 asyncio 标准库流实现的轻量HTTP/1.1客户端
+
+一个事件循环即可同时保持上千个请求在途，由全局和单主机两级并发上限控制，
+200队×5端口的一轮请求可以在几秒内完成。脚本只需提供"如何处理一个目标"的协程
+和"拿到结果后做什么"的回调，目标可以是惰性生成器 (例如 iter_alive 的输出)。
+
+引擎持有一个长期存在的事件循环，并按 host:port 保留 keep-alive 空闲连接，
+同一个引擎对象在多轮 run() 之间复用连接，重复请求同一队伍的服务时省去握手。
+
+引擎不依赖 requests，单个请求的错误不会抛出，而是记录在 HttpResponse.error 中，
+与各脚本 "返回 (成功, 内容/错误信息)" 的习惯一致。
+
+每个请求发出前先向限速器取令牌 (全局速率 + 每主机令牌桶，各主机轮转放行)，
+慢队伍占不满并发，也不会对某个主机突发过多请求。
+
+响应体按块读取，超过上限即截断；请求时给出 stop_pattern 则匹配到flag后立即停止读取，
+超大或故意拖慢的页面不会占住连接和内存。
+"""
+
+import asyncio
+import re
+import time
+from urllib.parse import urlencode
+
+from .stream import BodyBuffer, READ_CHUNK, MAX_BODY_BYTES
+from .ratelimit import get_limiter
+
+# 默认并发设置
+MAX_CONCURRENCY = 500   # 全局同时在途的连接数 (Linux默认文件句柄上限为1024)
+PER_HOST_LIMIT = 16     # 同一主机同时在途的连接数
+DEFAULT_TIMEOUT = 5     # 单个请求的总超时 (秒)
+STREAM_LIMIT = 1 << 20  # 单行 (状态行/响应头) 的最大长度
+IDLE_TIMEOUT = 30       # 空闲连接最长保留时间 (秒)，超过后视为可能已被服务器关闭
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': '*/*',
+}
+
+_CHARSET_RE = re.compile(r'charset=([\w-]+)', re.I)
+_DONE = object()
+
+
+class ServerClosedError(ConnectionError):
+    """服务器没有返回任何响应数据就关闭了连接，请求没有被处理，复用的连接上出现时可以换新连接重发"""
+
+
+class HttpResponse:
+    """
+    一次请求的结果
+
+    属性:
+        status:      HTTP状态码，请求失败时为 None
+        headers:     响应头字典 (键为小写)
+        set_cookies: 所有 Set-Cookie 头的原始值列表
+        body:        响应体 bytes
+        elapsed:     请求耗时 (秒)
+        error:       错误信息，成功时为 None
+        truncated:   响应体是否没有读完 (超过上限或提前匹配到flag)
+        sent:        请求是否已经写出；为 False 时失败发生在建立连接阶段，服务器不可能执行过该请求
+    """
+
+    __slots__ = ('status', 'headers', 'set_cookies', 'body', 'elapsed', 'error', 'truncated', 'sent')
+
+    def __init__(self, status=None, headers=None, set_cookies=None, body=b'', elapsed=0.0, error=None,
+                 truncated=False, sent=True):
+        self.status = status
+        self.headers = headers or {}
+        self.set_cookies = set_cookies or []
+        self.body = body
+        self.elapsed = elapsed
+        self.error = error
+        self.truncated = truncated
+        self.sent = sent
+
+    @property
+    def ok(self):
+        """请求成功且状态码小于400"""
+        return self.error is None and self.status is not None and self.status < 400
+
+    @property
+    def text(self):
+        """按 Content-Type 中的字符集解码响应体，未声明时使用UTF-8"""
+        match = _CHARSET_RE.search(self.headers.get('content-type', ''))
+        encoding = match.group(1) if match else 'utf-8'
+        try:
+            return self.body.decode(encoding, errors='replace')
+        except LookupError:
+            return self.body.decode('utf-8', errors='replace')
+
+    @property
+    def cookies(self):
+        """从 Set-Cookie 中提取 {name: value}"""
+        cookies = {}
+        for raw in self.set_cookies:
+            pair = raw.split(';', 1)[0]
+            if '=' in pair:
+                name, value = pair.split('=', 1)
+                cookies[name.strip()] = value.strip()
+        return cookies
+
+
+def build_request(method, host, port, path='/', data=None, headers=None, keep_alive=False):
+    """
+    构造HTTP/1.1请求报文
+
+    参数:
+        method: 请求方法
+        host: 目标主机
+        port: 目标端口
+        path: 请求路径 (可带查询字符串)
+        data: 请求体，dict 会按表单编码，str/bytes 原样发送
+        headers: 额外请求头，会覆盖默认请求头
+        keep_alive: 是否请求服务器保持连接
+
+    返回值:
+        bytes: 完整的请求报文
+    """
+    body = b''
+    merged = dict(DEFAULT_HEADERS)
+    if data is not None:
+        if isinstance(data, dict):
+            body = urlencode(data).encode('utf-8')
+            merged['Content-Type'] = 'application/x-www-form-urlencoded'
+        else:
+            body = data.encode('utf-8') if isinstance(data, str) else data
+    if headers:
+        merged.update(headers)
+    merged['Host'] = f"{host}:{port}"
+    merged['Connection'] = 'keep-alive' if keep_alive else 'close'
+    if body or method.upper() in ('POST', 'PUT'):
+        merged['Content-Length'] = str(len(body))
+
+    if not path.startswith('/'):
+        path = '/' + path
+    lines = [f"{method.upper()} {path} HTTP/1.1"]
+    lines.extend(f"{name}: {value}" for name, value in merged.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='replace') + body
+
+
+async def _read_exactly(reader, size, buffer):
+    """
+    按块读取 size 字节送入 buffer
+
+    返回值:
+        bool: True 表示 buffer 要求停止且还有数据没读 (buffer.truncated 为 True)；
+              匹配到flag时这 size 字节恰好读完则返回 False，由调用方决定后面是否还有数据
+    """
+    while size > 0:
+        data = await reader.read(min(size, READ_CHUNK))
+        if not data:
+            raise asyncio.IncompleteReadError(b'', size)
+        size -= len(data)
+        if buffer.feed(data):
+            if buffer.truncated or size > 0:
+                buffer.truncated = True
+                return True
+            return False
+    return False
+
+
+async def read_response(reader, method='GET', buffer=None):
+    """
+    从流中读取并解析一个HTTP响应
+
+    参数:
+        reader: asyncio.StreamReader
+        method: 请求方法，HEAD 请求没有响应体
+        buffer: BodyBuffer 响应体缓冲，决定读取上限和提前停止条件，默认使用 MAX_BODY_BYTES 上限
+
+    返回值:
+        tuple: (status, headers, set_cookies, body, reusable)，reusable 表示连接可以继续复用；
+               响应体没有读完时 reusable 为 False，buffer.truncated 为 True
+    """
+    if buffer is None:
+        buffer = BodyBuffer()
+    try:
+        status_line = await reader.readline()
+    except ConnectionResetError:
+        # 第一个字节之前就被 RST，与直接关闭相同
+        status_line = b''
+    if not status_line:
+        raise ServerClosedError("服务器未返回数据即关闭连接")
+    parts = status_line.decode('latin-1').split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+        raise ValueError(f"无效的响应状态行: {status_line[:80]!r}")
+    status = int(parts[1])
+    version = parts[0]
+
+    headers = {}
+    set_cookies = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        if name == 'set-cookie':
+            set_cookies.append(value)
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+    connection = headers.get('connection', '').lower()
+    reusable = 'keep-alive' in connection if version == 'HTTP/1.0' else 'close' not in connection
+
+    if method.upper() == 'HEAD' or status < 200 or status in (204, 304):
+        pass
+    elif 'chunked' in headers.get('transfer-encoding', '').lower():
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+            if size == 0:
+                # 丢弃可能存在的 trailer，直到空行
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            if buffer.matched:
+                # 上一块末尾已匹配到flag，后面还有数据块，不再读取
+                buffer.truncated = True
+                break
+            if await _read_exactly(reader, size, buffer):
+                break
+            await reader.readline()
+    elif 'content-length' in headers:
+        await _read_exactly(reader, int(headers['content-length']), buffer)
+    else:
+        # 没有长度信息，只能读到连接关闭；提前停止时不知道还剩多少，按截断处理
+        reusable = False
+        while True:
+            data = await reader.read(READ_CHUNK)
+            if not data:
+                break
+            if buffer.feed(data):
+                buffer.truncated = True
+                break
+    if buffer.truncated:
+        reusable = False
+    return status, headers, set_cookies, buffer.finish(), reusable
+
+
+def describe_error(error):
+    """把异常转换为和各脚本一致的中文错误描述"""
+    if isinstance(error, asyncio.TimeoutError):
+        return "连接超时"
+    if isinstance(error, ConnectionRefusedError):
+        return "连接被拒绝"
+    if isinstance(error, (ConnectionResetError, asyncio.IncompleteReadError)):
+        return "连接被重置"
+    return str(error) or error.__class__.__name__
+
+
+class AsyncHTTPEngine:
+    """
+    异步HTTP引擎
+
+    用法:
+        engine = AsyncHTTPEngine(timeout=3)
+
+        async def worker(target):
+            ip, port = target
+            return await engine.request('GET', ip, port, '/footer.php')
+
+        engine.run(iter_targets('ip.txt'), worker, on_result=lambda target, resp: ...)
+        engine.close()
+
+    同一个引擎对象可以多次调用 run()，空闲连接在两次之间保留。
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_host_limit=PER_HOST_LIMIT, timeout=DEFAULT_TIMEOUT,
+                 keep_alive=True, pool_size=None, idle_timeout=IDLE_TIMEOUT, max_bytes=MAX_BODY_BYTES,
+                 limiter=None):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        # 限速器，默认使用进程内共享的限速器 (见 ratelimit.configure_limiter)
+        self.limiter = limiter
+        self.keep_alive = keep_alive
+        # 每个 host:port 保留的空闲连接数，默认与单主机并发数相同，这样并发高峰后的连接都能留下复用
+        self.pool_size = pool_size or per_host_limit
+        self.idle_timeout = idle_timeout
+        self.stats = {'opened': 0, 'reused': 0, 'stale': 0}
+        self._loop = None
+        self._global = None
+        self._hosts = {}
+        self._idle = {}
+
+    def _host_semaphore(self, host):
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = self._hosts[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def request(self, method, host, port, path='/', data=None, headers=None, timeout=None,
+                      max_bytes=None, stop_pattern=None):
+        """
+        发送一个请求，受全局和单主机并发上限约束
+
+        参数:
+            method: 请求方法
+            host: 目标主机
+            port: 目标端口
+            path: 请求路径 (可带查询字符串)
+            data: 请求体，dict 按表单编码
+            headers: 额外请求头
+            timeout: 本次请求的总超时 (秒)，默认使用引擎设置
+            max_bytes: 响应体上限 (字节)，默认使用引擎设置
+            stop_pattern: 正则 (str/bytes/已编译)，响应体中匹配到后立即停止读取
+
+        返回值:
+            HttpResponse: 请求结果，失败时 error 不为 None
+        """
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        payload = build_request(method, host, port, path, data, headers, self.keep_alive)
+        timeout = timeout or self.timeout
+
+        limits = (max_bytes or self.max_bytes, stop_pattern)
+        # 记录请求是否已经写出，失败时据此判断非幂等请求能否安全重试
+        state = {'sent': False}
+
+        # 先取令牌再占并发名额，等待令牌的请求不会占住其他主机可用的连接
+        await (self.limiter or get_limiter()).acquire_async(host)
+        async with self._host_semaphore(host), self._global:
+            start_time = time.time()
+            try:
+                status, resp_headers, set_cookies, body, truncated = await asyncio.wait_for(
+                    self._exchange(host, port, payload, method, limits, state), timeout)
+            except Exception as e:
+                return HttpResponse(elapsed=time.time() - start_time, error=describe_error(e), sent=state['sent'])
+            return HttpResponse(status, resp_headers, set_cookies, body, time.time() - start_time,
+                                truncated=truncated)
+
+    async def _exchange(self, host, port, payload, method, limits, state):
+        key = (host, int(port))
+        conn = self._checkout(key)
+        if conn is not None:
+            try:
+                return await self._roundtrip(key, conn, payload, method, limits, state)
+            except ServerClosedError:
+                # 复用的连接可能刚被服务器关闭，换一条新连接重试一次；
+                # 只有一个字节都没收到时才重发，读到一半断开说明请求已经被处理 (执行命令的POST不能执行两遍)
+                self.stats['stale'] += 1
+        conn = await asyncio.open_connection(host, key[1], limit=STREAM_LIMIT)
+        self.stats['opened'] += 1
+        return await self._roundtrip(key, conn, payload, method, limits, state)
+
+    async def _roundtrip(self, key, conn, payload, method, limits, state):
+        reader, writer = conn
+        reusable = False
+        buffer = BodyBuffer(*limits)
+        try:
+            state['sent'] = True
+            try:
+                writer.write(payload)
+                await writer.drain()
+            except ConnectionError as e:
+                # 请求没能完整写出，服务器不会处理半个请求
+                raise ServerClosedError("服务器未返回数据即关闭连接") from e
+            status, headers, set_cookies, body, reusable = await read_response(reader, method, buffer)
+            return status, headers, set_cookies, body, buffer.truncated
+        finally:
+            # 超时取消或读取出错时 reusable 仍为 False，连接直接关闭
+            if reusable and self.keep_alive:
+                self._checkin(key, reader, writer)
+            else:
+                writer.close()
+
+    def _checkout(self, key):
+        """取出一条仍然可用的空闲连接，顺带关闭已失效的连接"""
+        idle = self._idle.get(key)
+        now = time.monotonic()
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if writer.is_closing() or reader.at_eof() or now - last_used > self.idle_timeout:
+                writer.close()
+                self.stats['stale'] += 1
+                continue
+            self.stats['reused'] += 1
+            return reader, writer
+        return None
+
+    def _checkin(self, key, reader, writer):
+        """归还连接，超过池大小时直接关闭"""
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.pool_size:
+            idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+
+    def close(self):
+        """关闭所有空闲连接和事件循环"""
+        for idle in self._idle.values():
+            for _, writer, _ in idle:
+                writer.close()
+        self._idle = {}
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.run_until_complete(asyncio.sleep(0))  # 让关闭动作落地
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+            self._loop.close()
+        self._loop = None
+        self._global = None
+        self._hosts = {}
+
+    def run(self, items, worker, on_result=None):
+        """
+        在当前线程运行事件循环处理一批目标，直到全部完成
+
+        参数:
+            items: 可迭代的目标，可以是惰性或阻塞的生成器 (会在后台线程中读取)
+            worker: 协程函数 worker(item)，返回任意结果
+            on_result: 回调 on_result(item, result)，按完成顺序在事件循环线程中调用
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._run(items, worker, on_result))
+
+    def fetch_all(self, items, build, on_result=None, retry=None):
+        """
+        run() 的简化形式: build(item) 返回 request() 的关键字参数字典
+
+        参数:
+            items: 可迭代的目标
+            build: 函数 build(item) -> dict(method=..., host=..., port=..., path=..., ...)
+            on_result: 回调 on_result(item, HttpResponse)
+            retry: RetryPolicy 重试策略，None 表示不重试
+        """
+        async def worker(item):
+            if retry is not None:
+                return await retry.call_async(self.request, **build(item))
+            return await self.request(**build(item))
+
+        self.run(items, worker, on_result)
+
+    async def _run(self, items, worker, on_result):
+        in_flight = asyncio.Semaphore(self.max_concurrency * 2)
+        tasks = set()
+
+        async def guard(item):
+            try:
+                result = await worker(item)
+                if on_result:
+                    on_result(item, result)
+            except Exception as e:
+                print(f"[-] 处理目标 {item} 时出错: {e}")
+            finally:
+                in_flight.release()
+
+        async for item in self._iter_source(items):
+            await in_flight.acquire()
+            task = asyncio.create_task(guard(item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _iter_source(self, items):
+        """列表等内存序列直接遍历，其他可迭代对象在后台线程中读取，避免阻塞事件循环"""
+        if isinstance(items, (list, tuple, range)):
+            for item in items:
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue(maxsize=self.max_concurrency)
+
+        def feed():
+            try:
+                for item in items:
+                    asyncio.run_coroutine_threadsafe(inbox.put(item), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(inbox.put(_DONE), loop).result()
+
+        feeder = loop.run_in_executor(None, feed)
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            yield item
+        await feeder
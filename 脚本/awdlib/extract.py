@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+flag提取 - 多个flag模式合并为一个带命名分组的正则，每段文本只扫描一遍
+
+原来对每个模式各调用一次 re.findall，七个模式就要把整个响应读七遍，
+结果再用列表逐个判断是否重复；响应多、页面大时提取比请求还慢。
+这里按模式顺序拼成一个交替正则，用 finditer 单次扫描，由命名分组得知命中的是哪个模式，
+用集合去重并保持出现顺序。同一位置有多个模式能匹配时，列表中靠前的模式优先。
+
+命名分组是放在每个分支末尾的空分组 (?P<pN>)，而不是包住整个分支: 分支以普通字符开头时，
+正则引擎会先比较第一个字符再决定是否进入分支，包一层分组后这个快速判断就失效了，
+合并后的正则反而比逐个扫描还慢。
+
+响应文件 (例如通过shell导出的 ls -laR、数据库内容) 可能有几百MB，不再整个读入内存解码:
+scan_file 用 bytes 正则在 mmap 映射的窗口上扫描，每次只映射一个窗口，
+相邻窗口之间留出重叠，跨窗口边界的flag也能完整匹配。
+"""
+
+import mmap
+import os
+import re
+
+# 默认的flag模式，同一位置靠前的模式优先
+FLAG_PATTERNS = [
+    r'flag\{([^\}]*)\}',  # flag{...} 格式
+    r'FLAG\{([^\}]*)\}',  # FLAG{...} 格式
+    r'flag=([a-zA-Z0-9]{32})',  # flag=32位字符 格式
+    r'FLAG=([a-zA-Z0-9]{32})',  # FLAG=32位字符 格式
+    # 恰好32/40/64位的字符串（可能是MD5/SHA1/SHA256），三种长度合为一个分支只需尝试一次
+    r'(?<![a-zA-Z0-9])[a-zA-Z0-9]{32}(?:[a-zA-Z0-9]{8}(?:[a-zA-Z0-9]{24})?)?(?![a-zA-Z0-9])',
+]
+
+# 扫描文件时每个窗口的大小 (字节)
+SCAN_CHUNK = 8 << 20
+# 相邻窗口的重叠字节数，应大于flag的最大长度
+SCAN_OVERLAP = 4096
+
+# 以 flag{ / FLAG{ 开头的模式保留完整的 flag{...}，其他带分组的模式只取分组内容
+_FULL_FORMAT = re.compile(r'(?i)flag\\\{')
+
+
+class FlagMatcher:
+    """
+    合并后的flag匹配器
+
+    参数:
+        patterns: 正则字符串列表，默认 FLAG_PATTERNS
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = list(FLAG_PATTERNS if patterns is None else patterns)
+        combined = '|'.join(f'(?:{pattern})(?P<p{i}>)' for i, pattern in enumerate(self.patterns))
+        self.regex = re.compile(combined)
+        # 扫描文件用的 bytes 版本，分组序号与 str 版本一致
+        self.bytes_regex = re.compile(combined.encode('utf-8'))
+        # 分组名 -> 取值的分组序号，0 表示整个匹配 (模式内部的分组序号在合并后会整体后移)
+        self.value_groups = {}
+        for i, pattern in enumerate(self.patterns):
+            groups = re.compile(pattern).groups
+            if groups and not _FULL_FORMAT.match(pattern):
+                self.value_groups[f'p{i}'] = self.regex.groupindex[f'p{i}'] - groups
+            else:
+                self.value_groups[f'p{i}'] = 0
+
+    def iter_flags(self, content):
+        """按出现顺序逐个产出匹配到的flag (不去重)"""
+        value_groups = self.value_groups
+        for match in self.regex.finditer(content):
+            yield match.group(value_groups[match.lastgroup])
+
+    def iter_file(self, path, chunk_size=SCAN_CHUNK, overlap=SCAN_OVERLAP):
+        """
+        按窗口映射文件并逐个产出匹配到的flag (不去重)
+
+        每个窗口负责起点落在 [pos, end) 内的匹配，向后多映射 overlap 字节让这些匹配能完整结束，
+        向前多映射一段让后顾断言能看到窗口前面的字节。结果与整个文件一次扫描相同，
+        只要单个flag不长于 overlap。
+        """
+        value_groups = self.value_groups
+        granularity = mmap.ALLOCATIONGRANULARITY
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            pos = 0
+            while pos < size:
+                end = min(size, pos + chunk_size)
+                window_end = min(size, end + overlap)
+                # 映射起点必须按系统的分配粒度对齐
+                base = max(0, pos - overlap) // granularity * granularity
+                flags = []
+                next_pos = end
+                with mmap.mmap(f.fileno(), window_end - base, offset=base, access=mmap.ACCESS_READ) as view:
+                    for match in self.bytes_regex.finditer(view, pos - base, window_end - base):
+                        start = base + match.start()
+                        if start >= end:
+                            break
+                        # 匹配恰好落在窗口末尾时可能还没匹配完整 (贪婪模式、后顾断言)，从它的起点开始下一个窗口
+                        if base + match.end() == window_end < size and start > pos:
+                            next_pos = start
+                            break
+                        next_pos = max(next_pos, base + match.end())
+                        flags.append(match.group(value_groups[match.lastgroup]))
+                for flag in flags:
+                    yield flag.decode('utf-8', errors='ignore')
+                pos = next_pos
+
+    def findall(self, content):
+        """
+        单次扫描文本，返回去重后的flag
+
+        参数:
+            content: 响应文本
+
+        返回值:
+            list: 按首次出现顺序排列的flag
+        """
+        return _unique(self.iter_flags(content))
+
+    def scan_file(self, path, chunk_size=SCAN_CHUNK, overlap=SCAN_OVERLAP):
+        """
+        用 mmap 按窗口扫描文件，内存占用与文件大小无关
+
+        参数:
+            path: 文件路径
+            chunk_size: 每个窗口的大小 (字节)
+            overlap: 相邻窗口的重叠字节数
+
+        返回值:
+            list: 按首次出现顺序排列的flag
+        """
+        return _unique(self.iter_file(path, chunk_size, overlap))
+
+
+def _unique(flags):
+    """用集合去重并保持首次出现的顺序"""
+    result = []
+    seen = set()
+    for flag in flags:
+        if flag not in seen:
+            seen.add(flag)
+            result.append(flag)
+    return result
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+并行提取 - 把响应文件分给进程池计算哈希和扫描flag，同时在途的任务数有上限
+
+正则匹配是CPU密集的，单进程受GIL限制只能用一个核心；响应目录很大时提取会成为瓶颈。
+主进程先用索引按大小和修改时间挑出未变化的文件 (不需要读文件)，
+其余文件交给子进程计算内容哈希、扫描flag，结果按完成顺序返回，由主进程写回索引。
+在途任务数有上限，目录里有几万个文件时也不会一次把所有任务塞进队列。
+
+子进程启动时会重新导入调用脚本 (Windows 下以 spawn 方式启动)，
+调用脚本的入口要放在 if __name__ == "__main__": 之下。
+"""
+
+import concurrent.futures
+
+from .extract import FlagMatcher
+from .index import scan_entry, UNCHANGED
+from .shard import resolve_processes
+
+# 每个进程平均的在途任务数
+IN_FLIGHT_PER_PROCESS = 4
+
+# 子进程中的匹配器和已知内容哈希，由 _init_worker 设置
+_matcher = None
+_known_digests = frozenset()
+_with_digest = True
+
+
+def _init_worker(patterns, known_digests, with_digest):
+    global _matcher, _known_digests, _with_digest
+    _matcher = FlagMatcher(patterns)
+    _known_digests = known_digests
+    _with_digest = with_digest
+
+
+def _scan(file_path):
+    return scan_entry(_matcher, file_path, _known_digests, _with_digest)
+
+
+def extract_files(file_paths, matcher, index=None, processes=0, max_in_flight=None):
+    """
+    提取一批响应文件中的flag
+
+    参数:
+        file_paths: 文件路径列表
+        matcher: FlagMatcher
+        index: ExtractIndex 增量索引，None 表示每个文件都扫描
+        processes: 进程数，0 或 None 表示全部CPU核心，1 表示在当前进程中扫描
+        max_in_flight: 同时提交给进程池的任务数上限，默认每个进程 IN_FLIGHT_PER_PROCESS 个
+
+    返回值:
+        生成器，按完成顺序产出 (文件路径, flag列表, 来源, 错误)，
+        来源为 index 中的 SCANNED / UNCHANGED / KNOWN_CONTENT (不使用索引时为 None)，出错时 flag列表为空
+    """
+    todo = []
+    for file_path in file_paths:
+        try:
+            flags = index.lookup(file_path) if index is not None else None
+        except OSError as e:
+            yield file_path, [], None, str(e)
+            continue
+        if flags is not None:
+            yield file_path, flags, UNCHANGED, None
+        else:
+            todo.append(file_path)
+
+    processes = min(resolve_processes(processes), len(todo))
+    if processes <= 1:
+        for file_path in todo:
+            try:
+                yield (file_path, *_record(index, file_path, scan_entry(matcher, file_path, _digests(index),
+                                                                         index is not None)), None)
+            except Exception as e:
+                yield file_path, [], None, str(e)
+        return
+
+    max_in_flight = max_in_flight or processes * IN_FLIGHT_PER_PROCESS
+    initargs = (matcher.patterns, frozenset(_digests(index)), index is not None)
+    with concurrent.futures.ProcessPoolExecutor(processes, initializer=_init_worker, initargs=initargs) as pool:
+        pending = {}
+        for file_path in todo:
+            if len(pending) >= max_in_flight:
+                yield from _collect(index, pending)
+            pending[pool.submit(_scan, file_path)] = file_path
+        while pending:
+            yield from _collect(index, pending)
+
+
+def _digests(index):
+    return index.digests if index is not None else ()
+
+
+def _record(index, file_path, entry):
+    if index is None:
+        return entry[3], None
+    return index.record(file_path, *entry)
+
+
+def _collect(index, pending):
+    """等待至少一个任务完成，产出已完成任务的结果"""
+    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+    for future in done:
+        file_path = pending.pop(future)
+        try:
+            yield (file_path, *_record(index, file_path, future.result()), None)
+        except Exception as e:
+            yield file_path, [], None, str(e)
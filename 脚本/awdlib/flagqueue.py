@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+提交队列 - 按轮次新旧和截止时间排序的有界队列，已经无法得分的flag直接丢弃
+
+flag在轮次切换后失效，原来的提交队列按文件列表顺序先进先出:
+responses/ 里上一轮留下的旧响应排在前面，本轮新拿到的flag要等它们提交完 (或重试到超时) 才轮到。
+这里按 (轮次从新到旧, 截止时间从早到晚, 入队顺序) 出队，本轮的flag永远排在旧flag之前；
+入队和出队时都检查剩余时间，离截止时间不足 min_remaining 秒的flag不再占用提交带宽。
+
+flag的轮次由拿到它的时间 (例如响应文件的修改时间) 决定，截止时间为该轮之后第 valid_rounds 轮的开始，
+轮次编号由 rounds.round_of 按 round_seconds 和 round_start 换算，与 ledger、candidates 一致。
+
+接口与 queue.Queue 的 put/get/get_nowait 相同，可以直接交给 submit.take_batch；
+表示结束的哨兵值排在所有flag之后，也不会过期。
+"""
+
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+
+from .rounds import ROUND_SECONDS, ROUND_START, round_of, round_begins
+
+# flag在拿到它的那一轮之后还有效的轮数，1 表示只在本轮有效
+VALID_ROUNDS = 1
+# 离截止时间不足该秒数的flag不再提交，来不及拿到服务器的响应
+MIN_REMAINING = 1.0
+
+
+class FlagQueue:
+    """
+    按轮次和截止时间排序的提交队列，线程安全
+
+    参数:
+        maxsize: 队列长度上限，0 表示不限；满时 put 阻塞 (先清理已过期的条目)
+        round_seconds: 每轮的时长 (秒)
+        valid_rounds: flag有效的轮数
+        min_remaining: 剩余时间不足该秒数的flag丢弃
+        stop: 表示结束的哨兵值
+        round_start: 任意一轮的开始时间戳，见 rounds
+    """
+
+    def __init__(self, maxsize=0, round_seconds=ROUND_SECONDS, valid_rounds=VALID_ROUNDS,
+                 min_remaining=MIN_REMAINING, stop=None, round_start=ROUND_START):
+        self.maxsize = maxsize
+        self.round_seconds = round_seconds
+        self.round_start = round_start
+        self.valid_rounds = valid_rounds
+        self.min_remaining = min_remaining
+        self.stop = stop
+        # 因剩余时间不足而丢弃的flag数
+        self.dropped = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def round_of(self, timestamp):
+        return round_of(timestamp, self.round_seconds, self.round_start)
+
+    def expires_at(self, captured_at):
+        """
+        返回在 captured_at 时拿到的flag的截止时间戳
+        """
+        return round_begins(self.round_of(captured_at) + self.valid_rounds, self.round_seconds, self.round_start)
+
+    def put(self, item, captured_at=None):
+        """
+        加入一个条目
+
+        参数:
+            item: 条目，原样由 get 返回
+            captured_at: 拿到flag的时间戳，默认为当前时间
+
+        返回值:
+            bool: False 表示已经来不及提交，直接丢弃
+        """
+        now = time.time()
+        if item is self.stop:
+            key = (math.inf, math.inf)
+        else:
+            captured_at = now if captured_at is None else captured_at
+            deadline = self.expires_at(captured_at)
+            if deadline - now < self.min_remaining:
+                with self._cond:
+                    self.dropped += 1
+                return False
+            key = (-self.round_of(captured_at), deadline)
+        with self._cond:
+            while self.maxsize and len(self._heap) >= self.maxsize:
+                if not self._purge(time.time()):
+                    self._cond.wait()
+            heapq.heappush(self._heap, (*key, next(self._seq), item))
+            self._cond.notify_all()
+        return True
+
+    def get(self, block=True, timeout=None):
+        """
+        取出轮次最新、截止时间最早的条目，途中遇到已过期的条目直接丢弃
+
+        返回值:
+            条目；不阻塞或超时后仍没有条目时抛出 queue.Empty
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                while self._heap:
+                    _, deadline, _, item = heapq.heappop(self._heap)
+                    self._cond.notify_all()
+                    if item is self.stop or deadline - now >= self.min_remaining:
+                        return item
+                    self.dropped += 1
+                if not block:
+                    raise queue.Empty
+                if end is None:
+                    self._cond.wait()
+                else:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Empty
+                    self._cond.wait(remaining)
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def qsize(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _purge(self, now):
+        """清理已过期的条目，返回清理的条数"""
+        kept = [entry for entry in self._heap if entry[3] is self.stop or entry[1] - now >= self.min_remaining]
+        removed = len(self._heap) - len(kept)
+        if removed:
+            heapq.heapify(kept)
+            self._heap = kept
+            self.dropped += removed
+            self._cond.notify_all()
+        return removed
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+目标健康缓存 - 跨轮次、跨重启记录每个端点的最近结果，对反复失败的端点做指数退避
+
+端点键由调用方决定，例如 'ip:port' 表示端口级别，'ip:port/shell路径' 表示某个shell。
+连续失败达到阈值后，端点进入退避期，期间 should_try() 返回 False；
+退避期满后放行一次重新探测，成功即恢复，失败则退避时间翻倍 (有上限)。
+
+读写都在锁内进行: 存活预筛线程调用 should_try 的同时，事件循环线程可能正在 record / save。
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+# 默认缓存文件
+HEALTH_FILE = 'health_cache.json'
+# 连续失败多少次后开始退避 (之前的失败仍然每轮重试)
+FAILURE_THRESHOLD = 2
+# 第一次退避时长与退避上限 (秒)
+BACKOFF_BASE = 120
+BACKOFF_MAX = 1800
+
+
+class HealthCache:
+    """
+    端点健康缓存
+
+    每个端点保存:
+        ok:         最近一次是否成功
+        failures:   连续失败次数
+        latency:    最近一次成功的耗时 (秒)
+        last_time:  最近一次记录的时间戳
+        next_retry: 退避结束的时间戳 (0 表示不在退避中)
+    """
+
+    def __init__(self, path=HEALTH_FILE, threshold=FAILURE_THRESHOLD,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.path = path
+        self.threshold = threshold
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """从磁盘加载缓存，文件不存在或损坏时从空缓存开始"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[-] 健康缓存 {self.path} 读取失败，已忽略: {e}")
+            entries = {}
+        with self._lock:
+            self.entries = entries
+
+    def save(self):
+        """原子写回磁盘，先写临时文件再替换，避免中断时留下半个文件"""
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            data = json.dumps(self.entries, ensure_ascii=False)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[-] 健康缓存 {self.path} 保存失败: {e}")
+
+    def get(self, key):
+        """返回端点记录的副本，没有记录时返回 None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            return dict(entry) if entry else None
+
+    def should_try(self, key, now=None):
+        """
+        判断本轮是否应该请求该端点
+
+        参数:
+            key: 端点键
+            now: 当前时间戳，默认 time.time()
+
+        返回值:
+            bool: 不在退避期内返回 True
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            next_retry = entry.get('next_retry') if entry else 0
+        if not next_retry:
+            return True
+        return (now or time.time()) >= next_retry
+
+    def record(self, key, ok, latency=None, now=None):
+        """
+        记录一次请求结果并更新退避状态
+
+        参数:
+            key: 端点键
+            ok: 本次是否成功
+            latency: 本次耗时 (秒)，仅成功时保存
+            now: 当前时间戳，默认 time.time()
+
+        返回值:
+            float: 退避结束的时间戳，0 表示不在退避中 (可以同步到 TargetTable.set_backoff)
+        """
+        now = now or time.time()
+        with self._lock:
+            entry = self.entries.setdefault(key, {'ok': False, 'failures': 0, 'latency': None,
+                                                  'last_time': 0, 'next_retry': 0})
+            entry['ok'] = ok
+            entry['last_time'] = now
+            if ok:
+                entry['failures'] = 0
+                entry['next_retry'] = 0
+                if latency is not None:
+                    entry['latency'] = round(latency, 4)
+                return 0
+
+            entry['failures'] += 1
+            over = entry['failures'] - self.threshold
+            if over >= 0:
+                delay = min(self.backoff_base * (2 ** over), self.backoff_max)
+                # 加一点抖动，避免大量端点在同一轮集中重新探测
+                entry['next_retry'] = now + delay * random.uniform(0.9, 1.1)
+            return entry['next_retry']
+
+    def backoff_count(self, now=None):
+        """返回当前处于退避期的端点数量"""
+        now = now or time.time()
+        with self._lock:
+            return sum(1 for entry in self.entries.values() if entry.get('next_retry', 0) > now)
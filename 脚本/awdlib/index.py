@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+增量提取索引 - 记录每个响应文件的大小、修改时间、内容哈希和提取到的flag，跨次运行保存
+
+提取脚本经常反复运行，而 responses/ 中大部分文件自上次以来并没有被改写:
+大小和修改时间都没变的文件直接使用上次的结果，连哈希也不用计算；
+文件变了但内容哈希已经见过 (例如很多队伍返回相同的页面) 时也不再扫描。
+只有真正新的内容才会交给正则，频繁重跑只需处理新增的数据。
+
+flag模式改变后旧结果不再可信，加载时发现模式指纹不同就整个丢弃。
+"""
+
+import hashlib
+import json
+import os
+
+# 默认索引文件
+INDEX_FILE = 'extract_index.json'
+# 计算哈希时每次读取的字节数
+HASH_CHUNK = 1 << 20
+
+# extract() 返回的结果来源
+SCANNED = 'scanned'
+UNCHANGED = 'unchanged'
+KNOWN_CONTENT = 'known'
+
+
+def file_digest(path):
+    """分块计算文件内容的哈希，内存占用与文件大小无关"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_entry(matcher, file_path, known_digests=(), with_digest=True):
+    """
+    计算文件的大小、修改时间、内容哈希，内容哈希未见过时再扫描flag
+
+    只依赖参数，可以在子进程中执行 (见 extractpool)。
+
+    参数:
+        matcher: FlagMatcher
+        file_path: 文件路径
+        known_digests: 已经扫描过的内容哈希集合
+        with_digest: 是否计算内容哈希，不使用索引时可以省掉
+
+    返回值:
+        tuple: (size, mtime, digest, flags)，内容已知时 flags 为 None，不计算哈希时 digest 为 None
+    """
+    stat = os.stat(file_path)
+    digest = file_digest(file_path) if with_digest else None
+    if digest is not None and digest in known_digests:
+        return stat.st_size, stat.st_mtime_ns, digest, None
+    return stat.st_size, stat.st_mtime_ns, digest, matcher.scan_file(file_path)
+
+
+def patterns_fingerprint(patterns):
+    """flag模式列表的指纹"""
+    return hashlib.blake2b('\n'.join(patterns).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ExtractIndex:
+    """
+    响应文件 -> flag 的增量索引
+
+    保存:
+        files:   文件路径 -> {size, mtime, digest}
+        digests: 内容哈希 -> 提取到的flag列表
+    """
+
+    def __init__(self, matcher, path=INDEX_FILE):
+        self.matcher = matcher
+        self.path = path
+        self.fingerprint = patterns_fingerprint(matcher.patterns)
+        self.files = {}
+        self.digests = {}
+        self.load()
+
+    def load(self):
+        """从磁盘加载索引，文件不存在、损坏或flag模式已变化时从空索引开始"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[-] 提取索引 {self.path} 读取失败，已忽略: {e}")
+            return
+        if data.get('patterns') != self.fingerprint:
+            print(f"[+] flag模式已变化，重建提取索引 {self.path}")
+            return
+        self.files = data.get('files', {})
+        self.digests = data.get('digests', {})
+
+    def save(self):
+        """原子写回磁盘，先写临时文件再替换，避免中断时留下半个文件"""
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        data = json.dumps({'patterns': self.fingerprint, 'files': self.files, 'digests': self.digests},
+                          ensure_ascii=False)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[-] 提取索引 {self.path} 保存失败: {e}")
+
+    def lookup(self, file_path):
+        """
+        只看大小和修改时间判断文件是否未变化
+
+        返回值:
+            list: 未变化时为上次的flag列表，否则为 None
+        """
+        stat = os.stat(file_path)
+        entry = self.files.get(os.path.abspath(file_path))
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns \
+                and entry['digest'] in self.digests:
+            return list(self.digests[entry['digest']])
+        return None
+
+    def record(self, file_path, size, mtime, digest, flags):
+        """
+        记录 scan_entry 的结果
+
+        返回值:
+            tuple: (flag列表, 来源 SCANNED / KNOWN_CONTENT)
+        """
+        self.files[os.path.abspath(file_path)] = {'size': size, 'mtime': mtime, 'digest': digest}
+        if flags is None and digest in self.digests:
+            return list(self.digests[digest]), KNOWN_CONTENT
+        self.digests[digest] = flags
+        return list(flags), SCANNED
+
+    def extract(self, file_path):
+        """
+        提取文件中的flag，能用索引的结果就不再扫描
+
+        参数:
+            file_path: 文件路径
+
+        返回值:
+            tuple: (flag列表, 来源 SCANNED / UNCHANGED / KNOWN_CONTENT)
+        """
+        flags = self.lookup(file_path)
+        if flags is not None:
+            return flags, UNCHANGED
+        return self.record(file_path, *scan_entry(self.matcher, file_path, self.digests))
+
+    def prune(self, file_paths):
+        """
+        只保留本次仍存在的文件，以及它们引用的内容哈希，避免索引无限增长
+
+        参数:
+            file_paths: 本次扫描的文件路径列表
+        """
+        keep = {os.path.abspath(path) for path in file_paths}
+        self.files = {key: entry for key, entry in self.files.items() if key in keep}
+        used = {entry['digest'] for entry in self.files.values()}
+        self.digests = {digest: flags for digest, flags in self.digests.items() if digest in used}
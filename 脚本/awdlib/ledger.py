@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+提交账本 - 用 SQLite (WAL模式) 记录每个flag的来源目标、轮次、提交时间和服务器的判定，跨次运行保存
+
+原来的去重集合只在一次运行内有效: 每次重跑都会把 responses/ 里还在的flag全部重新提交，
+运行到一半崩溃后也不知道哪些已经发出去了。现在提交分两步:
+    claim()  提交前先在账本中占位 (pending)，同一个flag只有一次占位能成功
+    finish() 拿到服务器的响应后写入判定；没拿到响应 (连接失败等) 时 release()，之后可以重新占位
+占位和写入都在事务中完成并立即落盘，查重走 flag 主键，开销很小。
+flag每轮都不同，只按flag查重: 跨过轮次边界后重跑脚本，responses/ 里已经提交过的flag也不会再提交。
+记录中的轮次是拿到flag的轮次 (由调用方按响应文件的修改时间等传入)，不是占位时的轮次。
+崩溃时停留在 pending 的flag不知道服务器是否收到，默认不再重复提交；
+如果比赛允许重复提交，可以设置 retry_interrupted_after 让超过该时间的 pending 记录重新占位。
+
+多个线程共用一个连接，由锁串行化；多个进程 (例如流水线和提取脚本同时运行) 由SQLite的文件锁保证占位唯一。
+"""
+
+import sqlite3
+import threading
+import time
+
+from .rounds import ROUND_SECONDS, ROUND_START, round_of
+
+# 默认账本文件
+LEDGER_FILE = 'flag_ledger.db'
+
+# 记录状态
+PENDING = 'pending'    # 已占位，正在提交 (或提交时崩溃)
+DONE = 'done'          # 已拿到服务器的判定
+FAILED = 'failed'      # 没有拿到响应，可以重新占位
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    round        INTEGER NOT NULL,
+    flag         TEXT    NOT NULL,
+    target       TEXT,
+    status       TEXT    NOT NULL,
+    verdict      TEXT,
+    response     TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 1,
+    claimed_at   REAL    NOT NULL,
+    submitted_at REAL,
+    PRIMARY KEY (flag)
+);
+CREATE INDEX IF NOT EXISTS submissions_status ON submissions (status);
+"""
+
+
+class FlagLedger:
+    """
+    flag提交账本
+
+    参数:
+        path: SQLite 数据库文件
+        round_seconds: 每轮的时长 (秒)
+        retry_interrupted_after: pending 超过该时间 (秒) 视为上次崩溃中断，可以重新提交；None 表示从不重新提交
+        round_start: 任意一轮的开始时间戳，轮次编号见 rounds.round_of
+    """
+
+    def __init__(self, path=LEDGER_FILE, round_seconds=ROUND_SECONDS, retry_interrupted_after=None,
+                 round_start=ROUND_START):
+        self.path = path
+        self.round_seconds = round_seconds
+        self.round_start = round_start
+        self.retry_interrupted_after = retry_interrupted_after
+        self._lock = threading.Lock()
+        # 自动提交模式: 每条语句单独成为一个事务并立即落盘
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self._migrate()
+        self.conn.executescript(_SCHEMA)
+
+    def _migrate(self):
+        """旧版账本按 (轮次, flag) 查重，改为按 flag 查重；同一个flag的多条记录优先保留已拿到判定的"""
+        columns = self.conn.execute('PRAGMA table_info(submissions)').fetchall()
+        if not any(name == 'round' and pk for _, name, _, _, _, pk in columns):
+            return
+        self.conn.executescript(
+            'BEGIN; ALTER TABLE submissions RENAME TO submissions_old; DROP INDEX IF EXISTS submissions_status;'
+            + _SCHEMA +
+            'INSERT OR IGNORE INTO submissions SELECT * FROM submissions_old '
+            "ORDER BY status = 'done' DESC, round DESC; DROP TABLE submissions_old; COMMIT;")
+
+    def current_round(self):
+        return round_of(time.time(), self.round_seconds, self.round_start)
+
+    def interrupted(self):
+        """
+        返回停留在 pending 状态的记录数，通常是上次运行在提交时崩溃留下的
+
+        返回值:
+            int: 记录数
+        """
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM submissions WHERE status = ?', (PENDING,)).fetchone()[0]
+
+    def claim(self, flag, target=None, captured_at=None):
+        """
+        提交前占位
+
+        参数:
+            flag: 要提交的flag
+            target: 来源目标
+            captured_at: 拿到flag的时间戳 (例如响应文件的修改时间)，记录为flag所在的轮次，默认为当前时间
+
+        返回值:
+            bool: True 表示占位成功，应该提交；False 表示已经提交过 (或正在提交)
+        """
+        now = time.time()
+        captured_round = round_of(now if captured_at is None else captured_at, self.round_seconds, self.round_start)
+        stale_before = now - self.retry_interrupted_after if self.retry_interrupted_after is not None else 0
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO submissions (round, flag, target, status, claimed_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (flag) DO UPDATE SET status = excluded.status, target = excluded.target, '
+                'claimed_at = excluded.claimed_at, attempts = attempts + 1 '
+                'WHERE status = ? OR (status = ? AND claimed_at < ?)',
+                (captured_round, flag, target, PENDING, now, FAILED, PENDING, stale_before))
+            return cursor.rowcount == 1
+
+    def finish(self, flag, verdict, response=None):
+        """
+        写入服务器的判定
+
+        参数:
+            flag: flag
+            verdict: 判定，例如 accepted / rejected
+            response: 服务器的响应内容
+        """
+        self._update(flag, DONE, verdict, response)
+
+    def release(self, flag, error=None):
+        """没有拿到服务器响应时释放占位，之后可以重新提交"""
+        self._update(flag, FAILED, None, error)
+
+    def _update(self, flag, status, verdict, response):
+        with self._lock:
+            self.conn.execute(
+                'UPDATE submissions SET status = ?, verdict = ?, response = ?, submitted_at = ? '
+                'WHERE flag = ? AND status = ?',
+                (status, verdict, response, time.time(), flag, PENDING))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
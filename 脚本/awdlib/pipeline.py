@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+内存流水线 - 获取到的响应直接经有界队列送去提取flag，再送去提交，不经过磁盘
+
+原来的流程是获取脚本把响应写进 responses/，再运行一次提取脚本读回来提交，
+自动化运行器把两个脚本串行执行，一个flag从拿到到提交要等整整一个脚本周期。
+流水线模式下:
+    获取线程 --feed()--> 提取队列 --> 提取线程 --> 提交队列 --> 提交线程
+每一级之间是有界队列，下游跟不上时上游会阻塞等待 (背压)，内存占用有上限。
+写响应文件只是可选的旁路输出，在提取线程中于flag入队之后执行，不会拖慢提交。
+提交队列是 FlagQueue: 跨过轮次边界时新一轮的flag先提交，来不及提交的旧flag直接丢弃。
+"""
+
+import queue
+import threading
+import time
+
+from .flagqueue import FlagQueue, ROUND_SECONDS, ROUND_START, VALID_ROUNDS
+from .submit import take_batch
+from .timeouts import percentile
+
+# 等待提取的响应数上限
+EXTRACT_QUEUE_SIZE = 256
+# 等待提交的flag数上限
+SUBMIT_QUEUE_SIZE = 1000
+
+_STOP = object()
+
+
+class FlagPipeline:
+    """
+    获取 -> 提取 -> 提交 流水线，创建后各级线程立即启动
+
+    参数:
+        extract: extract(text) -> flag列表
+        submit: submit([(flag, target), ...]) -> 与之一一对应的结果字典列表，结果至少包含 success，
+                有 verdict 时按判定计数；结果为 None 表示已提交过而跳过
+        sink: 可选的旁路输出 sink(target, text, context)，例如把响应写入文件，返回真值时计入 saved
+        accept: 可选的过滤 accept(target, flags) -> 需要提交的flag列表，例如跳过静态候选
+        submit_workers: 提交线程数
+        submit_batch_size: 每个提交线程一次最多取出的flag数，用于批量提交适配器
+        round_seconds / valid_rounds / round_start: 每轮的时长、flag有效的轮数和轮次起点，见 FlagQueue
+    """
+
+    def __init__(self, extract, submit, sink=None, accept=None, extract_queue_size=EXTRACT_QUEUE_SIZE,
+                 submit_queue_size=SUBMIT_QUEUE_SIZE, submit_workers=1, submit_batch_size=1,
+                 round_seconds=ROUND_SECONDS, valid_rounds=VALID_ROUNDS, round_start=ROUND_START):
+        self.extract = extract
+        self.submit = submit
+        self.sink = sink
+        self.accept = accept
+        self.submit_batch_size = submit_batch_size
+        self.extract_queue = queue.Queue(extract_queue_size)
+        self.submit_queue = FlagQueue(submit_queue_size, round_seconds, valid_rounds, stop=_STOP,
+                                      round_start=round_start)
+        self.seen = set()
+        self.stats = {'bodies': 0, 'flags': 0, 'submitted': 0, 'success': 0, 'fail': 0, 'skipped': 0, 'saved': 0,
+                      'verdicts': {}}
+        # 每个flag从 feed() 到提交完成的耗时 (秒)
+        self.latencies = []
+        self._lock = threading.Lock()
+        self._extractor = threading.Thread(target=self._extract_loop, daemon=True)
+        self._extractor.start()
+        self._submitters = [threading.Thread(target=self._submit_loop, daemon=True) for _ in range(submit_workers)]
+        for thread in self._submitters:
+            thread.start()
+
+    def feed(self, target, text, context=None):
+        """
+        送入一个响应，提取队列满时阻塞
+
+        参数:
+            target: 目标标识
+            text: 响应文本
+            context: 原样传给 sink 的附加信息，例如状态码
+        """
+        self.extract_queue.put((target, text, context, time.perf_counter(), time.time()))
+
+    def _extract_loop(self):
+        while True:
+            item = self.extract_queue.get()
+            if item is _STOP:
+                break
+            target, text, context, fetched, captured_at = item
+            try:
+                flags = self.extract(text) if text else []
+                if self.accept is not None:
+                    flags = self.accept(target, flags)
+                self.stats['bodies'] += 1
+                for flag in flags:
+                    # 同一个flag只提交一次
+                    if flag in self.seen:
+                        continue
+                    self.seen.add(flag)
+                    self.stats['flags'] += 1
+                    self.submit_queue.put((target, flag, fetched), captured_at)
+            except Exception as e:
+                print(f"[-] 提取 {target} 的响应时出错: {e}")
+            if self.sink is not None:
+                try:
+                    if self.sink(target, text, context):
+                        self.stats['saved'] += 1
+                except Exception as e:
+                    print(f"[-] 保存 {target} 的响应时出错: {e}")
+
+    def _submit_loop(self):
+        stopped = False
+        while not stopped:
+            # 队列中已积压的flag一起取出，批量适配器一个请求就能提交
+            items, stopped = take_batch(self.submit_queue, self.submit_batch_size, _STOP)
+            if not items:
+                continue
+            try:
+                results = self.submit([(flag, target) for target, flag, _ in items])
+            except Exception as e:
+                print(f"[-] 提交 {len(items)} 个flag时出错: {e}")
+                results = [{'success': False}] * len(items)
+            done = time.perf_counter()
+            with self._lock:
+                for (_, _, fetched), result in zip(items, results):
+                    if result is None:
+                        self.stats['skipped'] += 1
+                        continue
+                    self.stats['submitted'] += 1
+                    self.stats['success' if result.get('success') else 'fail'] += 1
+                    verdict = result.get('verdict')
+                    if verdict:
+                        self.stats['verdicts'][verdict] = self.stats['verdicts'].get(verdict, 0) + 1
+                    self.latencies.append(done - fetched)
+
+    def close(self):
+        """
+        等待已送入的响应全部提取、提交完成
+
+        返回值:
+            dict: 统计信息 bodies/flags/submitted/success/fail/skipped/saved/expired、各判定的次数 verdicts，
+                  以及获取到提交耗时的 p50/max (秒)
+        """
+        self.extract_queue.put(_STOP)
+        self._extractor.join()
+        for _ in self._submitters:
+            self.submit_queue.put(_STOP)
+        for thread in self._submitters:
+            thread.join()
+        stats = dict(self.stats, verdicts=dict(self.stats['verdicts']), expired=self.submit_queue.dropped)
+        if self.latencies:
+            stats['latency_p50'] = percentile(self.latencies, 50)
+            stats['latency_max'] = max(self.latencies)
+        return stats
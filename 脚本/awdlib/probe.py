@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+TCP存活预筛 - 在HTTP请求前并发探测目标端口，只把能建立连接的目标交给后续脚本
+
+探测在后台线程的 asyncio 事件循环中进行，使用非阻塞 connect 和很短的连接期限，
+被拒绝或不可达的目标只耗费毫秒级时间，不再占用 requests 的完整超时。
+探测结果以生成器形式按完成顺序逐个产出，调用方不必等待全部探测结束。
+"""
+
+import asyncio
+import queue
+import threading
+import time
+
+# 默认连接期限 (秒) 与同时进行的探测数
+CONNECT_TIMEOUT = 0.8
+MAX_CONCURRENCY = 256
+
+_DONE = object()
+
+
+async def check_port(ip, port, timeout=CONNECT_TIMEOUT):
+    """
+    尝试与 ip:port 建立TCP连接
+
+    参数:
+        ip: 目标IP
+        port: 目标端口
+        timeout: 连接期限 (秒)
+
+    返回值:
+        bool: 能否在期限内建立连接
+    """
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, int(port)), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def _probe_all(items, key, timeout, concurrency, emit):
+    """保持最多 concurrency 个探测同时进行，边消费输入边产出结果"""
+    source = iter(items)
+    pending = {}
+    exhausted = False
+
+    while pending or not exhausted:
+        while not exhausted and len(pending) < concurrency:
+            try:
+                item = next(source)
+            except StopIteration:
+                exhausted = True
+                break
+            ip, port = key(item)
+            pending[asyncio.ensure_future(check_port(ip, port, timeout))] = item
+
+        if not pending:
+            break
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            emit((pending.pop(task), task.result()))
+
+
+def iter_probe(items, key=None, timeout=CONNECT_TIMEOUT, concurrency=MAX_CONCURRENCY):
+    """
+    并发探测目标并按完成顺序产出 (item, alive)
+
+    参数:
+        items: 可迭代的目标，可以是惰性生成器
+        key: 从目标中取出 (ip, port) 的函数，默认目标本身就是 (ip, port)
+        timeout: 连接期限 (秒)
+        concurrency: 同时进行的探测数
+
+    返回值:
+        generator: 逐个产生 (item, alive) 元组
+    """
+    key = key or (lambda item: item)
+    results = queue.Queue()
+
+    def runner():
+        try:
+            asyncio.run(_probe_all(items, key, timeout, concurrency, results.put))
+        except BaseException as e:  # 把后台线程的异常交给调用方
+            results.put(e)
+        results.put(_DONE)
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    while True:
+        result = results.get()
+        if result is _DONE:
+            break
+        if isinstance(result, BaseException):
+            raise result
+        yield result
+    thread.join()
+
+
+def iter_alive(items, key=None, timeout=CONNECT_TIMEOUT, concurrency=MAX_CONCURRENCY):
+    """
+    只产出端口可连接的目标，结束时打印探测统计
+
+    参数:
+        items: 可迭代的目标，可以是惰性生成器
+        key: 从目标中取出 (ip, port) 的函数，默认目标本身就是 (ip, port)
+        timeout: 连接期限 (秒)
+        concurrency: 同时进行的探测数
+
+    返回值:
+        generator: 逐个产生可连接的目标 (原样返回 items 中的元素)
+    """
+    start_time = time.time()
+    total = alive = 0
+    for item, ok in iter_probe(items, key, timeout, concurrency):
+        total += 1
+        if ok:
+            alive += 1
+            yield item
+    print(f"[+] TCP存活预筛: 探测 {total} 个目标，可连接 {alive} 个，"
+          f"跳过 {total - alive} 个，耗时 {time.time() - start_time:.2f} 秒")
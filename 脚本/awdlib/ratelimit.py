@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+令牌桶限速 - 全局速率上限 + 每个目标主机独立的令牌桶，各主机之间轮转公平分配
+
+一个慢队伍不会占满所有worker，对flag服务器也不会突发大量请求而被限流或封禁。
+异步引擎的请求由调度协程按主机轮转发放令牌: 某主机的桶空了只会跳过该主机，
+不会挡住其他主机 (没有队头阻塞)。基于 requests 的请求通过共享会话的适配器限速，
+多个线程各自等待令牌。
+
+进程内默认共用一个限速器 (get_limiter)，异步引擎和共享会话都使用它，
+脚本启动时用 configure_limiter() 调整速率，用 set_host_rate() 单独限制flag服务器等主机。
+"""
+
+import asyncio
+import collections
+import threading
+import time
+
+# 默认速率 (请求/秒) 和突发量，速率为 0 或 None 表示不限制
+GLOBAL_RATE = 2000
+GLOBAL_BURST = 500
+HOST_RATE = 50
+HOST_BURST = 16
+
+
+class TokenBucket:
+    """令牌桶，速率为 rate 个/秒，最多积累 burst 个"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.last = time.monotonic()
+
+    def wait_time(self, now):
+        """补充令牌，返回还需等待多久才有一个令牌 (0 表示现在就有)"""
+        if not self.rate:
+            return 0
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate:
+            self.tokens -= 1
+
+
+class RateLimiter:
+    """
+    全局 + 每主机限速器
+
+    参数:
+        global_rate / global_burst: 所有请求合计的速率和突发量
+        host_rate / host_burst: 每个主机的默认速率和突发量
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE, global_burst=GLOBAL_BURST,
+                 host_rate=HOST_RATE, host_burst=HOST_BURST):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.buckets = {}
+        self.overrides = {}
+        self._lock = threading.Lock()
+        # 异步等待者: 主机 -> 等待令牌的 future 队列，字典顺序即轮转顺序
+        self._waiting = collections.OrderedDict()
+        self._dispatcher = None
+        self._dispatcher_loop = None
+
+    def set_host_rate(self, host, rate, burst=1):
+        """单独设置某个主机的速率，例如flag服务器"""
+        with self._lock:
+            self.overrides[host] = (rate, burst)
+            self.buckets[host] = TokenBucket(rate, burst)
+
+    def _bucket(self, host):
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            rate, burst = self.overrides.get(host, (self.host_rate, self.host_burst))
+            bucket = self.buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+    def reserve(self, host):
+        """
+        尝试为主机取一个令牌
+
+        返回值:
+            float: 0 表示已取得令牌 (全局和主机各扣一个)，否则为建议的等待时间 (秒)
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host)
+            wait = max(self.global_bucket.wait_time(now), bucket.wait_time(now))
+            if wait == 0:
+                self.global_bucket.take()
+                bucket.take()
+            return wait
+
+    def acquire(self, host):
+        """阻塞等待直到取得令牌 (线程中使用)"""
+        while True:
+            wait = self.reserve(host)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, host):
+        """在事件循环中等待令牌，同一时刻各主机的等待者按轮转顺序获得令牌"""
+        if not self._waiting and not self.reserve(host):
+            return  # 没有排队者且有令牌，直接通过
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.setdefault(host, collections.deque()).append(future)
+        # 调度协程属于某个事件循环，换了循环 (例如上一个引擎已关闭) 要重新启动
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher_loop is not loop:
+            self._dispatcher = loop.create_task(self._dispatch())
+            self._dispatcher_loop = loop
+        await future
+
+    async def _dispatch(self):
+        while self._waiting:
+            granted = False
+            min_wait = None
+            # 每个主机一轮最多放行一个等待者，放行后移到队尾
+            for host in list(self._waiting):
+                queue = self._waiting[host]
+                while queue and queue[0].done():
+                    queue.popleft()  # 等待者已被取消 (例如请求超时)
+                if not queue:
+                    del self._waiting[host]
+                    continue
+                wait = self.reserve(host)
+                if wait:
+                    min_wait = wait if min_wait is None else min(min_wait, wait)
+                    continue
+                queue.popleft().set_result(None)
+                granted = True
+                self._waiting.move_to_end(host)
+                if not queue:
+                    del self._waiting[host]
+            if not granted and min_wait:
+                await asyncio.sleep(min_wait)
+            else:
+                await asyncio.sleep(0)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_limiter():
+    """返回进程内共享的限速器"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RateLimiter()
+        return _default
+
+
+def configure_limiter(global_rate=GLOBAL_RATE, global_burst=GLOBAL_BURST, host_rate=HOST_RATE, host_burst=HOST_BURST):
+    """
+    用新的速率替换进程内共享的限速器，应在发出第一个请求前调用
+
+    返回值:
+        RateLimiter: 新的共享限速器
+    """
+    global _default
+    with _default_lock:
+        _default = RateLimiter(global_rate, global_burst, host_rate, host_burst)
+        return _default
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+重试策略 - 区分可重试的错误，指数退避加随机抖动，每轮的重试总数有上限
+
+超时、连接被重置、服务器返回 429/502/503/504 视为临时故障，值得再试；
+连接被拒绝 (端口没开)、其他4xx 等重试也不会变好，直接放弃。
+一轮内所有请求共用一个重试预算，网络抖动时不会因为大量重试把整轮时间拖长一倍。
+flag提交使用截止时间: 不限次数，一直重试到本轮结束前。
+
+执行命令的POST不是幂等的: 读取超时或读到一半连接被重置时请求已经发出，重试可能把命令执行两遍。
+idempotent=False 的策略只重试建立连接阶段的失败 (请求还没有发出) 和服务器明确拒绝处理的 429/503，
+与 session 中"已发出的请求不重试"一致。
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+# 默认每个请求最多尝试的次数 (含第一次)
+MAX_ATTEMPTS = 3
+# 第一次重试的退避上限与最大退避 (秒)
+BASE_DELAY = 0.2
+MAX_DELAY = 5.0
+# 可重试的HTTP状态码
+RETRYABLE_STATUS = (429, 502, 503, 504)
+# 非幂等请求可重试的HTTP状态码: 服务器明确表示没有处理该请求
+SAFE_RETRY_STATUS = (429, 503)
+# 异步引擎中可重试的错误描述 (见 engine.describe_error)
+RETRYABLE_ERRORS = ("连接超时", "连接被重置", "服务器未返回数据即关闭连接")
+
+
+def is_retryable_exception(error, idempotent=True):
+    """
+    判断 requests 或底层连接抛出的异常是否值得重试
+
+    参数:
+        error: 异常
+        idempotent: 请求是否幂等，False 时只有建立连接阶段的失败可以重试
+    """
+    try:
+        import requests
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(error, requests.exceptions.Timeout):
+            # 读取超时: 请求已经发出
+            return idempotent
+        if isinstance(error, requests.exceptions.ConnectionError):
+            # 端口未开放时重试也不会成功
+            if 'refused' in str(error).lower():
+                return False
+            # 连接池在建立连接失败时抛出 NewConnectionError，其他情况 (连接中断等) 请求都已发出
+            return idempotent or _is_connect_error(error)
+    except ImportError:
+        pass
+    if isinstance(error, ConnectionRefusedError):
+        return False
+    return idempotent and isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError))
+
+
+def _is_connect_error(error):
+    """requests 的 ConnectionError 是否发生在建立连接阶段 (原因为 urllib3 的 NewConnectionError)"""
+    try:
+        from urllib3.exceptions import NewConnectionError
+    except ImportError:
+        return False
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+
+def is_retryable_response(response, idempotent=True):
+    """
+    判断一次请求的结果是否值得重试
+
+    参数:
+        response: engine.HttpResponse (看 error 和 status) 或 requests.Response (看 status_code)
+        idempotent: 请求是否幂等，False 时只重试请求尚未发出的失败和 SAFE_RETRY_STATUS
+    """
+    error = getattr(response, 'error', None)
+    if error:
+        if not idempotent and getattr(response, 'sent', True):
+            return False
+        return error in RETRYABLE_ERRORS
+    status = getattr(response, 'status', None)
+    if status is None:
+        status = getattr(response, 'status_code', None)
+    return status in (RETRYABLE_STATUS if idempotent else SAFE_RETRY_STATUS)
+
+
+class RetryBudget:
+    """一轮内所有请求共用的重试次数上限，线程安全"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        """取一次重试机会，预算用完返回 False"""
+        with self._lock:
+            if self.limit is not None and self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    参数:
+        max_attempts: 每个请求最多尝试的次数 (含第一次)，None 表示不限次数 (需配合 deadline)
+        base_delay / max_delay: 指数退避的起点和上限 (秒)，实际等待时间在 [0, 上限] 内随机
+        budget: RetryBudget 本轮共用的重试预算，None 表示不限
+        deadline: 截止时间戳 (time.time())，超过后不再重试
+        idempotent: 请求是否幂等；执行命令、提交flag等POST传 False，请求发出后的失败不再重试
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 budget=None, deadline=None, idempotent=True):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.deadline = deadline
+        self.idempotent = idempotent
+
+    def next_delay(self, attempt):
+        """
+        第 attempt 次尝试失败后，计算下一次重试前的等待时间
+
+        返回值:
+            float: 等待时间 (秒)；不应再重试时返回 None
+        """
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return None
+        # 全抖动: 在 [0, 指数上限] 内均匀随机，避免大量请求同时重试
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if self.deadline is not None and time.time() + delay >= self.deadline:
+            return None
+        if self.budget is not None and not self.budget.take():
+            return None
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """
+        同步调用 func，遇到可重试的异常或响应时按策略重试
+
+        返回值:
+            func 最后一次的返回值；最后一次仍抛出异常时原样抛出
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_exception(e, self.idempotent):
+                    raise
+                delay = self.next_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                if not is_retryable_response(result, self.idempotent):
+                    return result
+                delay = self.next_delay(attempt)
+                if delay is None:
+                    return result
+                # 流式响应 (stream=True) 不会再读取，先关闭，否则它占用的连接不会回到连接池
+                close = getattr(result, 'close', None)
+                if close is not None:
+                    close()
+            time.sleep(delay)
+
+    async def call_async(self, func, *args, **kwargs):
+        """
+        在事件循环中调用协程函数 func (例如 engine.request)，按返回结果决定是否重试
+
+        返回值:
+            最后一次的返回值
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            result = await func(*args, **kwargs)
+            if not is_retryable_response(result, self.idempotent):
+                return result
+            delay = self.next_delay(attempt)
+            if delay is None:
+                return result
+            await asyncio.sleep(delay)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+轮次换算 - 把时间戳换算为比赛的轮次编号和每轮的开始时间
+
+比赛的轮次很少恰好从 Unix 纪元起每 ROUND_SECONDS 秒开始一轮，只按 时间戳 // ROUND_SECONDS 划分时，
+算出的截止时间和真实的轮次边界错开，还能得分的flag会被当作来不及提交而丢弃，flag也会记到错误的轮次。
+ROUND_START 设为任意一轮的开始时间戳 (例如第一轮开始的时间)，轮次编号 = (时间戳 - ROUND_START) // ROUND_SECONDS。
+ledger、flagqueue、candidates 和模拟器都使用这里的换算。
+"""
+
+# 每轮的时长 (秒)，与比赛的轮次一致
+ROUND_SECONDS = 120
+# 任意一轮的开始时间戳，0 表示轮次从 Unix 纪元起划分
+ROUND_START = 0
+
+
+def round_of(timestamp, round_seconds=ROUND_SECONDS, round_start=ROUND_START):
+    """
+    返回时间戳所在的轮次编号
+
+    参数:
+        timestamp: 时间戳 (time.time())
+        round_seconds: 每轮的时长 (秒)
+        round_start: 任意一轮的开始时间戳
+    """
+    return int((timestamp - round_start) // round_seconds)
+
+
+def round_begins(round_no, round_seconds=ROUND_SECONDS, round_start=ROUND_START):
+    """
+    返回轮次 round_no 的开始时间戳
+    """
+    return round_start + round_no * round_seconds
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+共享连接池会话 - 所有基于 requests 的请求共用一个带 keep-alive 连接池的 Session
+
+同一进程内 (例如 timer 循环的多轮之间) 对同一队伍服务和flag服务器的重复请求
+会复用已建立的TCP连接，省去握手。urllib3 在取出空闲连接前会检查连接是否已被
+对端关闭，失效的连接会被丢弃重建。
+
+所有请求经过共享限速器 (ratelimit.get_limiter)，按目标主机取令牌，
+对flag服务器等主机可以单独设置更低的速率。
+
+会话不保存任何Cookie: 同一IP不同端口属于不同队伍，共享Cookie会互相串扰；
+每个响应自己的 response.cookies 不受影响。
+"""
+
+import http.cookiejar
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .ratelimit import get_limiter
+
+# 缓存连接池的主机数 (每个 host:port 一个池)
+POOL_CONNECTIONS = 256
+# 每个主机保留的空闲连接数，应不小于并发线程数，否则多出的连接用完即被关闭
+POOL_MAXSIZE = 32
+
+_session = None
+_session_maxsize = 0
+_lock = threading.Lock()
+
+
+class _NoCookiePolicy(http.cookiejar.DefaultCookiePolicy):
+    """拒绝保存和发送任何Cookie"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """发送前按目标主机向共享限速器取令牌"""
+
+    def send(self, request, **kwargs):
+        get_limiter().acquire(urlsplit(request.url).hostname)
+        return super().send(request, **kwargs)
+
+
+def _build_session(pool_connections, pool_maxsize):
+    session = requests.Session()
+    session.cookies.set_policy(_NoCookiePolicy())
+    # 只在建立连接失败时重试一次；已发出的请求不重试，避免重复执行命令或重复提交
+    retry = Retry(total=1, connect=1, read=0, status=0, redirect=0, raise_on_status=False)
+    adapter = _RateLimitedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(pool_maxsize=POOL_MAXSIZE, pool_connections=POOL_CONNECTIONS):
+    """
+    获取进程内共享的连接池会话
+
+    参数:
+        pool_maxsize: 每个主机保留的空闲连接数，通常设为脚本的线程数
+        pool_connections: 缓存连接池的主机数
+
+    返回值:
+        requests.Session: 共享会话；请求更大的连接池时会重建一次
+    """
+    global _session, _session_maxsize
+    with _lock:
+        if _session is None or pool_maxsize > _session_maxsize:
+            if _session is not None:
+                _session.close()
+            _session = _build_session(pool_connections, pool_maxsize)
+            _session_maxsize = pool_maxsize
+        return _session
+
+
+def close_session():
+    """关闭共享会话及其所有连接"""
+    global _session, _session_maxsize
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_maxsize = 0
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+多进程分片 - 把展开后的目标分到多个子进程，每个进程运行自己的事件循环
+
+请求之后的正则匹配、解码、格式化都是CPU密集的，单进程受GIL限制只能用一个核心。
+分片模式下每个子进程独立完成 "请求 + 处理"，只把处理好的小结果通过共享队列送回主进程，
+主进程按到达顺序合并 (写文件、统计、保存缓存)，一轮可以用满攻击机的所有核心。
+
+目标按 (ip, 端口) 分片: 比赛中各队伍常常共用一个IP、只是端口不同 (例如 8.148.182.33:8802-8806)，
+按IP分片会让所有目标落在同一个进程里。同一IP的端口因此可能分到不同进程，
+对单个IP的礼貌由各进程按比例缩小的每主机速率和并发保证 (见 scaled_host_limits)，而不是靠分片。
+worker 必须是模块顶层函数 (Windows 下子进程以 spawn 方式启动，需要能被导入)，
+调用脚本的入口要放在 if __name__ == "__main__": 之下。
+"""
+
+import multiprocessing
+import os
+import queue as queue_module
+import zlib
+
+_RESULT = 'result'
+_DONE = 'done'
+
+
+def resolve_processes(processes):
+    """0 或 None 表示使用全部CPU核心"""
+    return processes or os.cpu_count() or 1
+
+
+def target_key(item):
+    """默认的分片依据: (ip, 端口)"""
+    return item[0], item[1]
+
+
+def split_targets(items, count, key=target_key):
+    """
+    按 key 的哈希把目标分成 count 份，key 相同的目标总在同一份中
+
+    参数:
+        items: 目标列表
+        count: 分片数
+        key: 从目标中取出分片依据的函数，默认为 (ip, 端口)
+
+    返回值:
+        list: count 个目标列表
+    """
+    shards = [[] for _ in range(count)]
+    for item in items:
+        # crc32 对同一字符串在各进程、各次运行中结果一致 (内置 hash 会随机化)
+        shards[zlib.crc32(str(key(item)).encode()) % count].append(item)
+    return shards
+
+
+class ShardContext:
+    """传给子进程 worker 的上下文，用 put() 把结果送回主进程"""
+
+    def __init__(self, queue, index, count):
+        self.queue = queue
+        self.index = index
+        self.count = count
+
+    def put(self, result):
+        self.queue.put((_RESULT, self.index, result))
+
+
+def _shard_main(worker, shard, queue, index, count, args):
+    try:
+        worker(shard, ShardContext(queue, index, count), *args)
+    except Exception as e:
+        print(f"[-] 分片 {index} 出错: {e}")
+    finally:
+        queue.put((_DONE, index, None))
+
+
+def scaled_host_limits(host_rate, host_burst, per_host_limit, share):
+    """
+    分片模式下每个进程的每主机速率、突发量和并发数
+
+    同一IP的端口可能分到不同进程，每个进程只用 share 比例，所有进程合计仍不超过单进程时的上限。
+
+    返回值:
+        tuple: (host_rate, host_burst, per_host_limit)
+    """
+    if share >= 1:
+        return host_rate, host_burst, per_host_limit
+    return (host_rate * share if host_rate else host_rate, max(1, int(host_burst * share)),
+            max(1, int(per_host_limit * share)))
+
+
+def run_sharded(items, worker, on_result, processes=None, args=(), key=target_key):
+    """
+    多进程处理一批目标
+
+    参数:
+        items: 可迭代的目标，会先全部展开再分片
+        worker: 顶层函数 worker(shard, ctx, *args)，在子进程中处理分到的目标，用 ctx.put(result) 送回结果
+        on_result: 主进程回调 on_result(result)，按结果到达顺序调用
+        processes: 进程数，0 或 None 表示全部CPU核心
+        args: 传给 worker 的额外参数 (需可序列化)
+        key: 分片依据，默认为 (ip, 端口)
+
+    返回值:
+        int: 实际启动的进程数
+    """
+    items = list(items)
+    count = max(1, min(resolve_processes(processes), len(items)))
+    shards = split_targets(items, count, key)
+    queue = multiprocessing.Queue()
+    workers = []
+    for index, shard in enumerate(shards):
+        if not shard:
+            continue
+        process = multiprocessing.Process(target=_shard_main, args=(worker, shard, queue, index, count, args),
+                                          daemon=True)
+        process.start()
+        workers.append((index, process))
+    print(f"[+] 分片模式: {len(items)} 个目标分到 {len(workers)} 个进程")
+
+    pending = {index: process for index, process in workers}
+    while pending:
+        try:
+            kind, index, result = queue.get(timeout=1)
+        except queue_module.Empty:
+            # 子进程异常退出 (例如被杀掉) 时不会发送结束标记，避免一直等待
+            for index, process in list(pending.items()):
+                if not process.is_alive() and process.exitcode != 0:
+                    print(f"[-] 分片 {index} 异常退出，退出码 {process.exitcode}")
+                    del pending[index]
+            continue
+        if kind == _DONE:
+            pending.pop(index, None)
+        else:
+            on_result(result)
+
+    for _, process in workers:
+        process.join()
+    return len(workers)
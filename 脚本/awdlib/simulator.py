@@ -0,0 +1,602 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟比赛环境 - 在本机端口上模拟N个队伍的服务和一个flag服务器，用于测量一轮的性能
+
+除了真实比赛的主机，之前没有任何可以反复测量脚本性能的对象。模拟环境在一个后台线程的事件循环中运行:
+    队伍服务 (每队一个端口 base_port + 队伍编号；host_per_team 时每队一个回环地址 127.0.x.y，端口都是 base_port):
+        /footer.php                     GET 返回带flag的页脚页面；shell 参数 (GET或POST) 作为命令执行
+        /includes/config.php?d=system   POST 参数 c 作为命令执行，cat /flag 的输出为 hello world<flag值>
+        /index.php                      POST 用户名密码登录，成功后下发 PHPSESSID
+        /a.php                          需要登录后的 Cookie，返回带flag的页面
+    flag服务器 (flag_port):
+        /flag_file.php   GET参数或POST表单 token/flag，flag 可以重复多个 (每行一个结果)
+        其他路径的 PUT/POST JSON 数组 (token 放在 X-Team-Token 请求头)，返回每个flag的结果
+每个队伍每轮的flag由密钥、队伍编号和轮次算出，轮次编号 = (时间戳 - round_start) // round_seconds，与脚本的轮次一致 (见 rounds)。
+flag服务器的判定: 本轮的flag第一次提交为 success，再次提交为 duplicate，
+已过有效期的为 expired，不认识的为 invalid。
+
+命令执行只模拟了常用的几条命令 (cat /flag、ls、id、whoami、uptime、echo)，
+以及 awdlib.batch 拼出的批量命令格式。服务器只支持带 Content-Length 的请求体，支持 keep-alive。
+
+故障注入 (faults 参数或 set_faults): 按路径配置各类故障的概率，每个请求按概率抽取一种故障:
+    timeout   读完请求后不响应，直到客户端断开 (或 FAULT_HOLD_SECONDS 秒后关闭)
+    abort     接受连接、读完请求后不处理，直接以 RST 断开
+    slow      响应头立即发出，响应体在 SLOW_DRIP_SECONDS 秒内分 SLOW_DRIP_CHUNKS 块慢慢发送
+    reset     正常处理请求，发出一半响应后以 RST 断开
+    huge      页面前面填充 HUGE_PAGE_BYTES 字节，flag在页面末尾
+路径 '*' 的配置用于没有单独配置的队伍服务路径，flag服务器的路径 (/flag_file.php 等) 需要单独配置。
+timeout 和 abort 的请求不会被处理 (flag服务器不判定)，reset 的请求已经处理，只是响应丢了一半，
+与真实环境中"提交成功但没收到响应"的情况相同。
+
+refuse 是队伍级别的故障，只能配置在 '*' 上: 每个队伍按该概率被选为宕机，宕机队伍的监听端口关闭、
+已有连接断开，连接时得到 "连接被拒绝"，存活预筛、跳过不可连接目标和健康退避的路径都会走到；
+宕机的队伍在下一次 set_faults 之前保持不变。
+
+脚本按主机限速 (HOST_RATE_LIMIT)，所有队伍都在 127.0.0.1 上时会共用一个主机的速率，
+比真实比赛慢得多；Linux 下整个 127.0.0.0/8 都是回环地址，可以开启 host_per_team 让每队一个地址。
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import re
+import random
+import secrets
+import socket
+import struct
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from .rounds import round_of
+
+# 默认端口: 队伍服务从 BASE_PORT 开始依次排列，flag服务器使用 FLAG_PORT
+BASE_PORT = 18800
+FLAG_PORT = 18799
+# 每轮的时长 (秒)，与脚本的 ROUND_SECONDS 一致
+ROUND_SECONDS = 120
+# flag在生成它的那一轮之后还有效的轮数
+VALID_ROUNDS = 1
+# 队伍服务的登录账号 (与 登录获取cookie.py 的默认配置一致)
+LOGIN_USERNAME = 'admin'
+LOGIN_PASSWORD = 'password'
+# 页面模板中每队都相同的静态哈希，用于检验静态候选过滤
+STATIC_HASH = 'd41d8cd98f00b204e9800998ecf8427e'
+# 请求头的最大长度
+MAX_HEADER_BYTES = 64 * 1024
+
+# 故障类型
+FAULT_TIMEOUT = 'timeout'
+FAULT_ABORT = 'abort'
+FAULT_SLOW = 'slow'
+FAULT_RESET = 'reset'
+FAULT_HUGE = 'huge'
+FAULT_REFUSE = 'refuse'
+FAULTS = (FAULT_TIMEOUT, FAULT_ABORT, FAULT_SLOW, FAULT_RESET, FAULT_HUGE, FAULT_REFUSE)
+# timeout 故障最多保持连接的秒数
+FAULT_HOLD_SECONDS = 30
+# slow 故障发送响应体的总秒数和分块数
+SLOW_DRIP_SECONDS = 5
+SLOW_DRIP_CHUNKS = 10
+# huge 故障在页面前面填充的字节数
+HUGE_PAGE_BYTES = 4 * 1024 * 1024
+
+_REASONS = {200: 'OK', 302: 'Found', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+            405: 'Method Not Allowed', 429: 'Too Many Requests', 500: 'Internal Server Error'}
+_FLAG_RE = re.compile(r'flag\{([^}]*)\}', re.I)
+_SUBSHELL_RE = re.compile(r'^\((.*)\)\s*2>&1$', re.S)
+
+
+class Request:
+    """
+    收到的一个请求
+
+    属性:
+        method / path / headers (键为小写) / body
+        params: 查询参数与表单参数合并后的 {名称: [值, ...]}，表单参数在后
+        cookies: 请求中的 Cookie 字典
+        team: 收到请求的队伍编号，flag服务器为 None
+    """
+
+    __slots__ = ('method', 'path', 'headers', 'body', 'params', 'cookies', 'team')
+
+    def __init__(self, method, target, headers, body, team):
+        self.method = method
+        parts = urlsplit(target)
+        self.path = parts.path
+        self.headers = headers
+        self.body = body
+        self.team = team
+        self.params = parse_qs(parts.query, keep_blank_values=True)
+        if body and 'application/x-www-form-urlencoded' in headers.get('content-type', ''):
+            for name, values in parse_qs(body.decode('utf-8', 'replace'), keep_blank_values=True).items():
+                self.params.setdefault(name, []).extend(values)
+        self.cookies = {}
+        for item in headers.get('cookie', '').split(';'):
+            name, _, value = item.strip().partition('=')
+            if name:
+                self.cookies[name] = value
+
+    def param(self, name, default=None):
+        values = self.params.get(name)
+        return values[0] if values else default
+
+
+class Response:
+    """
+    要返回的响应
+
+    参数:
+        status: HTTP状态码
+        body: 响应体 (str 或 bytes)
+        headers: 附加响应头 [(名称, 值)]
+        content_type: Content-Type
+    """
+
+    __slots__ = ('status', 'body', 'headers', 'content_type')
+
+    def __init__(self, status=200, body=b'', headers=None, content_type='text/html; charset=utf-8'):
+        self.status = status
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.headers = list(headers or [])
+        self.content_type = content_type
+
+    def encode_head(self, keep_alive):
+        lines = [f"HTTP/1.1 {self.status} {_REASONS.get(self.status, 'Unknown')}",
+                 f"Content-Length: {len(self.body)}",
+                 f"Content-Type: {self.content_type}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f"{name}: {value}" for name, value in self.headers)
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+class GameSimulator:
+    """
+    模拟比赛环境，start() 后在后台线程中运行，stop() 关闭；也可以用 with 语句
+
+    参数:
+        teams: 队伍数
+        host: 监听地址 (flag服务器，以及 host_per_team 为 False 时的队伍服务)
+        base_port: 第一个队伍服务的端口
+        flag_port: flag服务器的端口
+        host_per_team: 每队使用一个回环地址 127.0.x.y (仅 Linux)
+        round_seconds: 每轮的时长 (秒)
+        valid_rounds: flag有效的轮数
+        secret: 生成flag的密钥，默认随机
+        faults: 故障注入配置 {路径: {故障类型: 概率}}，见 set_faults
+        fault_seed: 故障抽取的随机数种子
+        round_start: 任意一轮的开始时间戳，默认为启动时间 (轮次边界不与 Unix 纪元对齐，脚本需要配置相同的 ROUND_START)
+    """
+
+    def __init__(self, teams=10, host='127.0.0.1', base_port=BASE_PORT, flag_port=FLAG_PORT,
+                 round_seconds=ROUND_SECONDS, valid_rounds=VALID_ROUNDS, secret=None, host_per_team=False,
+                 faults=None, fault_seed=None, round_start=None):
+        self.teams = teams
+        self.host = host
+        self.host_per_team = host_per_team
+        self.base_port = base_port
+        self.flag_port = flag_port
+        self.round_seconds = round_seconds
+        self.round_start = time.time() if round_start is None else round_start
+        self.valid_rounds = valid_rounds
+        self.secret = secret or secrets.token_bytes(16)
+        # 登录下发的会话: PHPSESSID -> 队伍编号
+        self.sessions = {}
+        # 各路径收到的请求数
+        self.requests = {}
+        # flag服务器收到的提交: 判定 -> 次数；accepted 记录每个被接受的flag (时间, 提交方token, 队伍编号, 轮次)
+        self.verdicts = {}
+        self.accepted = []
+        self._submitted = set()
+        # 已注入的故障: 故障类型 -> 次数
+        self.injected = {}
+        self.faults = {}
+        # 宕机 (监听端口关闭) 的队伍编号
+        self.down = set()
+        self._random = random.Random()
+        # 每轮的 flag值 -> 队伍编号，提交时查表
+        self._flag_index = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        # 监听中的服务: 队伍编号 -> Server，flag服务器的键为 None
+        self._listeners = {}
+        # 处理中的连接: 任务 -> (writer, 队伍编号)
+        self._connections = {}
+        self.set_faults(faults, fault_seed)
+
+    # ---------- flag ----------
+
+    def current_round(self):
+        return round_of(time.time(), self.round_seconds, self.round_start)
+
+    def flag_value(self, team, round_no=None):
+        """
+        返回队伍在某一轮的flag值 (32位十六进制，不含 flag{} 外壳)
+        """
+        round_no = self.current_round() if round_no is None else round_no
+        return hmac.new(self.secret, f"{team}:{round_no}".encode(), hashlib.md5).hexdigest()
+
+    def flag(self, team, round_no=None):
+        return f"flag{{{self.flag_value(team, round_no)}}}"
+
+    def captured(self, text, rounds=None):
+        """
+        返回文本中出现了flag值的队伍编号集合，用于统计脚本拿到了多少个flag
+
+        参数:
+            text: 脚本的输出
+            rounds: 要查找的轮次 (可迭代)，默认只查当前轮；一次运行跨过了轮次边界时应传入期间的所有轮次
+        """
+        rounds = [self.current_round()] if rounds is None else rounds
+        return {team for round_no in rounds for team in range(self.teams) if self.flag_value(team, round_no) in text}
+
+    def _lookup(self, value):
+        """按flag值找到 (队伍编号, 轮次)，只查仍可能被提交的几轮"""
+        value = _FLAG_RE.sub(r'\1', value.strip())
+        current = self.current_round()
+        for round_no in range(current, current - self.valid_rounds - 2, -1):
+            index = self._flag_index.get(round_no)
+            if index is None:
+                index = {self.flag_value(team, round_no): team for team in range(self.teams)}
+                self._flag_index[round_no] = index
+            if value in index:
+                return index[value], round_no
+        return None, None
+
+    # ---------- 故障注入 ----------
+
+    def set_faults(self, faults=None, seed=None):
+        """
+        设置故障注入，运行中也可以修改
+
+        参数:
+            faults: {路径: {故障类型: 概率}}，路径 '*' 用于没有单独配置的队伍服务路径；None 表示不注入故障
+                    '*' 中的 refuse 为每个队伍宕机的概率
+            seed: 随机数种子，相同的种子和请求顺序下注入的故障相同
+        """
+        faults = faults or {}
+        for path, weights in faults.items():
+            unknown = set(weights) - set(FAULTS)
+            if unknown:
+                raise ValueError(f"未知的故障类型: {', '.join(sorted(unknown))}")
+            if FAULT_REFUSE in weights and path != '*':
+                raise ValueError(f"{FAULT_REFUSE} 按队伍关闭监听端口，只能配置在 '*' 上")
+            if sum(probability for fault, probability in weights.items() if fault != FAULT_REFUSE) > 1:
+                raise ValueError(f"{path} 的故障概率之和超过1")
+        rng = random.Random(seed)
+        refuse = faults.get('*', {}).get(FAULT_REFUSE, 0)
+        down = {team for team in range(self.teams) if rng.random() < refuse}
+        with self._lock:
+            self.faults = {path: [(fault, probability) for fault, probability in weights.items()
+                                  if fault != FAULT_REFUSE] for path, weights in faults.items()}
+            self._random = rng
+            self.down = down
+        if self._loop is not None and self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self._apply_down(), self._loop).result()
+
+    def pick_fault(self, request):
+        """
+        按请求的路径抽取要注入的故障
+
+        返回值:
+            str: 故障类型，None 表示正常响应
+        """
+        weights = self.faults.get(request.path)
+        if weights is None and request.team is not None:
+            weights = self.faults.get('*')
+        if not weights:
+            return None
+        with self._lock:
+            point = self._random.random()
+            for fault, probability in weights:
+                point -= probability
+                if point < 0:
+                    self.injected[fault] = self.injected.get(fault, 0) + 1
+                    return fault
+        return None
+
+    # ---------- 运行 ----------
+
+    @property
+    def targets(self):
+        """所有队伍服务的 (地址, 端口)"""
+        if self.host_per_team:
+            return [(f"127.0.{1 + team // 254}.{1 + team % 254}", self.base_port) for team in range(self.teams)]
+        return [(self.host, self.base_port + team) for team in range(self.teams)]
+
+    @property
+    def flag_url(self):
+        return f"http://{self.host}:{self.flag_port}/flag_file.php"
+
+    def write_ip_file(self, path='ip.txt'):
+        """把所有队伍服务写成 ip.txt (IP:端口 每行一个)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for host, port in self.targets:
+                f.write(f"{host}:{port}\n")
+
+    def start(self):
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self._start_servers())
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._close_servers())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    async def _listen(self, host, port, team):
+        return await asyncio.start_server(
+            lambda reader, writer: self._serve(reader, writer, team),
+            host, port, limit=MAX_HEADER_BYTES, reuse_address=True, backlog=1024)
+
+    async def _start_servers(self):
+        for team, (host, port) in enumerate(self.targets):
+            if team not in self.down:
+                self._listeners[team] = await self._listen(host, port, team)
+        self._listeners[None] = await self._listen(self.host, self.flag_port, None)
+
+    async def _apply_down(self):
+        """关闭宕机队伍的监听端口和已有连接，恢复其他队伍的监听"""
+        for team, (host, port) in enumerate(self.targets):
+            server = self._listeners.get(team)
+            if team in self.down and server is not None:
+                server.close()
+                del self._listeners[team]
+                for writer, owner in list(self._connections.values()):
+                    if owner == team:
+                        writer.close()
+            elif team not in self.down and server is None:
+                self._listeners[team] = await self._listen(host, port, team)
+
+    async def _close_servers(self):
+        for server in self._listeners.values():
+            server.close()
+        # 保持中的 keep-alive 连接不会随监听端口关闭，逐个关闭后等待处理协程读到EOF退出
+        tasks = list(self._connections)
+        for writer, _ in self._connections.values():
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for server in self._listeners.values():
+            await server.wait_closed()
+        self._listeners = {}
+
+    async def _serve(self, reader, writer, team):
+        task = asyncio.current_task()
+        self._connections[task] = (writer, team)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                body = await reader.readexactly(length) if length else b''
+                request = Request(method, target, headers, body, team)
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                with self._lock:
+                    self.requests[request.path] = self.requests.get(request.path, 0) + 1
+                fault = self.pick_fault(request)
+                if fault in (FAULT_TIMEOUT, FAULT_ABORT):
+                    await self._drop(reader, writer, fault)
+                    break
+                response = self.handle(request)
+                if not await self._send(writer, request, response, keep_alive, fault) or not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _send(self, writer, request, response, keep_alive, fault=None):
+        """
+        写出响应，按 fault 慢速发送、中途断开或填充巨大页面
+
+        返回值:
+            bool: 连接是否还能继续使用
+        """
+        if fault == FAULT_HUGE:
+            response.body = _padding(HUGE_PAGE_BYTES) + response.body
+        head = response.encode_head(keep_alive)
+        body = response.body if request.method != 'HEAD' else b''
+        if fault == FAULT_RESET:
+            writer.write(head + body[:len(body) // 2])
+            await writer.drain()
+            _abort(writer)
+            return False
+        if fault == FAULT_SLOW:
+            writer.write(head)
+            step = max(1, -(-len(body) // SLOW_DRIP_CHUNKS))
+            for offset in range(0, len(body), step):
+                await writer.drain()
+                await asyncio.sleep(SLOW_DRIP_SECONDS / SLOW_DRIP_CHUNKS)
+                writer.write(body[offset:offset + step])
+            await writer.drain()
+            return True
+        writer.write(head + body)
+        await writer.drain()
+        return True
+
+    async def _drop(self, reader, writer, fault):
+        """不响应请求: timeout 保持连接直到客户端断开，abort 立即 RST"""
+        if fault == FAULT_TIMEOUT:
+            try:
+                await asyncio.wait_for(reader.read(), FAULT_HOLD_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            return
+        _abort(writer)
+
+    # ---------- 请求处理 ----------
+
+    def handle(self, request):
+        """按队伍和路径分发请求，返回 Response"""
+        if request.team is None:
+            return self._flag_server(request)
+        route = _ROUTES.get(request.path)
+        if route is None:
+            return Response(404, '<h1>404 Not Found</h1>')
+        return route(self, request.team, request)
+
+    def _footer(self, team, request):
+        command = request.param('shell')
+        if command is not None:
+            return Response(200, self.execute(team, command))
+        return Response(200, f"<html><div class=\"footer\">Copyright team{team} "
+                             f"<!-- build {STATIC_HASH} --> {self.flag(team)}</div></html>")
+
+    def _config(self, team, request):
+        if request.param('d') != 'system':
+            return Response(200, '')
+        command = request.param('c')
+        if command is None:
+            return Response(200, '')
+        output = self.execute(team, command)
+        if command.strip() == 'cat /flag':
+            output = f"hello world{self.flag_value(team)}"
+        return Response(200, output)
+
+    def _login(self, team, request):
+        if request.method != 'POST':
+            return Response(200, '<form method="post"><input name="username"><input name="password"></form>')
+        if request.param('username') != LOGIN_USERNAME or request.param('password') != LOGIN_PASSWORD:
+            return Response(200, 'login failed')
+        session = secrets.token_hex(16)
+        with self._lock:
+            self.sessions[session] = team
+        return Response(200, 'login success', [('Set-Cookie', f"PHPSESSID={session}; path=/")])
+
+    def _admin(self, team, request):
+        if self.sessions.get(request.cookies.get('PHPSESSID')) != team:
+            return Response(403, 'please login')
+        return Response(200, f"<html>cmd={request.param('cmd', '')} result: {self.flag(team)}</html>")
+
+    def execute(self, team, command):
+        """
+        模拟webshell执行一条命令，返回输出
+        """
+        outputs = []
+        for part in command.split(';'):
+            part = part.strip()
+            match = _SUBSHELL_RE.match(part)
+            if match:
+                part = match.group(1).strip()
+            if not part:
+                continue
+            name, _, argument = part.partition(' ')
+            if name == 'echo':
+                outputs.append(argument + '\n')
+            elif part == 'cat /flag':
+                outputs.append(self.flag(team) + '\n')
+            elif name == 'ls':
+                outputs.append('total 12\n-rw-r--r-- 1 www-data www-data 1024 index.php\n'
+                               '-rw-r--r-- 1 www-data www-data  512 footer.php\n')
+            elif name == 'id':
+                outputs.append('uid=33(www-data) gid=33(www-data) groups=33(www-data)\n')
+            elif name == 'whoami':
+                outputs.append('www-data\n')
+            elif name == 'uptime':
+                outputs.append(' 12:00:00 up 1 day,  1 user,  load average: 0.00, 0.01, 0.05\n')
+            else:
+                outputs.append(f"sh: 1: {name}: not found\n")
+        return ''.join(outputs)
+
+    def _flag_server(self, request):
+        if request.path == '/flag_file.php':
+            token = request.param('token', '')
+            flags = request.params.get('flag', []) + request.params.get('flag[]', [])
+            if not flags:
+                return Response(200, 'invalid flag: empty')
+            return Response(200, '\n'.join(self.judge(token, flag) for flag in flags))
+        if request.method not in ('PUT', 'POST'):
+            return Response(405, 'method not allowed')
+        try:
+            flags = json.loads(request.body or b'[]')
+        except ValueError:
+            return Response(400, 'invalid json')
+        token = request.headers.get('x-team-token', '')
+        if isinstance(flags, dict):
+            token = flags.get('token', token)
+            flags = flags.get('flags', [])
+        results = [{'flag': flag, 'msg': self.judge(token, str(flag))} for flag in flags]
+        return Response(200, json.dumps(results), content_type='application/json')
+
+    def judge(self, token, flag):
+        """
+        判定一次提交，返回响应文本
+        """
+        team, round_no = self._lookup(flag)
+        with self._lock:
+            if team is None:
+                verdict, text = 'invalid', 'invalid flag'
+            elif round_no + self.valid_rounds <= self.current_round():
+                verdict, text = 'expired', 'flag expired'
+            elif (token, team, round_no) in self._submitted:
+                verdict, text = 'duplicate', 'flag already submitted'
+            else:
+                self._submitted.add((token, team, round_no))
+                self.accepted.append((time.time(), token, team, round_no))
+                verdict, text = 'accepted', 'success'
+            self.verdicts[verdict] = self.verdicts.get(verdict, 0) + 1
+        return text
+
+
+def _abort(writer):
+    """以 RST 断开连接 (SO_LINGER 为 0)，客户端收到连接重置而不是正常的EOF"""
+    sock = writer.get_extra_info('socket')
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+    writer.transport.abort()
+
+
+def _padding(size):
+    """生成 size 字节左右的HTML填充内容"""
+    line = b'<p>' + b'lorem ipsum dolor sit amet ' * 37 + b'</p>\n'
+    return line * max(1, size // len(line))
+
+
+_ROUTES = {
+    '/footer.php': GameSimulator._footer,
+    '/includes/config.php': GameSimulator._config,
+    '/index.php': GameSimulator._login,
+    '/a.php': GameSimulator._admin,
+}
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+流式读取响应体 - 限制读取的字节数，匹配到flag后立即停止
+
+恶意或超大的页面不能再拖住一个worker或撑大内存: 响应体按块读取，累计达到上限即截断；
+给出停止正则时，每读一块就在新数据 (连同与上一块重叠的部分) 中查找，匹配到就不再读取剩余内容。
+异步引擎和基于 requests 的脚本共用这里的逻辑。
+"""
+
+import re
+
+# 单次读取的块大小
+READ_CHUNK = 16384
+# 默认的响应体上限 (字节)
+MAX_BODY_BYTES = 1 << 20
+# 每次查找时回看的字节数，保证跨块的flag也能匹配到 (应大于flag的最大长度)
+MATCH_OVERLAP = 512
+
+
+def compile_stop_pattern(pattern):
+    """
+    把停止正则统一编译为 bytes 正则
+
+    参数:
+        pattern: None、str、bytes 或已编译的正则
+
+    返回值:
+        re.Pattern 或 None
+    """
+    if pattern is None:
+        return None
+    if isinstance(pattern, re.Pattern):
+        if isinstance(pattern.pattern, bytes):
+            return pattern
+        return re.compile(pattern.pattern.encode('utf-8'), pattern.flags & ~re.UNICODE)
+    if isinstance(pattern, str):
+        pattern = pattern.encode('utf-8')
+    return re.compile(pattern)
+
+
+class BodyBuffer:
+    """
+    按块累积响应体
+
+    属性:
+        truncated: 响应体是否没有读完；超过上限时由 feed 设置，提前匹配到flag时由读取方
+                   确认还有未读的数据后设置 (匹配恰好落在最后一块时响应体是完整的)
+        matched:   是否匹配到了停止正则
+    """
+
+    def __init__(self, max_bytes=MAX_BODY_BYTES, stop_pattern=None):
+        self.max_bytes = max_bytes
+        self.stop_pattern = compile_stop_pattern(stop_pattern)
+        self.truncated = False
+        self.matched = False
+        self._data = bytearray()
+
+    def feed(self, chunk):
+        """
+        追加一块数据
+
+        返回值:
+            bool: True 表示应停止读取
+        """
+        start = len(self._data)
+        # 只有确实丢弃了超出上限的数据才算截断，恰好等于上限的响应体是完整的
+        if self.max_bytes and start + len(chunk) > self.max_bytes:
+            self._data += chunk[:self.max_bytes - start]
+            self.truncated = True
+            self._search(start, final=True)
+            return True
+        self._data += chunk
+        return self._search(start)
+
+    def _search(self, start, final=False):
+        if self.stop_pattern is None:
+            return False
+        match = self.stop_pattern.search(self._data, max(0, start - MATCH_OVERLAP))
+        # 匹配恰好落在已读数据末尾时，贪婪的模式可能还没匹配完整，等下一块再确认
+        if match and (final or match.end() < len(self._data)):
+            self.matched = True
+        return self.matched
+
+    def finish(self):
+        """数据读完后做最后一次查找，返回完整的响应体 bytes"""
+        if not self.matched:
+            self._search(len(self._data), final=True)
+        return bytes(self._data)
+
+
+def read_streamed(response, max_bytes=MAX_BODY_BYTES, stop_pattern=None):
+    """
+    以流的方式读取 requests 响应 (请求时需传入 stream=True)
+
+    参数:
+        response: requests.Response
+        max_bytes: 响应体上限 (字节)
+        stop_pattern: 匹配到后停止读取的正则
+
+    返回值:
+        tuple: (响应文本, 是否截断)
+    """
+    buffer = BodyBuffer(max_bytes, stop_pattern)
+    try:
+        for chunk in response.iter_content(READ_CHUNK):
+            if buffer.feed(chunk):
+                # 匹配到flag时响应体恰好读完 (Content-Length 已读满)，读到结束，连接可以归还连接池
+                if not buffer.truncated and getattr(response.raw, 'length_remaining', None) == 0:
+                    continue
+                buffer.truncated = True
+                break
+    finally:
+        # 提前停止时连接上还有未读数据，直接关闭；读完的连接由 close() 归还连接池
+        response.close()
+    body = buffer.finish()
+    return body.decode(response.encoding or 'utf-8', errors='replace'), buffer.truncated
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+flag提交 - 一次性判定flag服务器响应的类型，只对可重试的类型重试
+
+原来的判定逐个关键词在响应中查找，失败关键词总是覆盖成功关键词，
+"success (0 errors)" 这样的响应会因为含有 error 被判为失败；'ok' 还会匹配到 token 之类的词。
+这里把各类关键词合并成一个带命名分组的正则 (与 extract.FlagMatcher 相同的做法)，扫描一遍
+找出出现过的所有类型，再按优先级取一个:
+    rate_limited > duplicate > expired > invalid > accepted > error
+裸的 error 优先级最低，只在没有其他信号时才算服务器出错。
+
+只有 rate_limited (限流) 和 error (服务器出错或没拿到响应) 值得重试，按 RetryPolicy 退避到截止时间；
+duplicate / expired / invalid 重试也不会变，直接返回。
+
+请求的格式由提交适配器决定，适配器只负责把一批flag发出去并取回每个flag对应的响应:
+    FormAdapter      每个请求一个flag，token 和 flag 作为 GET 参数或 POST 表单 (默认)
+    TemplateAdapter  每个请求一个flag，按 URL 模板 (例如 ...?token=%s&flag=%s) 拼出地址
+    JsonBatchAdapter 一个请求提交一批flag，请求体为 JSON 数组 (或包在对象中)
+    ParamsBatchAdapter 一个请求提交一批flag，重复的 flag 参数 (flag=a&flag=b)
+批量适配器的响应按 split_response 拆回每个flag: JSON 数组按顺序或按其中的 flag 字段对应，
+JSON 对象按 flag 键对应，行数与flag数相同时按行对应，否则整个响应算作每个flag的响应。
+
+FlagSubmitter 是线程安全的，多个提交线程共用一个实例和共享会话的 keep-alive 连接即可并发提交。
+"""
+
+import json
+import queue
+import re
+import time
+
+from .retry import RetryPolicy, is_retryable_exception
+from .session import get_session
+
+# 判定结果
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+RATE_LIMITED = 'rate_limited'
+ERROR = 'error'
+UNKNOWN = 'unknown'
+
+# 值得重试的判定
+RETRYABLE_VERDICTS = (RATE_LIMITED, ERROR)
+
+# 各判定的关键词 (不区分大小写)，列表顺序即优先级
+VERDICT_PATTERNS = [
+    (RATE_LIMITED, r'too many|rate.?limit|slow down|频繁|太快|限流'),
+    (DUPLICATE, r'already|duplicate|重复|已提交|已经提交'),
+    (EXPIRED, r'expired|outdated|too old|过期|已失效'),
+    (INVALID, r'invalid|incorrect|wrong|not found|no such|bad flag|错误|无效|不正确|失败'),
+    (ACCEPTED, r'success|accepted|correct|\bok\b|成功|正确'),
+    (ERROR, r'\berror\b|exception|internal'),
+]
+# 只在响应的前这么多字符中查找
+VERDICT_SCAN_CHARS = 4096
+# 单次提交的超时 (秒)
+SUBMIT_TIMEOUT = 5
+# 共享会话中到flag服务器保留的连接数，通常设为提交线程数
+SUBMIT_POOL_SIZE = 16
+# 批量适配器每个请求最多携带的flag数
+BATCH_SIZE = 100
+
+
+class VerdictMatcher:
+    """
+    合并后的判定匹配器
+
+    参数:
+        patterns: [(判定, 正则字符串)]，默认 VERDICT_PATTERNS，顺序即优先级
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = list(VERDICT_PATTERNS if patterns is None else patterns)
+        self.verdicts = [verdict for verdict, _ in self.patterns]
+        # 分支末尾放空的命名分组标记命中的类型，原因见 extract.FlagMatcher
+        self.regex = re.compile('|'.join(f'(?:{pattern})(?P<v{i}>)' for i, (_, pattern) in enumerate(self.patterns)),
+                                re.IGNORECASE)
+
+    def classify(self, status_code, text):
+        """
+        判定一次提交的结果
+
+        参数:
+            status_code: HTTP状态码，None 表示没有拿到响应
+            text: 响应内容
+
+        返回值:
+            str: 判定
+        """
+        if status_code is None:
+            return ERROR
+        if status_code == 429:
+            return RATE_LIMITED
+        best = None
+        for match in self.regex.finditer(text or '', 0, VERDICT_SCAN_CHARS):
+            index = int(match.lastgroup[1:])
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        if best is not None:
+            return self.verdicts[best]
+        if status_code >= 500:
+            return ERROR
+        return UNKNOWN
+
+
+def split_response(flags, status_code, text):
+    """
+    把批量提交的一个响应拆成每个flag的响应
+
+    参数:
+        flags: 本次提交的flag列表
+        status_code: HTTP状态码
+        text: 响应内容
+
+    返回值:
+        list: 与 flags 一一对应的 (状态码, 响应内容)
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, list) and data:
+        by_flag = {item.get('flag'): item for item in data if isinstance(item, dict) and 'flag' in item}
+        if by_flag:
+            return [(status_code, _item_text(by_flag[flag]) if flag in by_flag else text) for flag in flags]
+        if len(data) == len(flags):
+            return [(status_code, _item_text(item)) for item in data]
+    elif isinstance(data, dict) and any(flag in data for flag in flags):
+        return [(status_code, _item_text(data[flag]) if flag in data else text) for flag in flags]
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(flags) > 1 and len(lines) == len(flags):
+        return [(status_code, line) for line in lines]
+    return [(status_code, text)] * len(flags)
+
+
+def _item_text(item):
+    """取出JSON响应中单个flag的结果文本，去掉 flag 字段本身，避免flag内容被当作判定关键词"""
+    if isinstance(item, dict):
+        item = {key: value for key, value in item.items() if key != 'flag'}
+    return item if isinstance(item, str) else json.dumps(item, ensure_ascii=False)
+
+
+class FormAdapter:
+    """
+    单个提交: 每个请求一个flag，token 和 flag 作为 GET 参数或 POST 表单
+
+    参数:
+        url: 提交地址
+        token: 团队token
+        method: 'GET' 或 'POST'
+        token_param / flag_param: 参数名
+        headers: 附加请求头
+        timeout: 单次请求超时 (秒)
+        pool_size: 共享会话中保留的连接数
+    """
+
+    batch_size = 1
+
+    def __init__(self, url, token, method='GET', token_param='token', flag_param='flag', headers=None,
+                 timeout=SUBMIT_TIMEOUT, pool_size=SUBMIT_POOL_SIZE):
+        self.url = url
+        self.token = token
+        self.method = method.upper()
+        self.token_param = token_param
+        self.flag_param = flag_param
+        self.headers = headers
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+    def send(self, flags):
+        """
+        发送一次提交请求
+
+        参数:
+            flags: flag列表，长度不超过 batch_size
+
+        返回值:
+            list: 与 flags 一一对应的 (状态码, 响应内容)，网络错误时抛出 requests 的异常
+        """
+        params = {self.token_param: self.token, self.flag_param: flags[0]}
+        session = get_session(self.pool_size)
+        if self.method == 'GET':
+            response = session.get(self.url, params=params, headers=self.headers, timeout=self.timeout,
+                                   allow_redirects=False)
+        else:
+            response = session.post(self.url, data=params, headers=self.headers, timeout=self.timeout,
+                                    allow_redirects=False)
+        return [(response.status_code, response.text.strip())]
+
+
+class TemplateAdapter:
+    """
+    单个提交: 按 URL 模板拼出提交地址，模板中依次是 token 和 flag 两个 %s
+
+    参数:
+        template: 例如 http://flag_server/flag_file.php?token=%s&flag=%s
+        token: 团队token
+        method: 'GET' 或 'POST' (POST 时请求体为空)
+        其余同 FormAdapter
+    """
+
+    batch_size = 1
+
+    def __init__(self, template, token, method='POST', headers=None, timeout=SUBMIT_TIMEOUT,
+                 pool_size=SUBMIT_POOL_SIZE):
+        self.template = template
+        self.token = token
+        self.method = method.upper()
+        self.headers = headers
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+    def send(self, flags):
+        url = self.template % (self.token, flags[0])
+        response = get_session(self.pool_size).request(self.method, url, data={} if self.method == 'POST' else None,
+                                                       headers=self.headers, timeout=self.timeout,
+                                                       allow_redirects=False)
+        return [(response.status_code, response.text.strip())]
+
+
+class JsonBatchAdapter:
+    """
+    批量提交: 一个请求的请求体是 JSON
+
+    参数:
+        url: 提交地址
+        token: 团队token
+        method: 'PUT' 或 'POST'
+        batch_size: 每个请求最多携带的flag数
+        flags_key: None 表示请求体就是flag数组；否则请求体为 {token_key: token, flags_key: [...]}
+        token_key: 请求体中 token 的键名 (flags_key 不为 None 时生效)
+        token_header: 放 token 的请求头名，例如 X-Team-Token；None 表示不放在请求头中
+        其余同 FormAdapter
+    """
+
+    def __init__(self, url, token, method='PUT', batch_size=BATCH_SIZE, flags_key=None, token_key='token',
+                 token_header='X-Team-Token', headers=None, timeout=SUBMIT_TIMEOUT, pool_size=SUBMIT_POOL_SIZE):
+        self.url = url
+        self.token = token
+        self.method = method.upper()
+        self.batch_size = batch_size
+        self.flags_key = flags_key
+        self.token_key = token_key
+        self.headers = dict(headers or {})
+        if token_header:
+            self.headers[token_header] = token
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+    def send(self, flags):
+        body = list(flags) if self.flags_key is None else {self.token_key: self.token, self.flags_key: list(flags)}
+        response = get_session(self.pool_size).request(self.method, self.url, json=body, headers=self.headers,
+                                                       timeout=self.timeout, allow_redirects=False)
+        return split_response(flags, response.status_code, response.text.strip())
+
+
+class ParamsBatchAdapter(FormAdapter):
+    """
+    批量提交: 一个请求中重复 flag 参数 (flag=a&flag=b)，GET 参数或 POST 表单
+
+    参数:
+        flag_param: 重复的参数名，例如 'flag' 或 'flag[]'
+        batch_size: 每个请求最多携带的flag数
+        其余同 FormAdapter
+    """
+
+    def __init__(self, url, token, method='POST', token_param='token', flag_param='flag', batch_size=BATCH_SIZE,
+                 headers=None, timeout=SUBMIT_TIMEOUT, pool_size=SUBMIT_POOL_SIZE):
+        super().__init__(url, token, method, token_param, flag_param, headers, timeout, pool_size)
+        self.batch_size = batch_size
+
+    def send(self, flags):
+        params = {self.token_param: self.token, self.flag_param: list(flags)}
+        session = get_session(self.pool_size)
+        if self.method == 'GET':
+            response = session.get(self.url, params=params, headers=self.headers, timeout=self.timeout,
+                                   allow_redirects=False)
+        else:
+            response = session.post(self.url, data=params, headers=self.headers, timeout=self.timeout,
+                                    allow_redirects=False)
+        return split_response(flags, response.status_code, response.text.strip())
+
+
+class FlagSubmitter:
+    """
+    flag提交器
+
+    参数:
+        adapter: 提交适配器，提供 batch_size 和 send(flags) -> [(状态码, 响应内容)]，网络错误时抛出异常
+        deadline: 截止时间戳，可重试的判定一直重试到该时间；None 表示按 max_attempts
+        max_attempts: 每个flag最多尝试的次数，None 表示不限 (需配合 deadline)
+        matcher: VerdictMatcher
+    """
+
+    def __init__(self, adapter, deadline=None, max_attempts=None, matcher=None):
+        self.adapter = adapter
+        self.batch_size = max(1, getattr(adapter, 'batch_size', 1))
+        self.policy = RetryPolicy(max_attempts=max_attempts if max_attempts or deadline else 1, deadline=deadline)
+        self.matcher = matcher or VerdictMatcher()
+
+    def submit(self, flag):
+        """
+        提交一个flag，可重试的判定按策略退避重试
+
+        返回值:
+            dict: {flag, verdict, success, response, status_code, attempts}
+        """
+        return self.submit_many([flag])[0]
+
+    def submit_many(self, flags, deadline=None):
+        """
+        提交一批flag，按适配器的 batch_size 分成若干个请求；只有判定可重试的flag会被重新发送
+
+        参数:
+            flags: flag列表
+            deadline: 这批flag的截止时间戳 (例如本轮结束)，重试不超过该时间与创建时的截止时间中较早的一个
+
+        返回值:
+            list: 与 flags 一一对应的结果字典
+        """
+        policy = self.policy
+        if deadline is not None:
+            policy = RetryPolicy(max_attempts=policy.max_attempts,
+                                 deadline=min(deadline, policy.deadline) if policy.deadline else deadline)
+        results = {}
+        for start in range(0, len(flags), self.batch_size):
+            self._submit_batch(flags[start:start + self.batch_size], results, policy)
+        return [results[flag] for flag in flags]
+
+    def _submit_batch(self, flags, results, policy):
+        attempt = 0
+        while flags:
+            attempt += 1
+            try:
+                responses = self.adapter.send(flags)
+                retryable = True
+            except Exception as e:
+                responses = [(None, f"请求失败: {e}")] * len(flags)
+                # 连接被拒绝等错误重试也不会成功
+                retryable = is_retryable_exception(e)
+            pending = []
+            for flag, (status_code, text) in zip(flags, responses):
+                verdict = self.matcher.classify(status_code, text)
+                results[flag] = {'flag': flag, 'verdict': verdict, 'success': verdict == ACCEPTED,
+                                 'response': text, 'status_code': status_code, 'attempts': attempt}
+                if retryable and verdict in RETRYABLE_VERDICTS:
+                    pending.append(flag)
+            flags = pending
+            if flags:
+                delay = policy.next_delay(attempt)
+                if delay is None:
+                    break
+                time.sleep(delay)
+
+
+def take_batch(source, limit, stop=None):
+    """
+    从队列中取出一批待提交的条目: 阻塞等待第一个，之后不等待地取出已在队列中的，最多 limit 个
+
+    参数:
+        source: queue.Queue
+        limit: 最多取出的条目数
+        stop: 表示结束的哨兵值
+
+    返回值:
+        tuple: (条目列表, 是否取到了哨兵)
+    """
+    items = []
+    item = source.get()
+    while item is not stop:
+        items.append(item)
+        if len(items) >= limit:
+            return items, False
+        try:
+            item = source.get_nowait()
+        except queue.Empty:
+            return items, False
+    return items, True
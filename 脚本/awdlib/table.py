@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑目标表 - 用 array 连续缓冲区保存大批量 IPv4:端口 目标及其每轮状态
+
+每个目标只占 4 字节地址 + 2 字节端口 + 若干状态列，65k 个目标不到 1MB。
+安装了 NumPy 时，网段/端口/状态/退避筛选直接在缓冲区视图上向量化完成；
+未安装时退回纯 Python 循环，结果一致。
+端口级的健康退避也保存在表中 (next_retry 列)，每轮挑出不在退避期的目标只需一次 select()，
+不必为每个目标拼出 'ip:port' 键再查健康缓存。
+"""
+
+import ipaddress
+import socket
+import struct
+from array import array
+
+from .targets import iter_targets
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+# last_status 列的特殊取值，其余取值为HTTP状态码
+STATUS_UNKNOWN = 0     # 本轮尚未请求
+STATUS_CONN_FAIL = -1  # 连接失败/超时
+
+_IP_STRUCT = struct.Struct('!I')
+
+
+def ip_to_int(ip):
+    """点分十进制IPv4地址转32位整数"""
+    return _IP_STRUCT.unpack(socket.inet_aton(ip))[0]
+
+
+def int_to_ip(value):
+    """32位整数转点分十进制IPv4地址"""
+    return socket.inet_ntoa(_IP_STRUCT.pack(value))
+
+
+class TargetTable:
+    """
+    列式存储的目标表
+
+    列:
+        addrs:        uint32 地址
+        ports:        uint16 端口
+        last_status:  int16  上一次请求的HTTP状态码 (0 未请求，-1 连接失败)
+        last_latency: float32 上一次请求耗时 (秒，-1 表示未知)
+        last_shell:   int8   上一次可用的shell序号 (-1 表示没有)
+        next_retry:   float64 端口级退避结束的时间戳 (0 表示不在退避中)，与健康缓存中 'ip:port' 的记录一致
+    """
+
+    def __init__(self):
+        self.addrs = array('I')
+        self.ports = array('H')
+        self.last_status = array('h')
+        self.last_latency = array('f')
+        self.last_shell = array('b')
+        self.next_retry = array('d')
+
+    @classmethod
+    def from_targets(cls, targets):
+        """
+        从 (ip, port) 可迭代对象构建目标表，非IPv4目标会被跳过
+
+        参数:
+            targets: 可迭代的 (ip, port) 元组，例如 iter_targets() 的结果
+
+        返回值:
+            TargetTable: 新建的目标表
+        """
+        table = cls()
+        table.extend(targets)
+        return table
+
+    @classmethod
+    def from_file(cls, file_path, default_ports=(80,)):
+        """从IP文件构建目标表，格式同 awdlib.targets.iter_targets"""
+        return cls.from_targets(iter_targets(file_path, default_ports))
+
+    def extend(self, targets):
+        """追加一批 (ip, port) 目标"""
+        for ip, port in targets:
+            try:
+                addr = ip_to_int(ip)
+            except OSError:
+                print(f"[-] 目标表仅支持IPv4地址，跳过: {ip}:{port}")
+                continue
+            self.addrs.append(addr)
+            self.ports.append(port)
+            self.last_status.append(STATUS_UNKNOWN)
+            self.last_latency.append(-1.0)
+            self.last_shell.append(-1)
+            self.next_retry.append(0.0)
+
+    def __len__(self):
+        return len(self.addrs)
+
+    def __iter__(self):
+        """按顺序产生 (ip, port) 元组"""
+        for addr, port in zip(self.addrs, self.ports):
+            yield int_to_ip(addr), port
+
+    def target(self, index):
+        """返回第 index 个目标的 (ip, port)"""
+        return int_to_ip(self.addrs[index]), self.ports[index]
+
+    def target_str(self, index):
+        """返回第 index 个目标的 'ip:port' 字符串"""
+        return f"{int_to_ip(self.addrs[index])}:{self.ports[index]}"
+
+    def record(self, index, status, latency=None, shell_index=None):
+        """
+        记录一次请求结果
+
+        参数:
+            index: 目标序号
+            status: HTTP状态码，连接失败时传 STATUS_CONN_FAIL
+            latency: 请求耗时 (秒)
+            shell_index: 本次可用的shell序号，None 表示不更新
+        """
+        self.last_status[index] = status
+        if latency is not None:
+            self.last_latency[index] = latency
+        if shell_index is not None:
+            self.last_shell[index] = shell_index
+
+    def set_backoff(self, index, next_retry):
+        """记录第 index 个目标的退避结束时间戳，0 表示不在退避中"""
+        self.next_retry[index] = next_retry or 0.0
+
+    def load_backoff(self, health):
+        """
+        从健康缓存读入每个目标 'ip:port' 的退避状态，目标表 (重新) 加载时调用一次
+
+        参数:
+            health: HealthCache 健康缓存
+        """
+        for i in range(len(self)):
+            entry = health.get(self.target_str(i))
+            self.next_retry[i] = entry.get('next_retry', 0) if entry else 0.0
+
+    def reset_status(self):
+        """新一轮开始前清空状态列 (保留延迟和可用shell，供下一轮参考)"""
+        self.last_status = array('h', bytes(len(self.last_status) * self.last_status.itemsize))
+
+    def select(self, network=None, ports=None, status=None, max_latency=None, ready_at=None):
+        """
+        按条件筛选目标序号，所有条件取交集
+
+        参数:
+            network: CIDR网段字符串，如 '8.148.182.0/24'
+            ports: 端口集合
+            status: 上一次状态码集合，如 {200} 或 {STATUS_CONN_FAIL}
+            max_latency: 上一次耗时上限 (秒)，未知耗时的目标不会被选中
+            ready_at: 时间戳，只选出在该时间已不在退避期的目标
+
+        返回值:
+            list: 满足条件的目标序号 (升序)
+        """
+        bounds = None
+        if network is not None:
+            network = ipaddress.IPv4Network(network, strict=False)
+            bounds = (int(network.network_address), int(network.broadcast_address))
+        ports = set(ports) if ports is not None else None
+        status = set(status) if status is not None else None
+
+        if np is not None and len(self):
+            return self._select_numpy(bounds, ports, status, max_latency, ready_at)
+
+        indices = []
+        for i in range(len(self)):
+            if bounds is not None and not bounds[0] <= self.addrs[i] <= bounds[1]:
+                continue
+            if ports is not None and self.ports[i] not in ports:
+                continue
+            if status is not None and self.last_status[i] not in status:
+                continue
+            if max_latency is not None and not 0 <= self.last_latency[i] <= max_latency:
+                continue
+            if ready_at is not None and self.next_retry[i] > ready_at:
+                continue
+            indices.append(i)
+        return indices
+
+    def _select_numpy(self, bounds, ports, status, max_latency, ready_at):
+        """select() 的向量化实现，直接在 array 缓冲区上建立只读视图，不复制数据"""
+        mask = np.ones(len(self), dtype=bool)
+        if bounds is not None:
+            addrs = np.frombuffer(self.addrs, dtype=np.uint32)
+            mask &= (addrs >= bounds[0]) & (addrs <= bounds[1])
+        if ports is not None:
+            mask &= np.isin(np.frombuffer(self.ports, dtype=np.uint16), list(ports))
+        if status is not None:
+            mask &= np.isin(np.frombuffer(self.last_status, dtype=np.int16), list(status))
+        if max_latency is not None:
+            latency = np.frombuffer(self.last_latency, dtype=np.float32)
+            mask &= (latency >= 0) & (latency <= max_latency)
+        if ready_at is not None:
+            mask &= np.frombuffer(self.next_retry, dtype=np.float64) <= ready_at
+        return np.flatnonzero(mask).tolist()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+目标展开模块 - 统一解析ip.txt中的各种目标格式
+
+支持的格式 (每行一个，#开头为注释):
+- 纯IP:           8.148.182.34            (使用默认端口)
+- IP:端口:        8.148.182.33:8805
+- CIDR网段:       8.148.182.35/30         (展开网段内所有主机，使用默认端口)
+- CIDR:端口:      8.148.182.0/24:8080
+- 端口范围:       8.148.182.33:8802-8806
+- 多端口列表:     8.148.182.33:8802,8803,8810-8812
+
+所有展开均为惰性生成器，不会预先构建主机列表，/16 网段也只占用去重集合的内存。
+"""
+
+import ipaddress
+
+
+def parse_ports(spec):
+    """
+    解析端口描述，支持单端口、端口范围和逗号分隔的组合
+
+    参数:
+        spec: 端口描述字符串，如 '80'、'8802-8806'、'80,8800-8805'
+
+    返回值:
+        list: 端口号列表 (保持书写顺序)
+
+    异常:
+        ValueError: 端口格式无效或超出 1-65535 范围
+    """
+    ports = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = int(start), int(end)
+            if start > end:
+                start, end = end, start
+            ports.extend(range(start, end + 1))
+        else:
+            ports.append(int(part))
+
+    if not ports:
+        raise ValueError(f"空的端口描述: {spec}")
+    for port in ports:
+        if not 0 < port < 65536:
+            raise ValueError(f"端口超出范围: {port}")
+    return ports
+
+
+def _normalize_ports(default_ports):
+    """把默认端口配置统一转换为整数列表，兼容 80、'8805'、[8802, 8803] 和 '8802-8804' 写法"""
+    if isinstance(default_ports, int):
+        return [default_ports]
+    if isinstance(default_ports, str):
+        return parse_ports(default_ports)
+    return [int(port) for port in default_ports]
+
+
+def _iter_hosts(network):
+    """按整数顺序惰性遍历网段内的主机地址，产生 (地址整数, 地址字符串)，避免 network.hosts() 的额外开销"""
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    # /31、/32 (IPv6 的 /127、/128) 没有网络地址和广播地址之分，全部视为主机
+    if network.num_addresses > 2:
+        first += 1
+        if network.version == 4:
+            last -= 1
+    address_class = ipaddress.IPv4Address if network.version == 4 else ipaddress.IPv6Address
+    for value in range(first, last + 1):
+        yield value, str(address_class(value))
+
+
+def _expand_line(line, default_ports):
+    """展开单行目标，产生 (去重键, ip, port)；去重键为 (地址整数 << 16 | 端口)，IPv6 额外置高位"""
+    host_part, port_part = line, None
+    # IPv6 地址本身含冒号，只有 [addr]:port 或 IPv4 形式才拆分端口
+    if line.startswith('['):
+        host_part, _, rest = line[1:].partition(']')
+        if rest.startswith(':'):
+            port_part = rest[1:]
+    elif line.count(':') == 1:
+        host_part, port_part = line.split(':', 1)
+
+    host_part = host_part.strip()
+    ports = parse_ports(port_part) if port_part else _normalize_ports(default_ports)
+
+    if '/' in host_part:
+        network = ipaddress.ip_network(host_part, strict=False)
+        hosts = _iter_hosts(network)
+        version_bit = 0 if network.version == 4 else 1 << 144
+    else:
+        address = ipaddress.ip_address(host_part)
+        hosts = [(int(address), str(address))]
+        version_bit = 0 if address.version == 4 else 1 << 144
+
+    for value, ip in hosts:
+        base = version_bit | value << 16
+        for port in ports:
+            yield base | port, ip, port
+
+
+def parse_target_line(line, default_ports=(80,)):
+    """
+    展开单行目标描述
+
+    参数:
+        line: 目标描述 (已去除首尾空白)
+        default_ports: 未指定端口时使用的端口 (整数、字符串或列表)
+
+    返回值:
+        generator: 逐个产生 (ip, port) 元组，port 为整数
+
+    异常:
+        ValueError: IP、网段或端口格式无效 (在开始迭代时抛出)
+    """
+    for _, ip, port in _expand_line(line, default_ports):
+        yield ip, port
+
+
+def iter_target_lines(lines, default_ports=(80,)):
+    """
+    从文本行序列中惰性展开并去重目标
+
+    参数:
+        lines: 可迭代的文本行
+        default_ports: 未指定端口时使用的端口
+
+    返回值:
+        generator: 逐个产生未重复的 (ip, port) 元组
+    """
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue  # 跳过空行和注释行
+
+        try:
+            for key, ip, port in _expand_line(line, default_ports):
+                # 整数去重键比字符串元组省内存
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield ip, port
+        except ValueError as e:
+            print(f"[-] 无效的目标格式: {line} ({e})")
+            continue
+
+
+def iter_targets(file_path, default_ports=(80,)):
+    """
+    从IP文件中惰性展开并去重目标，第一个目标解析出来即可开始请求
+
+    参数:
+        file_path: IP地址文件路径
+        default_ports: 未指定端口时使用的端口 (整数、字符串或列表)
+
+    返回值:
+        generator: 逐个产生 (ip, port) 元组；文件不存在时打印错误并不产生任何目标
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from iter_target_lines(f, default_ports)
+    except FileNotFoundError:
+        print(f"[-] 错误: 找不到文件 {file_path}")
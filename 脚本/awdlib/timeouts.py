@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+自适应超时 - 按每个目标最近的响应耗时计算超时时间，跨轮次、跨重启保存
+
+超时 = 最近耗时的 p95 * 倍数 + 余量，并限制在 [最小值, 最大值] 之间。
+响应快的目标失败时很快放弃，缩短每轮的长尾；慢但存活的目标拿到足够的等待时间。
+目标连续超时时超时时间逐次翻倍 (不超过最大值)，避免慢shell因为超时太短永远拿不到样本。
+"""
+
+import json
+import math
+import os
+import threading
+
+# 默认缓存文件
+TIMEOUT_FILE = 'timeout_cache.json'
+# 每个目标保留的最近耗时样本数
+WINDOW = 20
+# 样本少于该数量时使用默认超时
+MIN_SAMPLES = 3
+# p95 的倍数和额外余量 (秒)
+FACTOR = 1.5
+MARGIN = 0.5
+# 超时时间的上下限 (秒)
+MIN_TIMEOUT = 0.5
+MAX_TIMEOUT = 15
+
+
+def percentile(samples, p):
+    """返回样本的第 p 百分位数 (最近秩法)"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class AdaptiveTimeout:
+    """
+    每个目标的自适应超时
+
+    每个目标保存:
+        samples: 最近若干次成功请求的耗时 (秒)
+        misses:  连续超时次数
+    """
+
+    def __init__(self, path=TIMEOUT_FILE, default=5, min_timeout=MIN_TIMEOUT, max_timeout=MAX_TIMEOUT,
+                 factor=FACTOR, margin=MARGIN, window=WINDOW):
+        self.path = path
+        self.default = default
+        self.min_timeout = min_timeout
+        self.max_timeout = max(max_timeout, default)
+        self.factor = factor
+        self.margin = margin
+        self.window = window
+        self.entries = {}
+        # 线程池脚本会在多个线程中同时记录
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """从磁盘加载缓存，文件不存在或损坏时从空缓存开始"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[-] 超时缓存 {self.path} 读取失败，已忽略: {e}")
+            self.entries = {}
+
+    def save(self):
+        """原子写回磁盘，先写临时文件再替换，避免中断时留下半个文件"""
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            data = json.dumps(self.entries, ensure_ascii=False)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[-] 超时缓存 {self.path} 保存失败: {e}")
+
+    def get(self, key):
+        """
+        计算目标本次请求使用的超时时间
+
+        参数:
+            key: 目标键，通常为 'ip:port'
+
+        返回值:
+            float: 超时时间 (秒)
+        """
+        entry = self.entries.get(key)
+        if not entry:
+            return self.default
+        samples = entry.get('samples') or []
+        if len(samples) >= MIN_SAMPLES:
+            timeout = percentile(samples, 95) * self.factor + self.margin
+        else:
+            timeout = self.default
+        timeout *= 2 ** entry.get('misses', 0)
+        return round(min(max(timeout, self.min_timeout), self.max_timeout), 3)
+
+    def record(self, key, latency):
+        """记录一次成功请求的耗时，并清除连续超时计数"""
+        with self._lock:
+            entry = self.entries.setdefault(key, {'samples': [], 'misses': 0})
+            samples = entry['samples']
+            samples.append(round(latency, 4))
+            if len(samples) > self.window:
+                del samples[:-self.window]
+            entry['misses'] = 0
+
+    def record_timeout(self, key):
+        """记录一次超时，下次该目标的超时时间翻倍 (不超过最大值)"""
+        with self._lock:
+            entry = self.entries.setdefault(key, {'samples': [], 'misses': 0})
+            # 已经到达上限后不再累加，避免一次成功后仍需很多轮才能降下来
+            if self.get(key) < self.max_timeout:
+                entry['misses'] += 1
+
+    def observe(self, key, latency, error=None):
+        """
+        按请求结果更新: 有响应记录耗时，超时增加超时计数，其他错误 (拒绝、重置) 不影响超时
+
+        参数:
+            key: 目标键
+            latency: 本次耗时 (秒)
+            error: 错误描述，None 表示拿到了响应
+        """
+        if error is None:
+            self.record(key, latency)
+        elif error == "连接超时":
+            self.record_timeout(key)
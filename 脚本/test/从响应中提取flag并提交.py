@@ -1,37 +1,89 @@
 import os
-import re
-import requests
+import sys
+import threading
+import time
 from datetime import datetime
+from urllib.parse import urlsplit
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.ratelimit import get_limiter
+from awdlib.extract import FlagMatcher
+from awdlib.index import ExtractIndex, UNCHANGED, KNOWN_CONTENT
+from awdlib.extractpool import extract_files
+from awdlib.candidates import CandidateScorer
+from awdlib.ledger import FlagLedger
+from awdlib.flagqueue import FlagQueue
+from awdlib.submit import (FlagSubmitter, FormAdapter, JsonBatchAdapter, ParamsBatchAdapter, RETRYABLE_VERDICTS,
+                           take_batch)
 
 # ========== 配置参数 ==========
 # 响应文件目录
 RESPONSES_DIR = 'responses'
+# 增量提取索引文件，未变化的响应文件和见过的内容不再重复扫描，设为 None 则每次全部扫描
+INDEX_FILE = 'extract_index.json'
+# 提取使用的进程数，0 表示全部CPU核心，1 表示在主进程中逐个扫描
+EXTRACT_PROCESSES = 0
+# 等待上传的flag队列长度上限，上传跟不上时提取会暂停等待
+SUBMIT_QUEUE_SIZE = 1000
+# 同时上传的线程数，共用flag服务器的 keep-alive 连接
+SUBMIT_WORKERS = 16
+# 候选flag记录文件，跨轮次记录每个值出现在哪些目标上，设为 None 则不过滤静态值
+CANDIDATE_FILE = 'candidate_cache.json'
+# 每轮的时长 (秒)，与比赛的轮次一致
+ROUND_SECONDS = 120
+# 任意一轮的开始时间戳 (例如第一轮开始的时间)，轮次从这里起每 ROUND_SECONDS 秒切换一次；0 表示按 Unix 纪元划分
+ROUND_START = 0
+# flag在拿到它的那一轮之后还有效的轮数 (按响应文件的修改时间算)，过期的flag不再上传；本轮的flag总是先于旧flag上传
+FLAG_VALID_ROUNDS = 1
+# 离flag失效不足该秒数时不再上传
+MIN_REMAINING = 1.0
+# 提交账本 (SQLite)，记录每个flag的来源、轮次、提交时间和服务器判定，同一个flag跨次运行 (包括跨过轮次边界后重跑) 也只提交一次，设为 None 则不记录
+LEDGER_FILE = 'flag_ledger.db'
+# 提交时崩溃留下的记录超过该时间 (秒) 后允许重新提交，None 表示从不重新提交 (不确定服务器是否已收到)
+RETRY_INTERRUPTED_AFTER = None
+# 同一轮中出现在这么多个目标上的值 (例如页面模板里的资源哈希) 不上传
+MAX_TARGETS = 3
+# 之前的轮次中已出现过的值没有随轮次变化，不上传 (2 表示上一轮出现过即跳过)，None 表示不按轮次过滤
+MAX_ROUNDS = 2
 # Flag上传URL
 FLAG_UPLOAD_URL = 'http://8.148.182.33:8080/flag_file.php'
 # 团队Token
 TEAM_TOKEN = 'team5'
-# 上传方式: 'GET' 或 'POST'
+# 上传方式: 'GET' 或 'POST' (JSON 批量提交通常为 'PUT' 或 'POST')
 UPLOAD_METHOD = 'GET'  # 可以更改为 'POST'
-# 超时设置 (秒)
-TIMEOUT = 30
+# 提交格式: 'form' 每个请求一个flag (token/flag 作为GET参数或POST表单)；
+# 'json' 一个请求提交一批flag (JSON数组请求体，token 放在 X-Team-Token 请求头)；'params' 一个请求提交一批flag (重复的flag参数)
+SUBMIT_FORMAT = 'form'
+# 批量提交时每个请求最多携带的flag数
+SUBMIT_BATCH_SIZE = 100
+# 单次上传的超时 (秒)，超时后按重试策略再试
+TIMEOUT = 5
+# Flag服务器限速 (次/秒)，服务器返回限流时会自动退避重试
+FLAG_UPLOAD_RATE = 500
+# 上传被限流、超时、连接重置、5xx 时一直重试，直到从开始运行算起的该时间 (秒)，通常设为一轮的时长
+# 重复提交、无效、过期的flag重试也不会变，不再重试
+UPLOAD_DEADLINE = 120
 # 自定义请求头
 CUSTOM_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
     'Accept': '*/*',
     'Connection': 'keep-alive'
 }
-# Flag提取正则表达式模式列表
+# Flag提取正则表达式模式列表 (合并为一个正则单次扫描，同一位置靠前的模式优先)
 FLAG_PATTERNS = [
     r'flag\{([^\}]*)\}',  # flag{...} 格式
     r'FLAG\{([^\}]*)\}',  # FLAG{...} 格式
     r'flag=([a-zA-Z0-9]{32})',  # flag=32位字符 格式
     r'FLAG=([a-zA-Z0-9]{32})',  # FLAG=32位字符 格式
-    r'[a-zA-Z0-9]{32}',  # 32位字符（可能是MD5）
-    r'[a-zA-Z0-9]{64}',  # 64位字符（可能是SHA256）
-    r'[a-zA-Z0-9]{40}',  # 40位字符（可能是SHA1）
+    # 恰好32/40/64位的字符串（可能是MD5/SHA1/SHA256），不再从更长的字符串中截取片段
+    r'(?<![a-zA-Z0-9])[a-zA-Z0-9]{32}(?:[a-zA-Z0-9]{8}(?:[a-zA-Z0-9]{24})?)?(?![a-zA-Z0-9])',
 ]
 # ========== 配置参数结束 ==========
 
+# 所有模式合并为一个正则，每个文件只扫描一遍
+FLAG_MATCHER = FlagMatcher(FLAG_PATTERNS)
+
 def find_response_files(directory):
     """
     查找响应目录中的所有文本文件
@@ -60,133 +112,168 @@ def find_response_files(directory):
         print(f"[-] 查找文件时出错: {str(e)}")
         return []
 
-def extract_flags_from_file(file_path):
+def target_of(file_path):
+    """从响应文件名 (ip_port.txt) 得到目标标识"""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def extract_flags_from_file(file_path, index=None):
     """
     从响应文件中提取flag信息
     
     参数:
         file_path: 文件路径
+        index: ExtractIndex 增量索引，None 表示直接扫描
     
     返回值:
         list: 提取到的flag列表
     """
-    flags = []
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            
-            # 尝试每种flag模式
-            for pattern in FLAG_PATTERNS:
-                matches = re.findall(pattern, content)
-                for match in matches:
-                    # 对于有分组的模式，取分组内容；否则取整个匹配
-                    flag_value = match if isinstance(match, str) else match[0]
-                    # 处理完整格式的flag
-                    if pattern.startswith(r'flag\{') or pattern.startswith(r'FLAG\{'):
-                        full_flag = pattern.split(r'\{')[0] + '{' + flag_value + '}'
-                        if full_flag not in flags:
-                            flags.append(full_flag)
-                    else:
-                        # 对于简单格式，直接添加
-                        if flag_value not in flags:
-                            flags.append(flag_value)
-        
-        if flags:
-            print(f"[+] 从 {os.path.basename(file_path)} 中提取到 {len(flags)} 个可能的flag")
-            for flag in flags:
-                print(f"    - {flag}")
-        else:
-            print(f"[-] 从 {os.path.basename(file_path)} 中未提取到flag")
-        
+    # 按窗口映射文件扫描，不把整个文件读入内存，单次扫描并用集合去重
+    for _, flags, source, error in extract_files([file_path], FLAG_MATCHER, index, processes=1):
+        report_flags(file_path, flags, source, error)
         return flags
-        
-    except Exception as e:
-        print(f"[-] 读取文件 {file_path} 时出错: {str(e)}")
-        return []
+    return []
 
-def upload_flag(flag):
+def report_flags(file_path, flags, source, error=None):
     """
-    上传flag到服务器
+    打印一个文件的提取结果
     
     参数:
-        flag: flag值
+        file_path: 文件路径
+        flags: 提取到的flag列表
+        source: 结果来源 (索引中未变化 / 内容已扫描过 / 新扫描)
+        error: 读取文件出错时的错误信息
+    """
+    if error:
+        print(f"[-] 读取文件 {file_path} 时出错: {error}")
+        return
+    
+    if source == UNCHANGED:
+        print(f"[+] {os.path.basename(file_path)} 未变化，使用索引中的结果")
+    elif source == KNOWN_CONTENT:
+        print(f"[+] {os.path.basename(file_path)} 的内容已扫描过，使用索引中的结果")
+    
+    if flags:
+        print(f"[+] 从 {os.path.basename(file_path)} 中提取到 {len(flags)} 个可能的flag")
+        for flag in flags:
+            print(f"    - {flag}")
+    else:
+        print(f"[-] 从 {os.path.basename(file_path)} 中未提取到flag")
+
+def create_adapter():
+    """
+    按 SUBMIT_FORMAT 创建提交适配器，flag服务器的连接由共享会话保持，各上传线程复用连接不再重复握手
     
     返回值:
-        dict: 上传结果 {success: bool, response: str, status_code: int}
+        提交适配器，见 awdlib.submit
+    """
+    if SUBMIT_FORMAT == 'json':
+        return JsonBatchAdapter(FLAG_UPLOAD_URL, TEAM_TOKEN, UPLOAD_METHOD, SUBMIT_BATCH_SIZE,
+                                headers=CUSTOM_HEADERS, timeout=TIMEOUT, pool_size=SUBMIT_WORKERS)
+    if SUBMIT_FORMAT == 'params':
+        return ParamsBatchAdapter(FLAG_UPLOAD_URL, TEAM_TOKEN, UPLOAD_METHOD, batch_size=SUBMIT_BATCH_SIZE,
+                                  headers=CUSTOM_HEADERS, timeout=TIMEOUT, pool_size=SUBMIT_WORKERS)
+    return FormAdapter(FLAG_UPLOAD_URL, TEAM_TOKEN, UPLOAD_METHOD, headers=CUSTOM_HEADERS,
+                       timeout=TIMEOUT, pool_size=SUBMIT_WORKERS)
+
+def create_submitter(deadline=None):
+    """
+    创建flag提交器: 每次响应只判定一次类型 (accepted/duplicate/invalid/expired/rate_limited)，
+    只对限流和服务器出错重试
+    
+    参数:
+        deadline: 重试的截止时间戳，None 表示不重试
     """
-    print(f"\n[+] 上传flag: {flag}")
+    return FlagSubmitter(create_adapter(), deadline=deadline)
+
+def upload_flags(flags, submitter=None, deadline=None):
+    """
+    上传一批flag到服务器，批量适配器下一个请求提交多个flag
     
-    # 准备请求参数
-    params = {
-        'token': TEAM_TOKEN,
-        'flag': flag
-    }
+    参数:
+        flags: flag列表
+        submitter: FlagSubmitter 提交器，默认不重试
+        deadline: 这批flag失效的时间戳，重试不超过该时间
     
-    try:
-        if UPLOAD_METHOD.upper() == 'GET':
-            # 使用GET方法上传
-            print(f"[+] 使用GET方法上传到: {FLAG_UPLOAD_URL}")
-            response = requests.get(
-                FLAG_UPLOAD_URL,
-                params=params,
-                headers=CUSTOM_HEADERS,
-                timeout=TIMEOUT,
-                allow_redirects=False
-            )
+    返回值:
+        list: 与 flags 一一对应的上传结果 {success: bool, verdict: str, response: str, status_code: int, attempts: int}
+    """
+    results = (submitter or create_submitter()).submit_many(flags, deadline)
+    for result in results:
+        mark = '+' if result['success'] else '-'
+        retried = f", 尝试 {result['attempts']} 次" if result['attempts'] > 1 else ""
+        print(f"[{mark}] 上传flag: {result['flag']} -> {result['verdict']} "
+              f"(状态码 {result['status_code']}{retried}) {result['response'][:200]}")
+    return results
+
+def open_ledger():
+    """打开提交账本，提示上次运行在提交时中断的flag"""
+    if not LEDGER_FILE:
+        return None
+    ledger = FlagLedger(LEDGER_FILE, ROUND_SECONDS, RETRY_INTERRUPTED_AFTER, round_start=ROUND_START)
+    interrupted = ledger.interrupted()
+    if interrupted:
+        print(f"[-] 账本中有 {interrupted} 个flag在提交时中断，不确定服务器是否已收到，不会重复提交")
+    return ledger
+
+def submit_flags_once(items, submitter=None, ledger=None, deadline=None):
+    """
+    通过账本保证同一个flag只提交一次 (跨次运行、跨过轮次边界、崩溃重启后也成立)
+    
+    参数:
+        items: [(flag, 来源目标)] 或 [(flag, 来源目标, 拿到flag的时间)] 列表，没有时间的按当前时间记录轮次
+        submitter: FlagSubmitter 提交器
+        ledger: FlagLedger 提交账本，None 表示不记录
+        deadline: 这批flag失效的时间戳
+    
+    返回值:
+        list: 与 items 一一对应的上传结果；已提交过的为 None
+    """
+    claimed = []
+    for flag, target, *captured_at in items:
+        if ledger is not None and not ledger.claim(flag, target, *captured_at):
+            print(f"[+] {flag} 已提交过，跳过")
         else:
-            # 使用POST方法上传
-            print(f"[+] 使用POST方法上传到: {FLAG_UPLOAD_URL}")
-            response = requests.post(
-                FLAG_UPLOAD_URL,
-                data=params,
-                headers=CUSTOM_HEADERS,
-                timeout=TIMEOUT,
-                allow_redirects=False
-            )
-        
-        # 获取响应内容
-        response_text = response.text.strip()
-        print(f"[+] 响应状态码: {response.status_code}")
-        print(f"[+] 响应内容: {response_text}")
-        
-        # 判断上传是否成功（根据响应内容）
-        success_keywords = ['success', '成功', 'ok', 'OK', 'accepted']
-        failure_keywords = ['error', '失败', 'invalid', 'no such', 'not found']
-        
-        is_success = False
-        for keyword in success_keywords:
-            if keyword.lower() in response_text.lower():
-                is_success = True
-                break
-                
-        for keyword in failure_keywords:
-            if keyword.lower() in response_text.lower():
-                is_success = False
-                break
-                
-        return {
-            'success': is_success,
-            'response': response_text,
-            'status_code': response.status_code
-        }
-        
-    except requests.exceptions.RequestException as e:
-        error_msg = f"请求失败: {str(e)}"
-        print(f"[-] {error_msg}")
-        return {
-            'success': False,
-            'response': error_msg,
-            'status_code': None
-        }
-    except Exception as e:
-        error_msg = f"未知错误: {str(e)}"
-        print(f"[-] {error_msg}")
-        return {
-            'success': False,
-            'response': error_msg,
-            'status_code': None
-        }
+            claimed.append(flag)
+    results = dict(zip(claimed, upload_flags(claimed, submitter, deadline))) if claimed else {}
+    if ledger is not None:
+        for flag, result in results.items():
+            if result['verdict'] in RETRYABLE_VERDICTS:
+                # 重试到截止时间仍被限流或没有拿到响应，释放占位，下次运行可以重新提交
+                ledger.release(flag, result['response'])
+            else:
+                ledger.finish(flag, result['verdict'], result['response'])
+    return [results.get(flag) for flag, *_ in items]
+
+def submit_worker(submit_queue, submitter, stats, ledger=None):
+    """
+    上传线程 - 从队列中取出flag上传，与提取并行，提取不用等待网络；多个上传线程共用一个队列，
+    批量适配器下队列中已积压的flag一次取出、一个请求提交
+    
+    参数:
+        submit_queue: 待上传的 (目标, flag, 拿到flag的时间) 队列 (FlagQueue，本轮的flag先出队)，收到 None 时结束
+        submitter: FlagSubmitter 提交器
+        stats: 统计信息字典，记录上传的flag、成功/失败次数和各判定的次数，lock 键为保护它的锁
+        ledger: FlagLedger 提交账本
+    """
+    stopped = False
+    while not stopped:
+        items, stopped = take_batch(submit_queue, submitter.batch_size)
+        if not items:
+            continue
+        deadline = max(submit_queue.expires_at(captured_at) for _, _, captured_at in items)
+        results = submit_flags_once([(flag, target, captured_at) for target, flag, captured_at in items],
+                                    submitter, ledger, deadline)
+        with stats['lock']:
+            for (_, flag, _), result in zip(items, results):
+                if result is None:
+                    stats['skipped'] += 1
+                    continue
+                stats['uploaded'].append(flag)
+                stats['verdicts'][result['verdict']] = stats['verdicts'].get(result['verdict'], 0) + 1
+                if result['success']:
+                    stats['success'] += 1
+                else:
+                    stats['fail'] += 1
 
 def main():
     """
@@ -199,6 +286,11 @@ def main():
     print("3. 上传flag到指定服务器")
     print(f"4. 使用{UPLOAD_METHOD}方法上传到: {FLAG_UPLOAD_URL}\n")
     
+    # 对flag服务器单独限速
+    get_limiter().set_host_rate(urlsplit(FLAG_UPLOAD_URL).hostname, FLAG_UPLOAD_RATE, FLAG_UPLOAD_RATE)
+    # 被限流或服务器出错时不限次数重试到截止时间
+    submitter = create_submitter(time.time() + UPLOAD_DEADLINE)
+    
     # 查找所有响应文件
     response_files = find_response_files(RESPONSES_DIR)
     
@@ -206,59 +298,107 @@ def main():
         print("[-] 没有找到响应文件，程序退出")
         return
     
+    index = ExtractIndex(FLAG_MATCHER, INDEX_FILE) if INDEX_FILE else None
+    scorer = (CandidateScorer(CANDIDATE_FILE, ROUND_SECONDS, MAX_TARGETS, MAX_ROUNDS, round_start=ROUND_START)
+              if CANDIDATE_FILE else None)
+    
     # 统计信息
     total_files = len(response_files)
     processed_files = 0
     total_flags_extracted = 0
     unique_flags = set()
-    total_uploaded = 0
-    upload_success_count = 0
-    upload_fail_count = 0
+    skipped_static_count = 0
+    stats = {'uploaded': [], 'success': 0, 'fail': 0, 'skipped': 0, 'verdicts': {}, 'lock': threading.Lock()}
+    ledger = open_ledger()
+    
+    # 上传在单独的线程池中进行，提取不等待网络；队列按轮次新旧排序，过期的flag直接丢弃
+    submit_queue = FlagQueue(SUBMIT_QUEUE_SIZE, ROUND_SECONDS, FLAG_VALID_ROUNDS, MIN_REMAINING,
+                             round_start=ROUND_START)
+    workers = [threading.Thread(target=submit_worker, args=(submit_queue, submitter, stats, ledger), daemon=True)
+               for _ in range(SUBMIT_WORKERS)]
+    for worker in workers:
+        worker.start()
+    
+    def submit(target, flags, captured_at):
+        nonlocal skipped_static_count
+        # 去重、跳过静态候选后交给上传线程，已过期的flag不入队
+        for flag in flags:
+            if flag in unique_flags:
+                continue
+            unique_flags.add(flag)
+            
+            reason = scorer.reason(flag) if scorer is not None else None
+            if reason:
+                print(f"[-] 跳过静态候选 {flag}: {reason}")
+                skipped_static_count += 1
+                continue
+            if not submit_queue.put((target, flag, captured_at), captured_at):
+                print(f"[-] 跳过已过期的flag {flag}")
     
-    print(f"[+] 开始提取和上传flag...")
+    print(f"[+] 开始提取flag...")
     print("=" * 60)
     
-    # 处理每个响应文件
-    for file_path in response_files:
+    # 提取分给进程池并行进行；过滤静态候选需要知道每个值出现在哪些目标上，要等全部提取完再上传
+    extracted = []
+    for file_path, flags, source, error in extract_files(response_files, FLAG_MATCHER, index, EXTRACT_PROCESSES):
         processed_files += 1
         print(f"\n[+] 处理文件 {processed_files}/{total_files}: {os.path.basename(file_path)}")
         
-        # 提取flag
-        flags = extract_flags_from_file(file_path)
+        report_flags(file_path, flags, source, error)
         total_flags_extracted += len(flags)
-        
-        # 去重并上传
-        for flag in flags:
-            if flag not in unique_flags:
-                unique_flags.add(flag)
-                
-                # 上传flag
-                result = upload_flag(flag)
-                total_uploaded += 1
-                
-                if result['success']:
-                    upload_success_count += 1
-                else:
-                    upload_fail_count += 1
+        # 响应文件的修改时间就是拿到flag的时间，决定flag属于哪一轮
+        try:
+            captured_at = os.path.getmtime(file_path)
+        except OSError:
+            captured_at = time.time()
+        if scorer is not None:
+            scorer.observe(target_of(file_path), flags)
+            extracted.append((target_of(file_path), flags, captured_at))
+        else:
+            submit(target_of(file_path), flags, captured_at)
         
         print("=" * 60)
     
+    if index is not None:
+        index.prune(response_files)
+        index.save()
+    
+    if scorer is not None:
+        print(f"\n[+] 开始上传flag...")
+        for target, flags, captured_at in extracted:
+            submit(target, flags, captured_at)
+        scorer.save()
+    
+    # 等待上传线程处理完队列中的flag
+    for _ in workers:
+        submit_queue.put(None)
+    for worker in workers:
+        worker.join()
+    uploaded_flags = stats['uploaded']
+    if ledger is not None:
+        ledger.close()
+    
     # 打印执行结果摘要
     print("\n==== 执行结果摘要 ====")
     print(f"总响应文件数: {total_files}")
     print(f"提取的flag总数: {total_flags_extracted}")
     print(f"去重后的flag数: {len(unique_flags)}")
-    print(f"上传总次数: {total_uploaded}")
-    print(f"上传成功: {upload_success_count}")
-    print(f"上传失败: {upload_fail_count}")
+    print(f"跳过的静态候选: {skipped_static_count}")
+    print(f"已过期而跳过: {submit_queue.dropped}")
+    print(f"已提交过而跳过: {stats['skipped']}")
+    print(f"上传总次数: {len(uploaded_flags)}")
+    print(f"上传成功: {stats['success']}")
+    print(f"上传失败: {stats['fail']}")
+    if stats['verdicts']:
+        print("服务器判定: " + ", ".join(f"{verdict} {count}" for verdict, count in sorted(stats['verdicts'].items())))
     print(f"上传URL: {FLAG_UPLOAD_URL}")
-    print(f"上传方法: {UPLOAD_METHOD}")
+    print(f"上传方法: {UPLOAD_METHOD} ({SUBMIT_FORMAT})")
     print(f"团队Token: {TEAM_TOKEN}")
     
     # 列出上传的唯一flag
-    if unique_flags:
+    if uploaded_flags:
         print("\n上传的唯一flag列表:")
-        for i, flag in enumerate(unique_flags, 1):
+        for i, flag in enumerate(uploaded_flags, 1):
             print(f"  {i}. {flag}")
 
 
@@ -267,6 +407,6 @@ if __name__ == "__main__":
     
     # 配置说明：
     # 1. 修改TEAM_TOKEN为实际的团队token
-    # 2. 根据需要修改UPLOAD_METHOD为'GET'或'POST'
+    # 2. 根据需要修改UPLOAD_METHOD为'GET'或'POST'，平台支持批量提交时修改SUBMIT_FORMAT
     # 3. 可以在FLAG_PATTERNS中添加更多的flag匹配模式
     # 4. 调整TIMEOUT以适应网络环境
\ No newline at end of file
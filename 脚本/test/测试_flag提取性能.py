@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试flag提取性能 - 在大量合成的响应上对比原来逐个模式 re.findall 与合并正则单次扫描
+
+用法: python 测试_flag提取性能.py [响应数量] [每个响应的KB数]
+"""
+
+import os
+import random
+import re
+import string
+import sys
+import time
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.extract import FlagMatcher
+
+# ========== 配置参数 ==========
+# 合成响应的数量与每个响应的大小 (KB)
+RESPONSE_COUNT = 500
+RESPONSE_KB = 64
+# 每个响应中埋入的flag与哈希数量
+FLAGS_PER_RESPONSE = 3
+# 每种方式重复测量的次数，取最快一次
+REPEAT = 3
+# 固定随机种子，结果可复现
+SEED = 1
+# ========== 配置参数结束 ==========
+
+# 原来的七个模式，用于对比
+ORIGINAL_PATTERNS = [
+    r'flag\{([^\}]*)\}',
+    r'FLAG\{([^\}]*)\}',
+    r'flag=([a-zA-Z0-9]{32})',
+    r'FLAG=([a-zA-Z0-9]{32})',
+    r'[a-zA-Z0-9]{32}',
+    r'[a-zA-Z0-9]{64}',
+    r'[a-zA-Z0-9]{40}',
+]
+
+
+def extract_old(content):
+    """原来的实现: 每个模式各 findall 一遍，列表去重"""
+    flags = []
+    for pattern in ORIGINAL_PATTERNS:
+        for match in re.findall(pattern, content):
+            flag_value = match if isinstance(match, str) else match[0]
+            if pattern.startswith(r'flag\{') or pattern.startswith(r'FLAG\{'):
+                flag_value = pattern.split(r'\{')[0] + '{' + flag_value + '}'
+            if flag_value not in flags:
+                flags.append(flag_value)
+    return flags
+
+
+def random_token(rng, length, alphabet=string.ascii_lowercase + string.digits):
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def build_corpus(count, size_kb, rng):
+    """
+    生成类似网页的响应文本，随机位置埋入 flag{...}、flag=... 和各种长度的哈希
+
+    返回值:
+        tuple: (响应文本列表, 每个响应中埋入的flag集合列表)
+    """
+    words = [random_token(rng, rng.randint(2, 10), string.ascii_letters) for _ in range(500)]
+    tags = ['<div class="row">', '</div>', '<p>', '</p>', '<td>', '</td>', '\n', '<a href="/index.php?id=12">']
+    corpus = []
+    expected = []
+    for _ in range(count):
+        parts = []
+        length = 0
+        while length < size_kb * 1024:
+            part = rng.choice(words) if rng.random() < 0.85 else rng.choice(tags)
+            parts.append(part)
+            length += len(part) + 1
+        secrets = set()
+        for _ in range(FLAGS_PER_RESPONSE):
+            kind = rng.randrange(5)
+            if kind == 0:
+                secret = 'flag{' + random_token(rng, 36) + '}'
+                parts.insert(rng.randrange(len(parts)), secret)
+            elif kind == 1:
+                secret = random_token(rng, 32)
+                parts.insert(rng.randrange(len(parts)), 'flag=' + secret)
+            else:
+                secret = random_token(rng, (32, 40, 64)[kind - 2])
+                parts.insert(rng.randrange(len(parts)), secret)
+            secrets.add(secret)
+        corpus.append(' '.join(parts))
+        expected.append(secrets)
+    return corpus, expected
+
+
+def measure(func, corpus):
+    best = None
+    results = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        results = [func(content) for content in corpus]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else RESPONSE_COUNT
+    size_kb = int(sys.argv[2]) if len(sys.argv) > 2 else RESPONSE_KB
+
+    print(f"[+] 生成 {count} 个 {size_kb}KB 的合成响应...")
+    corpus, expected = build_corpus(count, size_kb, random.Random(SEED))
+    total_mb = sum(len(content) for content in corpus) / (1 << 20)
+
+    matcher = FlagMatcher()
+    old_time, old_results = measure(extract_old, corpus)
+    new_time, new_results = measure(matcher.findall, corpus)
+
+    # 新实现应恰好找出埋入的flag；原实现还会多出从40/64位哈希中截取的32/40位片段
+    missed = sum(1 for secrets, new in zip(expected, new_results) if set(new) != secrets)
+    extra = sum(len(old) for old in old_results) - sum(len(new) for new in new_results)
+
+    print(f"[+] 数据量: {total_mb:.1f}MB, 埋入 {sum(len(s) for s in expected)} 个flag")
+    print(f"[+] 逐个模式 findall: {old_time:.3f}s ({total_mb / old_time:.1f}MB/s)")
+    print(f"[+] 合并正则单次扫描: {new_time:.3f}s ({total_mb / new_time:.1f}MB/s)")
+    print(f"[+] 加速比: {old_time / new_time:.2f}x")
+    print(f"[+] 原实现多提取的哈希片段: {extra} 个")
+    if missed:
+        print(f"[-] {missed} 个响应的提取结果与埋入的flag不一致")
+    else:
+        print("✓ 合并正则恰好提取到所有埋入的flag")
+
+
+if __name__ == "__main__":
+    main()
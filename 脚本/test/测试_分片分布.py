@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试分片分布 - 检查仓库中的 ip.txt 在分片模式下会分到多个进程
+
+比赛中各队伍常常共用一个IP、只是端口不同 (例如 8.148.182.33:8802-8806)，
+分片如果只按IP哈希，所有目标都会落在同一个进程里，PROCESSES 大于1也没有效果。
+
+用法: python 测试_分片分布.py [进程数 ...]
+"""
+
+import os
+import sys
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SCRIPT_DIR)
+from awdlib.targets import iter_targets
+from awdlib.shard import split_targets
+
+# ========== 配置参数 ==========
+# 要检查的IP文件 (相对于脚本根目录) 和展开时使用的默认端口，与各脚本的 DEFAULT_PORT 一致
+IP_FILES = [('flag/ip.txt', '8805'), ('test/ip.txt', 80)]
+# 要检查的进程数
+PROCESS_COUNTS = [2, 4, 8]
+# ========== 配置参数结束 ==========
+
+
+def check(path, default_port, counts):
+    """
+    检查一个IP文件在各进程数下是否分到了多个分片
+
+    返回值:
+        bool: 全部通过返回 True
+    """
+    targets = list(iter_targets(os.path.join(SCRIPT_DIR, path), default_port))
+    hosts = len({ip for ip, _ in targets})
+    print(f"\n{path}: {len(targets)} 个目标，{hosts} 个IP")
+    passed = True
+    for count in counts:
+        count = min(count, len(targets))
+        if count < 2:
+            continue
+        sizes = [len(shard) for shard in split_targets(targets, count)]
+        used = sum(1 for size in sizes if size)
+        ok = used > 1
+        passed = passed and ok
+        print(f"  {'✓' if ok else '✗'} {count} 个进程: 用到 {used} 个，各分片目标数 {sizes}")
+    return passed
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or PROCESS_COUNTS
+    print("=== 开始测试分片分布 ===")
+    results = [check(path, port, counts) for path, port in IP_FILES]
+    if all(results):
+        print("\n✓ 测试成功，所有IP文件都分到了多个进程")
+    else:
+        print("\n✗ 测试失败，有IP文件的目标全部落在同一个进程")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地回合基准 - 在模拟比赛环境 (awdlib.simulator) 中把现有脚本各跑一轮，
+报告一轮耗时、请求耗时 p50/p99、拿到和提交成功的flag数，以及每秒拿到的flag数
+
+每个场景在单独的临时目录中运行 (ip.txt、responses、账本等都写在那里)，使用各自的团队token提交，
+场景之间互不影响。请求耗时由基准在异步引擎和 requests 会话上统一记录，不需要修改脚本；
+新的请求引擎只要在 SCENARIOS 中加一个场景函数即可一起比较。
+
+加 --faults 时每个场景先在正常环境中跑一轮，再按 FAULT_PROFILE 注入超时、连接后立即断开、慢速响应、
+中途断开和巨大页面，并关闭部分队伍的监听端口 (拒绝连接) 后再跑一轮，对比两轮的耗时、p99 和拿到/提交成功的flag数，超时处理的退化在比赛前就能发现。
+
+用法: python 测试_本地回合基准.py [队伍数] [场景名 ...] [--faults]
+场景名: get post extract pipeline auto cookie，不写则全部运行
+"""
+
+import contextlib
+import importlib
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import time
+import unicodedata
+from urllib.parse import urlsplit
+
+import requests
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块；flag/ 和 test/ 下的脚本按模块名导入
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SCRIPT_DIR)
+sys.path.append(os.path.join(SCRIPT_DIR, 'flag'))
+sys.path.append(os.path.join(SCRIPT_DIR, 'test'))
+from awdlib.simulator import GameSimulator
+from awdlib.engine import AsyncHTTPEngine
+from awdlib.timeouts import AdaptiveTimeout, percentile
+from awdlib.ratelimit import configure_limiter
+from awdlib.health import HealthCache
+from awdlib.table import TargetTable
+
+# ========== 配置参数 ==========
+# 模拟的队伍数
+TEAMS = 50
+# 模拟环境的端口: 队伍服务从 BASE_PORT 开始，flag服务器使用 FLAG_PORT
+BASE_PORT = 18800
+FLAG_PORT = 18799
+# 每队使用一个回环地址 (127.0.x.y)，与真实比赛一样每个队伍一个主机，脚本的每主机限速按队伍生效；仅 Linux 支持
+HOST_PER_TEAM = sys.platform.startswith('linux')
+# 每轮的时长 (秒)，与脚本的 ROUND_SECONDS 一致
+ROUND_SECONDS = 120
+# 是否显示脚本自己的输出
+SHOW_OUTPUT = False
+# 故障注入模式 (--faults) 的配置: {路径: {故障类型: 概率}}，'*' 用于所有队伍服务路径，flag服务器单独配置
+# '*' 中的 refuse 是宕机队伍的比例: 这些队伍的端口关闭，连接直接被拒绝
+FAULT_PROFILE = {
+    '*': {'timeout': 0.03, 'abort': 0.03, 'slow': 0.05, 'reset': 0.03, 'huge': 0.02, 'refuse': 0.05},
+    '/flag_file.php': {'timeout': 0.02, 'abort': 0.02, 'slow': 0.02, 'reset': 0.02},
+}
+# 故障抽取的随机数种子，固定后每次运行注入的故障相近，便于比较
+FAULT_SEED = 1
+# ========== 配置参数结束 ==========
+
+
+class LatencyRecorder:
+    """
+    在异步引擎和 requests 会话上记录每个请求的耗时，按是否发往flag服务器分开统计；
+    失败的请求 (超时、连接重置等) 也计入耗时，尾延迟才能反映出超时处理的好坏
+    """
+
+    def __init__(self, flag_port):
+        self.flag_port = flag_port
+        self.samples = {'target': [], 'submit': []}
+        self.errors = {'target': 0, 'submit': 0}
+        self._patched = []
+
+    def _record(self, port, elapsed, error):
+        kind = 'submit' if port == self.flag_port else 'target'
+        if error:
+            self.errors[kind] += 1
+        self.samples[kind].append(elapsed)
+
+    def install(self):
+        recorder = self
+        engine_request = AsyncHTTPEngine.request
+        session_send = requests.Session.send
+
+        async def request(engine, *args, **kwargs):
+            # 引擎按 request(method, host, port, ...) 调用，fetch_all 中全部以关键字参数传入
+            response = await engine_request(engine, *args, **kwargs)
+            port = kwargs['port'] if 'port' in kwargs else args[2]
+            recorder._record(int(port), response.elapsed, response.error)
+            return response
+
+        def send(session, prepared, **kwargs):
+            port = urlsplit(prepared.url).port
+            start = time.perf_counter()
+            try:
+                response = session_send(session, prepared, **kwargs)
+            except Exception:
+                recorder._record(port, time.perf_counter() - start, True)
+                raise
+            recorder._record(port, time.perf_counter() - start, None)
+            return response
+
+        self._patched = [(AsyncHTTPEngine, 'request', engine_request), (requests.Session, 'send', session_send)]
+        AsyncHTTPEngine.request = request
+        requests.Session.send = send
+
+    def uninstall(self):
+        for owner, name, original in self._patched:
+            setattr(owner, name, original)
+        self._patched = []
+
+
+def load(name):
+    """重新导入一个脚本模块，模块级的状态 (重试预算、输出目录等) 每个场景都是新的"""
+    for module in (name, '从响应中提取flag并提交'):
+        sys.modules.pop(module, None)
+    return importlib.import_module(name)
+
+
+def run_main(module):
+    """运行脚本的 main()，脚本因为没有结果调用 sys.exit 时不中断基准"""
+    try:
+        module.main()
+    except SystemExit:
+        pass
+
+
+def configure_submit(ext, sim, token):
+    """让提取提交脚本向模拟的flag服务器提交"""
+    ext.FLAG_UPLOAD_URL = sim.flag_url
+    ext.TEAM_TOKEN = token
+    ext.UPLOAD_METHOD = 'GET'
+    ext.SUBMIT_FORMAT = 'form'
+    # 模拟环境的轮次从启动时开始，不与 Unix 纪元对齐，与真实比赛相同
+    ext.ROUND_SECONDS = sim.round_seconds
+    ext.ROUND_START = sim.round_start
+
+
+# ---------- 场景 ----------
+
+def scenario_get(sim, token):
+    """getFlag.py: GET /footer.php"""
+    run_main(load('getFlag'))
+
+
+def scenario_post(sim, token):
+    """postFlag.py: POST /footer.php shell=cat /flag"""
+    module = load('postFlag')
+    module.POST_DATA = {'shell': 'cat /flag'}
+    run_main(module)
+
+
+def scenario_extract(sim, token):
+    """POST型shell获取信息.py 保存响应后，再运行 从响应中提取flag并提交.py"""
+    post = load('POST型shell获取信息')
+    ext = importlib.import_module('从响应中提取flag并提交')
+    configure_submit(ext, sim, token)
+    run_main(post)
+    run_main(ext)
+
+
+def scenario_pipeline(sim, token):
+    """POST型shell获取信息.py 流水线模式: 响应在内存中提取并提交"""
+    post = load('POST型shell获取信息')
+    # 流水线在 create_pipeline 中才导入提取脚本，先导入并改好提交配置
+    ext = importlib.import_module('从响应中提取flag并提交')
+    configure_submit(ext, sim, token)
+    post.PIPELINE_MODE = True
+    run_main(post)
+
+
+def scenario_auto(sim, token):
+    """自动提交flag.py 的一轮: POST /includes/config.php?d=system 执行 cat /flag 并提交"""
+    module = load('自动提交flag')
+    module.flag_server = sim.flag_url + '?token=%s&flag=%s'
+    module.teamtoken = token
+    # 与 timer() 中每轮之前的准备相同
+    limiter = configure_limiter(module.rate_limit, host_rate=module.host_rate_limit)
+    limiter.set_host_rate(urlsplit(module.flag_server % ('', '')).hostname, module.flag_submit_rate,
+                          module.flag_submit_rate)
+    timeouts = AdaptiveTimeout(default=module.request_timeout, max_timeout=module.request_timeout_max)
+    engine = AsyncHTTPEngine(module.max_concurrency, module.per_host_limit, timeout=module.request_timeout)
+    try:
+        table = TargetTable.from_file('ip.txt', module.target_ports)
+        health = HealthCache(module.health_file)
+        table.load_backoff(health)
+        module.flag(table, health, engine, timeouts, time.time() + ROUND_SECONDS)
+    finally:
+        engine.close()
+        module.submit_executor.shutdown()
+
+
+def scenario_cookie(sim, token):
+    """登录获取cookie.py 登录后，再运行 GET型cookie请求执行器.py 访问 /a.php"""
+    run_main(load('登录获取cookie'))
+    run_main(load('GET型cookie请求执行器'))
+
+
+SCENARIOS = [
+    ('get', 'getFlag.py', scenario_get),
+    ('post', 'postFlag.py', scenario_post),
+    ('extract', 'POST型shell获取信息 + 提取提交', scenario_extract),
+    ('pipeline', 'POST型shell获取信息 流水线', scenario_pipeline),
+    ('auto', '自动提交flag.py', scenario_auto),
+    ('cookie', '登录获取cookie + GET型cookie', scenario_cookie),
+]
+
+
+def captured_teams(sim, directory, rounds):
+    """
+    统计临时目录中的输出文件里出现了多少个队伍的flag
+
+    参数:
+        rounds: 场景运行期间经过的所有轮次，场景跨过轮次边界时前后两轮的flag都算
+    """
+    teams = set()
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.txt') and name != 'ip.txt':
+                with open(os.path.join(root, name), encoding='utf-8', errors='ignore') as f:
+                    teams |= sim.captured(f.read(), rounds)
+    return len(teams)
+
+
+def run_scenario(sim, key, label, func):
+    """
+    在单独的临时目录中运行一个场景
+
+    返回值:
+        dict: 一轮耗时、请求数、请求耗时分位数、拿到/提交成功的flag数等
+    """
+    workdir = tempfile.mkdtemp(prefix=f'awd_bench_{key}_')
+    cwd = os.getcwd()
+    token = f'bench_{key}_{secrets.token_hex(4)}'
+    recorder = LatencyRecorder(sim.flag_port)
+    injected = sum(sim.injected.values())
+    os.chdir(workdir)
+    sim.write_ip_file('ip.txt')
+    recorder.install()
+    first_round = sim.current_round()
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+                contextlib.redirect_stdout(sys.stdout if SHOW_OUTPUT else devnull):
+            func(sim, token)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    recorder.uninstall()
+    os.chdir(cwd)
+    captured = captured_teams(sim, workdir, range(first_round, sim.current_round() + 1))
+    shutil.rmtree(workdir, ignore_errors=True)
+    accepted = sum(1 for _, submitter, _, _ in sim.accepted if submitter == token)
+    targets = recorder.samples['target']
+    submits = recorder.samples['submit']
+    return {
+        'label': label, 'elapsed': elapsed, 'error': error,
+        'requests': len(targets), 'request_errors': recorder.errors['target'],
+        'p50': percentile(targets, 50) if targets else None, 'p99': percentile(targets, 99) if targets else None,
+        'submits': len(submits),
+        'submit_p99': percentile(submits, 99) if submits else None,
+        'captured': captured, 'accepted': accepted,
+        'rate': (accepted or captured) / elapsed if elapsed else 0,
+        'faults': sum(sim.injected.values()) - injected,
+    }
+
+
+def format_ms(value):
+    return f"{value * 1000:.1f}ms" if value is not None else '-'
+
+
+def pad(value, width, left=False):
+    """按终端显示宽度对齐 (中文字符占两列)"""
+    text = str(value)
+    shown = sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+    fill = ' ' * max(0, width - shown)
+    return text + fill if left else fill + text
+
+
+COLUMNS = [('场景', 34), ('一轮耗时', 10), ('请求数', 8), ('失败', 6), ('p50', 10), ('p99', 10),
+           ('拿到flag', 10), ('提交成功', 10), ('提交p99', 10), ('flag/秒', 10), ('注入故障', 10)]
+COMPARE_COLUMNS = [('场景', 34), ('一轮耗时', 18), ('p99', 22), ('提交p99', 22), ('拿到flag', 14), ('提交成功', 14)]
+
+
+def print_row(row, columns):
+    print(''.join(pad(value, width, index == 0) for index, (value, (_, width)) in enumerate(zip(row, columns))))
+
+
+def print_report(results, title):
+    print(f"\n==== {title} ====")
+    print_row([name for name, _ in COLUMNS], COLUMNS)
+    for r in results:
+        print_row([r['label'], f"{r['elapsed']:.2f}s", r['requests'], r['request_errors'], format_ms(r['p50']),
+                   format_ms(r['p99']), r['captured'], r['accepted'], format_ms(r['submit_p99']), f"{r['rate']:.1f}",
+                   r['faults']], COLUMNS)
+        if r['error']:
+            print(f"    [-] 场景出错: {r['error']}")
+
+
+def print_comparison(healthy, faulty, teams):
+    """逐个场景对比正常环境和故障注入后的耗时、尾延迟和flag数 (正常 -> 故障)"""
+    print(f"\n==== 故障注入前后对比 ({teams} 队，正常 -> 故障) ====")
+    print_row([name for name, _ in COMPARE_COLUMNS], COMPARE_COLUMNS)
+    for before, after in zip(healthy, faulty):
+        print_row([before['label'], f"{before['elapsed']:.2f}s -> {after['elapsed']:.2f}s",
+                   f"{format_ms(before['p99'])} -> {format_ms(after['p99'])}",
+                   f"{format_ms(before['submit_p99'])} -> {format_ms(after['submit_p99'])}",
+                   f"{before['captured']} -> {after['captured']}", f"{before['accepted']} -> {after['accepted']}"],
+                  COMPARE_COLUMNS)
+
+
+def run_all(sim, selected):
+    results = []
+    for key, label, func in SCENARIOS:
+        if key in selected:
+            print(f"[+] 运行场景: {label}")
+            results.append(run_scenario(sim, key, label, func))
+    return results
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--faults']
+    faults = len(args) < len(sys.argv) - 1
+    teams = int(args[0]) if args else TEAMS
+    selected = args[1:] or [key for key, _, _ in SCENARIOS]
+    unknown = set(selected) - {key for key, _, _ in SCENARIOS}
+    if unknown:
+        print(f"[-] 未知的场景: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    with GameSimulator(teams, base_port=BASE_PORT, flag_port=FLAG_PORT, round_seconds=ROUND_SECONDS,
+                       host_per_team=HOST_PER_TEAM) as sim:
+        first, last = sim.targets[0], sim.targets[-1]
+        print(f"[+] 模拟环境已启动: {teams} 个队伍服务 {first[0]}:{first[1]} ... {last[0]}:{last[1]}，"
+              f"flag服务器 {sim.flag_url}")
+        results = run_all(sim, selected)
+        if faults:
+            sim.set_faults(FAULT_PROFILE, FAULT_SEED)
+            print(f"[+] 开启故障注入: {FAULT_PROFILE}，{len(sim.down)} 个队伍端口关闭")
+            faulty = run_all(sim, selected)
+    print_report(results, f"本地回合基准 ({teams} 队)")
+    if faults:
+        print_report(faulty, f"故障注入 ({teams} 队)")
+        print_comparison(results, faulty, teams)
+
+
+if __name__ == "__main__":
+    main()
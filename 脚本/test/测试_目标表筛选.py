@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试目标表筛选 - 检查 TargetTable.select 的 NumPy 向量化实现与纯 Python 实现返回相同的目标
+
+自动提交flag.py 每轮用 select(ready_at=...) 挑出不在退避期的目标，
+比赛机器上装没装 NumPy 不能影响打哪些目标。
+
+用法: python 测试_目标表筛选.py [目标数]
+"""
+
+import os
+import random
+import sys
+import time
+
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib import table as table_module
+from awdlib.table import TargetTable, STATUS_CONN_FAIL
+
+# ========== 配置参数 ==========
+# 随机目标数
+TARGETS = 5000
+# 随机数种子，固定后每次生成的目标表相同
+SEED = 1
+# ========== 配置参数结束 ==========
+
+
+def build_table(count, rng, now):
+    """生成随机的目标表: 几个网段、几个端口，状态、耗时和退避各不相同"""
+    targets = [(f"10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(1, 255)}", rng.choice((80, 8802, 8803)))
+               for _ in range(count)]
+    table = TargetTable.from_targets(targets)
+    for i in range(len(table)):
+        table.record(i, rng.choice((200, 404, STATUS_CONN_FAIL, 0)),
+                     rng.choice((None, rng.uniform(0, 2))))
+        table.set_backoff(i, rng.choice((0, now - 60, now + 60)))
+    return table
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TARGETS
+    if table_module.np is None:
+        print("[-] 未安装 NumPy，只有纯 Python 实现，跳过比较")
+        return
+    print("=== 开始测试目标表筛选 ===")
+    now = time.time()
+    table = build_table(count, random.Random(SEED), now)
+    cases = [
+        {},
+        {'network': '10.1.0.0/16'},
+        {'ports': {8802}},
+        {'status': {200}},
+        {'status': {STATUS_CONN_FAIL}, 'ports': {80, 8803}},
+        {'max_latency': 0.5},
+        {'ready_at': now},
+        {'network': '10.2.128.0/17', 'status': {200, 404}, 'max_latency': 1.5, 'ready_at': now},
+    ]
+    numpy = table_module.np
+    passed = True
+    for case in cases:
+        vectorized = table.select(**case)
+        table_module.np = None
+        try:
+            fallback = table.select(**case)
+        finally:
+            table_module.np = numpy
+        ok = vectorized == fallback
+        passed = passed and ok
+        print(f"  {'✓' if ok else '✗'} {case or '无条件'}: NumPy {len(vectorized)} 个，纯 Python {len(fallback)} 个")
+    if passed:
+        print("\n✓ 测试成功，两种实现的筛选结果一致")
+    else:
+        print("\n✗ 测试失败，两种实现的筛选结果不同")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 import requests
-import ipaddress
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+# 添加上级目录到Python路径，以便导入共享的awdlib模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from awdlib.targets import iter_targets
+from awdlib.probe import iter_alive
+from awdlib.session import get_session
+from awdlib.timeouts import AdaptiveTimeout
+from awdlib.ratelimit import configure_limiter
+from awdlib.stream import read_streamed
+
 # ========== 配置参数 ==========
 # IP列表文件路径
 IP_FILE_PATH = 'ip.txt'
@@ -15,8 +24,22 @@ DEFAULT_PORT = 80
 DEFAULT_PATH = '/index.php'
 # 默认协议
 DEFAULT_PROTOCOL = 'http'
-# 超时设置 (秒)
-TIMEOUT = 30
+# 超时设置 (秒)，没有耗时记录的目标使用该值
+TIMEOUT = 5
+# 自适应超时上限 (秒)，按每个目标最近耗时的p95计算
+TIMEOUT_MAX = 15
+# 最大线程数，同时登录的目标数
+MAX_WORKERS = 10
+# 自适应超时的耗时记录文件，每个目标的超时按最近耗时的p95计算
+TIMEOUT_FILE = 'timeout_cache.json'
+# 每个主机的登录速率上限 (次/秒)
+HOST_RATE_LIMIT = 50
+# 登录前先做TCP存活预筛，不可连接的目标直接跳过
+PROBE_ENABLED = True
+# 存活预筛连接超时 (秒)
+PROBE_TIMEOUT = 0.8
+# 登录响应体最多读取的字节数，读完的连接归还共享连接池，超出上限的连接直接关闭
+MAX_BODY_BYTES = 64 * 1024
 # 登录账号密码
 LOGIN_DATA = {
     'username': 'admin',  # 修改为实际的用户名
@@ -48,10 +71,10 @@ def init_cookie_file():
 
 def read_ip_file(file_path):
     """
-    读取IP地址文件并解析不同格式的地址
+    读取IP地址文件并惰性展开目标 (解析逻辑见 awdlib.targets)
     
     支持的格式:
-    - IP:端口格式 (如 8.148.182.33:8805)
+    - IP:端口格式 (如 8.148.182.33:8805)，以及端口范围/多端口 (如 8.148.182.33:8802-8805)
     - 纯IP格式 (如 8.148.182.34)，会使用默认端口
     - CIDR格式 (如 8.148.182.35/30)，会解析出所有包含的IP地址
     
@@ -59,58 +82,9 @@ def read_ip_file(file_path):
         file_path: IP地址文件路径
     
     返回值:
-        list: [(ip, port)] 格式的列表，包含所有解析出的IP和端口组合
+        generator: 逐个产生去重后的 (ip, port) 元组
     """
-    ip_port_list = []
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue  # 跳过空行和注释行
-                
-                # 处理带端口的IP格式
-                if ':' in line and not '/' in line:
-                    ip, port = line.split(':', 1)
-                    try:
-                        # 验证IP格式并将端口转换为整数
-                        ipaddress.ip_address(ip)
-                        port = int(port)
-                        ip_port_list.append((ip, port))
-                    except (ipaddress.AddressValueError, ValueError):
-                        print(f"[-] 无效的IP:端口格式: {line}")
-                        continue
-                # 处理CIDR格式
-                elif '/' in line:
-                    try:
-                        network = ipaddress.ip_network(line, strict=False)
-                        # 为CIDR范围内的每个IP添加默认端口
-                        for ip in network.hosts():
-                            ip_port_list.append((str(ip), DEFAULT_PORT))
-                    except ValueError:
-                        print(f"[-] 无效的CIDR格式: {line}")
-                        continue
-                # 处理纯IP格式
-                else:
-                    try:
-                        ipaddress.ip_address(line)
-                        ip_port_list.append((line, DEFAULT_PORT))
-                    except ipaddress.AddressValueError:
-                        print(f"[-] 无效的IP地址: {line}")
-                        continue
-        
-        print(f"[+] 从 {file_path} 成功读取 {len(ip_port_list)} 个目标")
-        return ip_port_list
-        
-    except FileNotFoundError:
-        print(f"[-] 错误: 找不到文件 {file_path}")
-        return []
-    except Exception as e:
-        print(f"[-] 读取IP文件时出错: {str(e)}")
-        return []
+    return iter_targets(file_path, DEFAULT_PORT)
 
 def get_cookie_string(cookies):
     """
@@ -146,13 +120,14 @@ def save_cookie_to_file(ip, port, cookie_string):
         print(f"[-] 保存cookie文件失败: {str(e)}")
         return False
 
-def send_login_request(ip, port):
+def send_login_request(ip, port, timeouts):
     """
     发送登录POST请求并获取cookie
     
     参数:
         ip: 目标IP地址
         port: 目标端口
+        timeouts: AdaptiveTimeout 自适应超时
     
     返回值:
         tuple: (success, cookie_string/error_msg)
@@ -162,15 +137,20 @@ def send_login_request(ip, port):
     print(f"\n[+] 发送登录请求到: {url}")
     print(f"[+] 用户名: {LOGIN_DATA.get('username')}")
     
+    target_key = f"{ip}:{port}"
     try:
-        # 发送POST登录请求
-        response = requests.post(
+        # 发送POST登录请求 (共享连接池会话，会话本身不保存Cookie)
+        # 只需要响应头中的Cookie，响应体按上限读完后连接归还连接池，超大的页面不会占住线程
+        response = get_session(MAX_WORKERS).post(
             url,
             data=LOGIN_DATA,
             headers=CUSTOM_HEADERS,
-            timeout=TIMEOUT,
-            allow_redirects=False
+            timeout=timeouts.get(target_key),
+            allow_redirects=False,
+            stream=True
         )
+        read_streamed(response, MAX_BODY_BYTES)
+        timeouts.record(target_key, response.elapsed.total_seconds())
         
         # 输出响应状态码
         print(f"[+] 响应状态码: {response.status_code}")
@@ -184,6 +164,11 @@ def send_login_request(ip, port):
             print("[+] 未获取到Cookie信息")
             return False, "无Cookie"
             
+    except requests.exceptions.Timeout as e:
+        timeouts.record_timeout(target_key)
+        error_msg = f"请求失败: {str(e)}"
+        print(f"[-] {error_msg}")
+        return False, error_msg
     except requests.exceptions.RequestException as e:
         error_msg = f"请求失败: {str(e)}"
         print(f"[-] {error_msg}")
@@ -209,44 +194,56 @@ def main():
         print("[-] Cookie文件初始化失败，程序退出")
         sys.exit(1)
     
-    # 从文件读取IP地址列表
+    # 从文件惰性读取目标，解析出第一个目标即开始登录
     targets = read_ip_file(IP_FILE_PATH)
+    if PROBE_ENABLED:
+        targets = iter_alive(targets, timeout=PROBE_TIMEOUT)
     
-    if not targets:
-        print("[-] 没有找到有效的目标，程序退出")
-        sys.exit(1)
+    timeouts = AdaptiveTimeout(TIMEOUT_FILE, default=TIMEOUT, max_timeout=TIMEOUT_MAX)
+    configure_limiter(host_rate=HOST_RATE_LIMIT)
     
     # 统计信息
+    total_count = 0
     success_count = 0
     fail_count = 0
     cookie_count = 0
     
     print(f"[+] 开始批量登录获取Cookie...")
-    print(f"[+] 目标总数: {len(targets)}")
     print("=" * 60)
     
-    # 对每个目标执行登录请求
-    for idx, (ip, port) in enumerate(targets, 1):
-        print(f"\n[+] 处理目标 {idx}/{len(targets)}: {ip}:{port}")
+    # 使用线程池并发登录，慢目标或超时的目标不会挡住其他目标
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_target = {executor.submit(send_login_request, ip, port, timeouts): (ip, port)
+                            for ip, port in targets}
+        total_count = len(future_to_target)
         
-        # 发送登录请求
-        success, result = send_login_request(ip, port)
-        
-        # 保存到文件
-        save_cookie_to_file(ip, port, result)
-        
-        # 更新统计信息
-        if success:
-            success_count += 1
-            cookie_count += 1
-        else:
-            fail_count += 1
-        
-        print("=" * 60)
+        # 按完成顺序保存结果，文件只在主线程中写入
+        for idx, future in enumerate(as_completed(future_to_target), 1):
+            ip, port = future_to_target[future]
+            success, result = future.result()
+            print(f"\n[+] 完成目标 {idx}/{total_count}: {ip}:{port}")
+            
+            # 保存到文件
+            save_cookie_to_file(ip, port, result)
+            
+            # 更新统计信息
+            if success:
+                success_count += 1
+                cookie_count += 1
+            else:
+                fail_count += 1
+            
+            print("=" * 60)
+    
+    timeouts.save()
+    
+    if not total_count:
+        print("[-] 没有找到有效的目标，程序退出")
+        sys.exit(1)
     
     # 打印执行结果摘要
     print("\n==== 执行结果摘要 ====")
-    print(f"总目标数: {len(targets)}")
+    print(f"总目标数: {total_count}")
     print(f"成功: {success_count}")
     print(f"失败: {fail_count}")
     print(f"获取Cookie数: {cookie_count}")